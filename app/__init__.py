@@ -3,6 +3,16 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_migrate import Migrate
 from flask_wtf.csrf import CSRFProtect
+from app.page_cache import PageCache
+from app.pdf_export import PdfExporter
+from app.assets import Assets
+from app.db_tuning import DatabaseTuning
+from app.user_cache import UserCache
+from app.passwords import PasswordPolicy
+from app.rate_limit import RateLimiter
+from app.instrumentation import Instrumentation
+from app.metrics import Metrics
+from app.compression import compress_html
 from datetime import timedelta
 import os
 import json
@@ -12,6 +22,15 @@ db = SQLAlchemy()
 login_manager = LoginManager()
 migrate = Migrate()
 csrf = CSRFProtect()  # CSRF защита
+page_cache = PageCache()  # Кэш отрендеренных фрагментов страниц
+pdf_exporter = PdfExporter()  # Пул рендеринга PDF с дисковым кэшем
+assets = Assets()  # Собранные статические файлы с отпечатками
+db_tuning = DatabaseTuning()  # Пул соединений и PRAGMA SQLite
+user_cache = UserCache()  # Снимки пользователей сессии для user_loader
+password_policy = PasswordPolicy()  # Метод хеширования и пул проверки паролей
+rate_limiter = RateLimiter()  # Ограничение частоты попыток входа и регистрации
+instrumentation = Instrumentation()  # Замеры времени запросов, SQL и шаблонов
+metrics = Metrics()  # Метрики Prometheus (/metrics)
 
 def create_app():
     # Создание экземпляра приложения
@@ -33,14 +52,40 @@ def create_app():
     app.config['SESSION_COOKIE_SECURE'] = False  # True для production с HTTPS
     app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 
+    # Сетка страницы просмотра строится в браузере из JSON ('client') или в шаблоне ('server')
+    app.config['VIEW_SCHEDULE_RENDER_MODE'] = os.environ.get('VIEW_SCHEDULE_RENDER_MODE') or 'client'
+
+    # Сжатие HTML-ответов gzip/brotli
+    app.config['COMPRESS_HTML'] = os.environ.get('COMPRESS_HTML', '1') != '0'
+
+    # ASGI-режим (asgi.py): адрес асинхронной базы и потоки для синхронных маршрутов
+    if os.environ.get('ASYNC_DATABASE_URL'):
+        app.config['ASYNC_DATABASE_URL'] = os.environ['ASYNC_DATABASE_URL']
+    app.config['ASGI_WSGI_THREADS'] = int(os.environ.get('ASGI_WSGI_THREADS', 10))
+
+    # /health отвечает 503, если база не ответила за это время, секунды
+    app.config['HEALTH_DB_TIMEOUT'] = float(os.environ.get('HEALTH_DB_TIMEOUT') or 2)
+
     # Инициализация расширений с приложением
+    db_tuning.init_app(app)  # параметры пула нужны до создания движка
     db.init_app(app)
+    db_tuning.install(app, db)
+    # Первым среди before/after_request: замер охватывает остальные обработчики
+    instrumentation.init_app(app)
+    metrics.init_app(app)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Пожалуйста, войдите для доступа к этой странице.'
     login_manager.login_message_category = 'info'
     migrate.init_app(app, db)
     csrf.init_app(app)  # Инициализация CSRF защиты
+    page_cache.init_app(app)
+    user_cache.init_app(app)
+    password_policy.init_app(app)
+    rate_limiter.init_app(app)
+    pdf_exporter.init_app(app)
+    assets.init_app(app)
+    app.after_request(compress_html)
 
     # Регистрация blueprint'ов
     register_blueprints(app)
@@ -71,9 +116,11 @@ def register_blueprints(app):
     """Регистрация всех blueprint'ов приложения"""
     from app.routes import main
     from app.auth import auth_bp
+    from app.api import api
 
     app.register_blueprint(main)
     app.register_blueprint(auth_bp)
+    app.register_blueprint(api)
 
 
 def register_error_handlers(app):
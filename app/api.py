@@ -0,0 +1,170 @@
+"""Версионированный JSON API только для чтения (/api/v1).
+
+Сетка уроков отдается в колоночном виде: словарь уникальных предметов
+(название, цвет, шрифт) и параллельные массивы индексов ячеек вместо
+повторения свойств предмета в каждой ячейке. Параметр ``fields`` оставляет
+в ответе только нужные части, ответ сжимается brotli или gzip по
+заголовку Accept-Encoding.
+
+Доступ - по сессии владельца или по токену API (``?token=``, выдается на
+странице профиля) для киосков и мобильных клиентов без cookie. Токен
+подписан отдельно от токена календаря: ссылка подписки, которая по
+назначению передается сторонним сервисам, не дает доступа к API. Оба
+токена отзываются сменой секрета пользователя (User.rotate_feed_secret).
+"""
+import json
+
+from flask import Blueprint, current_app, jsonify, request
+from flask_login import current_user
+from app import db
+from app.calendar_feed import secret_matches, sign_user_token, user_token_claims
+from app.compression import compress_response, negotiate_encoding
+from app.http_cache import is_not_modified, not_modified_response, schedule_validators, set_validators
+from app.lesson_times import lesson_slots
+from app.lesson_store import lesson_grid_select
+from app.loading import schedule_options
+from app.models import Schedule, User
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+API_TOKEN_SALT = 'api-v1'
+
+# Части ответа, доступные для выбора через ?fields=
+SCHEDULE_FIELDS = ('title', 'version', 'updated_at', 'days', 'times', 'subjects', 'lessons', 'links')
+
+
+def api_error(message, status):
+    return jsonify({'error': message}), status
+
+
+def api_token(user):
+    """Токен доступа к API пользователя"""
+    return sign_user_token(user, API_TOKEN_SALT)
+
+
+def api_token_claims(token):
+    """(id пользователя, секрет) из токена API или None"""
+    return user_token_claims(token, API_TOKEN_SALT)
+
+
+def request_user_id():
+    """id пользователя по токену API запроса или сессии"""
+    token = request.args.get('token')
+    if token:
+        claims = api_token_claims(token)
+        if claims is None:
+            return None
+        user = db.session.get(User, claims[0])
+        return user.id if secret_matches(user, claims[1]) else None
+    return current_user.id if current_user.is_authenticated else None
+
+
+def parse_fields(value):
+    """Набор запрошенных полей (None - неизвестное поле)"""
+    if not value:
+        return SCHEDULE_FIELDS
+    requested = {part.strip() for part in value.split(',') if part.strip()}
+    if not requested or requested - set(SCHEDULE_FIELDS):
+        return None
+    return tuple(field for field in SCHEDULE_FIELDS if field in requested)
+
+
+def lesson_columns(rows):
+    """Колоночное представление сетки из строк lesson_grid_select: (subjects, lessons, links)"""
+    subjects = {'name': [], 'color': [], 'font': []}
+    lessons = {'day': [], 'lesson': [], 'subject': []}
+    links = {'cell': [], 'url': [], 'text': []}
+    subject_ids = {}
+
+    for row in rows:
+        subject = (row.subject_name or '', row.color or '#FFFFFF', row.font_family or '')
+        subject_id = subject_ids.get(subject)
+        if subject_id is None:
+            subject_id = subject_ids[subject] = len(subject_ids)
+            subjects['name'].append(subject[0])
+            subjects['color'].append(subject[1])
+            subjects['font'].append(subject[2])
+
+        if row.lesson_link:
+            links['cell'].append(len(lessons['day']))
+            links['url'].append(row.lesson_link)
+            links['text'].append(row.link_text or '')
+
+        lessons['day'].append(row.day_index)
+        lessons['lesson'].append(row.lesson_index)
+        lessons['subject'].append(subject_id)
+
+    return subjects, lessons, links
+
+
+def build_schedule_payload(schedule, fields, rows=None):
+    """Словарь ответа с выбранными полями; строки уроков загружаются, если не переданы"""
+    payload = {'id': schedule.id}
+    if 'title' in fields:
+        payload['title'] = schedule.title
+    if 'version' in fields:
+        payload['version'] = schedule.version
+    if 'updated_at' in fields:
+        payload['updated_at'] = schedule.updated_at.isoformat() if schedule.updated_at else None
+    if 'days' in fields:
+        payload['days'] = list(schedule.day_codes)
+    if 'times' in fields:
+        try:
+            slots = lesson_slots(schedule.start_time, schedule.end_time)
+        except (TypeError, ValueError):
+            slots = ()
+        payload['times'] = [[slot['start'], slot['end']] for slot in slots][:schedule.lessons_per_day]
+
+    if {'subjects', 'lessons', 'links'} & set(fields):
+        if rows is None:
+            rows = db.session.execute(lesson_grid_select(schedule.id))
+        subjects, lessons, links = lesson_columns(rows)
+        if 'subjects' in fields:
+            payload['subjects'] = subjects
+        if 'lessons' in fields:
+            payload['lessons'] = lessons
+        if 'links' in fields:
+            payload['links'] = links
+    return payload
+
+
+@api.route('/schedules/<int:schedule_id>')
+def get_schedule(schedule_id):
+    """Расписание в компактном колоночном формате"""
+    user_id = request_user_id()
+    if user_id is None:
+        return api_error('Требуется авторизация', 401)
+
+    fields = parse_fields(request.args.get('fields'))
+    if fields is None:
+        return api_error(f"Допустимые поля: {', '.join(SCHEDULE_FIELDS)}", 400)
+
+    schedule = db.session.get(Schedule, schedule_id, options=schedule_options('view'))
+    if schedule is None or schedule.user_id != user_id:
+        return api_error('Расписание не найдено', 404)
+
+    return schedule_api_response(schedule, fields)
+
+
+def schedule_api_validators(schedule, fields):
+    """(encoding, etag, last_modified) ответа API для текущего запроса"""
+    # Кодировка выбирается до проверки валидатора: у каждого варианта свой ETag
+    encoding = negotiate_encoding(request.accept_encodings)
+    return (encoding, *schedule_validators(schedule, 'api', *fields, encoding, html=False))
+
+
+def schedule_api_response(schedule, fields, rows=None):
+    """Ответ API с условным GET и сжатием (общий для WSGI и ASGI)"""
+    encoding, etag, last_modified = schedule_api_validators(schedule, fields)
+    if is_not_modified(etag, last_modified):
+        return _vary(not_modified_response(etag, last_modified))
+
+    body = json.dumps(build_schedule_payload(schedule, fields, rows),
+                      ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    response = compress_response(current_app.response_class(body, mimetype='application/json'), encoding)
+    return _vary(set_validators(response, etag, last_modified))
+
+
+def _vary(response):
+    response.vary.add('Accept-Encoding')
+    return response
@@ -0,0 +1,219 @@
+"""ASGI-режим для маршрутов чтения.
+
+Просмотр расписания, JSON API и /health обрабатываются асинхронно: данные
+читаются через асинхронный движок SQLAlchemy, поэтому медленный клиент не
+занимает поток. Шаблоны, кэш страниц, заголовки и after_request-обработчики
+те же, что у Flask-приложения: ответ собирается в его контексте запроса,
+а синхронная часть (рендеринг, кэш страниц, сжатие) выполняется в пуле
+потоков asyncio, чтобы не останавливать цикл событий.
+Все остальные адреса, а также случаи, требующие редиректа и flash-сообщения
+(нет входа, чужое расписание), передаются обычному Flask-приложению через
+WSGI-адаптер с пулом потоков.
+
+    uvicorn asgi:app --workers 4
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+
+Настройки: ``ASYNC_DATABASE_URL`` (см. app.async_db) и ``ASGI_WSGI_THREADS`` -
+потоков для маршрутов, обрабатываемых синхронно.
+"""
+import asyncio
+import re
+import time
+
+from a2wsgi import WSGIMiddleware
+from flask import g, request, session
+from sqlalchemy import text
+from werkzeug.datastructures import Headers
+from werkzeug.test import EnvironBuilder
+
+from app import page_cache
+from app.api import (SCHEDULE_FIELDS, api_error, api_token_claims, parse_fields, schedule_api_response,
+                     schedule_api_validators)
+from app.async_db import AsyncDatabase
+from app.calendar_feed import secret_matches
+from app.health import health_response
+from app.http_cache import is_not_modified
+from app.lesson_store import lesson_grid_select
+from app.loading import schedule_options
+from app.models import Schedule, User
+from app.page_cache import schedule_stamp
+from app.routes import schedule_view_response, view_render_mode, view_schedule_cache_key
+
+
+def _session_user_id():
+    """id пользователя из сессии Flask-Login без обращения к базе"""
+    user_id = session.get('_user_id')
+    return int(user_id) if user_id is not None and str(user_id).isdigit() else None
+
+
+async def view_schedule(asgi_app, schedule_id):
+    user_id = _session_user_id()
+    if user_id is None:
+        return None
+
+    async with asgi_app.async_db.session() as db_session:
+        user = await db_session.get(User, user_id)
+        schedule = await db_session.get(Schedule, schedule_id, options=schedule_options('view'))
+        if user is None or schedule is None or schedule.user_id != user.id:
+            return None
+
+        rows = None
+        cache_key = view_schedule_cache_key(schedule.id, view_render_mode())
+        if not page_cache.has(cache_key, schedule_stamp(schedule)):
+            rows = (await db_session.execute(lesson_grid_select(schedule.id))).all()
+
+    # Пользователь уже загружен: Flask-Login не будет читать его синхронно
+    g._login_user = user
+    # Рендеринг шаблона и работа с кэшем страниц - в потоке, не в цикле событий
+    return await asyncio.to_thread(schedule_view_response, schedule, rows)
+
+
+async def api_schedule(asgi_app, schedule_id):
+    token = request.args.get('token')
+    claims = api_token_claims(token) if token else None
+    user_id = claims[0] if claims is not None else (None if token else _session_user_id())
+    if user_id is None:
+        return api_error('Требуется авторизация', 401)
+
+    fields = parse_fields(request.args.get('fields'))
+    if fields is None:
+        return api_error(f"Допустимые поля: {', '.join(SCHEDULE_FIELDS)}", 400)
+
+    async with asgi_app.async_db.session() as db_session:
+        # Токен действует, пока пользователь не сменил секрет
+        if claims is not None and not secret_matches(await db_session.get(User, user_id), claims[1]):
+            return api_error('Требуется авторизация', 401)
+
+        schedule = await db_session.get(Schedule, schedule_id, options=schedule_options('view'))
+        if schedule is None or schedule.user_id != user_id:
+            return api_error('Расписание не найдено', 404)
+
+        rows = None
+        _, etag, last_modified = schedule_api_validators(schedule, fields)
+        if not is_not_modified(etag, last_modified) and {'subjects', 'lessons', 'links'} & set(fields):
+            rows = (await db_session.execute(lesson_grid_select(schedule.id))).all()
+
+    return await asyncio.to_thread(schedule_api_response, schedule, fields, rows)
+
+
+async def ping_database(engine):
+    async with engine.connect() as connection:
+        await connection.execute(text('SELECT 1'))
+
+
+async def health(asgi_app):
+    timeout = asgi_app.flask_app.config['HEALTH_DB_TIMEOUT']
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(ping_database(asgi_app.async_db.engine), timeout)
+    except asyncio.TimeoutError:
+        database = {'status': 'error', 'error': f'timeout after {timeout}s'}
+    except Exception as e:
+        database = {'status': 'error', 'error': str(e)}
+    else:
+        database = {'status': 'ok', 'latency_ms': round((time.perf_counter() - started) * 1000, 2)}
+    return health_response({'database': database})
+
+
+# Маршруты, обрабатываемые асинхронно; остальное отдается Flask
+ASYNC_ROUTES = (
+    (re.compile(r'/schedule/(?P<schedule_id>\d+)/view'), view_schedule),
+    (re.compile(r'/api/v1/schedules/(?P<schedule_id>\d+)'), api_schedule),
+    (re.compile(r'/health'), health),
+)
+
+
+def build_environ(scope):
+    """WSGI environ из ASGI scope (запрос без тела)"""
+    headers = Headers([(name.decode('latin-1'), value.decode('latin-1')) for name, value in scope['headers']])
+    host = headers.get('Host')
+    if host is None and scope.get('server'):
+        host = '%s:%s' % tuple(scope['server'])
+    environ = EnvironBuilder(
+        path=scope['path'],
+        base_url=f"{scope.get('scheme', 'http')}://{host or 'localhost'}{scope.get('root_path', '')}",
+        query_string=scope['query_string'].decode('latin-1'),
+        method=scope['method'],
+        headers=headers,
+    ).get_environ()
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    return environ
+
+
+class AsyncReadApp:
+    """ASGI-приложение: асинхронные маршруты чтения поверх Flask-приложения"""
+
+    def __init__(self, flask_app, async_db):
+        self.flask_app = flask_app
+        self.async_db = async_db
+        self.wsgi = WSGIMiddleware(flask_app, workers=flask_app.config['ASGI_WSGI_THREADS'])
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+
+        if scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD'):
+            for pattern, handler in ASYNC_ROUTES:
+                match = pattern.fullmatch(scope['path'])
+                if match:
+                    response = await self.handle(handler, scope, match.groupdict())
+                    if response is not None:
+                        return await self.send_response(response, scope, send)
+                    break
+
+        await self.wsgi(scope, receive, send)
+
+    async def handle(self, handler, scope, params):
+        """Ответ Flask для асинхронного обработчика или None, если обработчик вернул None.
+
+        None - единственный сигнал передать запрос Flask: исключение обработчика
+        превращается в ответ об ошибке, как в Flask, и запрос не выполняется повторно.
+        """
+        environ = build_environ(scope)
+        ctx = self.flask_app.request_context(environ)
+        ctx.push()
+        try:
+            try:
+                # before_request-обработчики (замеры, CSRF) как у обычного запроса
+                rv = self.flask_app.preprocess_request()
+                if rv is None:
+                    rv = await handler(self, **{name: int(value) for name, value in params.items()})
+                if rv is None:
+                    return None
+            except Exception as e:
+                # HTTP-ошибки (abort) - через обработчики ошибок приложения
+                rv = self.flask_app.handle_user_exception(e)
+            # after_request-обработчики (сжатие HTML и др.) тоже в потоке
+            return await asyncio.to_thread(self.flask_app.finalize_request, rv)
+        except Exception as e:
+            # Журнал и ответ 500, как для необработанной ошибки во Flask
+            return self.flask_app.handle_exception(e)
+        finally:
+            ctx.pop()
+
+    async def send_response(self, response, scope, send):
+        headers = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                   for name, value in response.headers.items()]
+        await send({'type': 'http.response.start', 'status': response.status_code, 'headers': headers})
+        body = response.get_data() if scope['method'] != 'HEAD' else b''
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.async_db.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def create_asgi_app(flask_app=None):
+    """ASGI-приложение поверх create_app()"""
+    if flask_app is None:
+        from app import create_app
+
+        flask_app = create_app()
+    return AsyncReadApp(flask_app, AsyncDatabase(flask_app))
@@ -0,0 +1,179 @@
+"""Сборка статических файлов: минификация, отпечатки содержимого и предсжатие.
+
+Команда ``flask assets build`` минифицирует ``static/css/*.css`` и
+``static/js/*.js``, добавляет к имени файла хэш содержимого и кладет
+результат в ``static/dist`` вместе с вариантами ``.gz`` (и ``.br``, если
+установлен пакет brotli) и манифестом ``manifest.json``. Шаблоны получают
+адреса через ``asset_url('css/style.css')``: при наличии манифеста это
+файл с отпечатком, который отдается с ``Cache-Control: immutable``, без
+манифеста (в разработке) - исходный файл из ``static``.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+
+import click
+from flask import request, send_from_directory, url_for
+from flask.cli import AppGroup
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен
+    brotli = None
+
+# Каталоги static, которые проходят сборку, и расширения их файлов
+ASSET_DIRS = {'css': '.css', 'js': '.js'}
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+# Имя файла меняется вместе с содержимым, поэтому кэшировать его можно навсегда
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Предсжатые варианты в порядке предпочтения
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_CSS_SPACE = re.compile(r'\s+')
+_CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+
+
+def minify_css(text):
+    """Убирает комментарии и лишние пробелы из CSS"""
+    text = _CSS_COMMENT.sub('', text)
+    text = _CSS_SPACE.sub(' ', text)
+    text = _CSS_PUNCTUATION.sub(r'\1', text)
+    # Пробел после двоеточия не нужен в объявлениях, но значим в селекторах
+    # вида "a :hover", поэтому убирается только после ":"
+    text = re.sub(r':\s+', ':', text)
+    return text.replace(';}', '}').strip()
+
+
+def minify_js(text):
+    """Минификация JS пакетом rjsmin; без него файл не изменяется.
+
+    Построчная обработка без разбора JS портила бы шаблонные строки и
+    многострочные литералы (отступы и строки с "//" внутри них - это
+    содержимое), а сжатие gzip/brotli и так убирает большую часть
+    избыточности.
+    """
+    try:
+        import rjsmin
+    except ImportError:
+        return text
+    return rjsmin.jsmin(text)
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def fingerprint(filename, data):
+    """Имя файла с хэшем содержимого: style.css -> style.1a2b3c4d5e6f.css"""
+    stem, extension = os.path.splitext(filename)
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    return f'{stem}.{digest}{extension}'
+
+
+def _write(path, data):
+    with open(path, 'wb') as asset_file:
+        asset_file.write(data)
+
+
+def build_assets(static_folder):
+    """Собирает static/dist и возвращает манифест {исходный путь: путь в static}"""
+    dist_folder = os.path.join(static_folder, DIST_DIR)
+    shutil.rmtree(dist_folder, ignore_errors=True)
+
+    manifest = {}
+    for directory, extension in ASSET_DIRS.items():
+        source_folder = os.path.join(static_folder, directory)
+        if not os.path.isdir(source_folder):
+            continue
+        os.makedirs(os.path.join(dist_folder, directory))
+
+        for filename in sorted(os.listdir(source_folder)):
+            if not filename.endswith(extension):
+                continue
+            with open(os.path.join(source_folder, filename), encoding='utf-8') as source_file:
+                data = MINIFIERS[extension](source_file.read()).encode('utf-8')
+
+            built_name = f'{directory}/{fingerprint(filename, data)}'
+            built_path = os.path.join(dist_folder, built_name)
+            _write(built_path, data)
+            _write(built_path + '.gz', gzip.compress(data, compresslevel=9, mtime=0))
+            if brotli is not None:
+                _write(built_path + '.br', brotli.compress(data, quality=11))
+
+            manifest[f'{directory}/{filename}'] = f'{DIST_DIR}/{built_name}'
+
+    with open(os.path.join(dist_folder, MANIFEST_NAME), 'w', encoding='utf-8') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    return manifest
+
+
+assets_cli = AppGroup('assets', help='Сборка статических файлов')
+
+
+@assets_cli.command('build')
+def build_command():
+    """Минифицирует, снабжает отпечатками и предсжимает CSS/JS"""
+    from flask import current_app
+
+    manifest = build_assets(current_app.static_folder)
+    current_app.extensions['assets'].load_manifest()
+    click.echo(f'Собрано файлов: {len(manifest)}')
+
+
+class Assets:
+    """Адреса собранных файлов для шаблонов и их раздача с предсжатием"""
+
+    def __init__(self, app=None):
+        self.manifest = {}
+        self.static_folder = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.static_folder = app.static_folder
+        self.load_manifest()
+
+        app.add_template_global(self.url, 'asset_url')
+        app.add_url_rule(f'{app.static_url_path}/{DIST_DIR}/<path:filename>', 'assets', self.send_asset)
+        app.cli.add_command(assets_cli)
+        app.extensions['assets'] = self
+
+    def load_manifest(self):
+        path = os.path.join(self.static_folder, DIST_DIR, MANIFEST_NAME)
+        try:
+            with open(path, encoding='utf-8') as manifest_file:
+                self.manifest = json.load(manifest_file)
+        except FileNotFoundError:
+            self.manifest = {}
+
+    def url(self, filename):
+        """Адрес файла static: собранный вариант, если он есть в манифесте"""
+        built = self.manifest.get(filename)
+        if built is None:
+            return url_for('static', filename=filename)
+        return url_for('assets', filename=built[len(DIST_DIR) + 1:])
+
+    def send_asset(self, filename):
+        """Отдает собранный файл, по возможности предсжатый"""
+        directory = os.path.join(self.static_folder, DIST_DIR)
+        mimetype = mimetypes.guess_type(filename)[0]
+        accept_encodings = request.accept_encodings
+
+        for encoding, suffix in PRECOMPRESSED:
+            if accept_encodings[encoding] and os.path.isfile(os.path.join(directory, filename + suffix)):
+                response = send_from_directory(directory, filename + suffix, mimetype=mimetype)
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(directory, filename, mimetype=mimetype)
+
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        response.vary.add('Accept-Encoding')
+        return response
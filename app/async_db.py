@@ -0,0 +1,74 @@
+"""Асинхронный движок SQLAlchemy для ASGI-режима.
+
+Адрес берется из ``ASYNC_DATABASE_URL`` или выводится из адреса основной
+базы с заменой драйвера: SQLite -> aiosqlite, PostgreSQL -> asyncpg.
+Движок создается при первом обращении, то есть уже в процессе воркера.
+"""
+from sqlalchemy.engine import make_url
+
+# Асинхронные драйверы для синхронных диалектов
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+    'mysql': 'mysql+aiomysql',
+}
+
+
+def async_database_url(url):
+    """Адрес базы с асинхронным драйвером"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'Нет асинхронного драйвера для {backend}')
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+class AsyncDatabase:
+    """Асинхронные сессии к той же базе, что и у Flask-SQLAlchemy"""
+
+    def __init__(self, app=None):
+        self.url = None
+        self.pragmas = {}
+        self._engine = None
+        self._sessionmaker = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        from app import db
+
+        url = app.config.get('ASYNC_DATABASE_URL')
+        if url is None:
+            # Flask-SQLAlchemy приводит относительный путь SQLite к instance/,
+            # поэтому берется адрес уже созданного синхронного движка
+            with app.app_context():
+                url = async_database_url(db.engine.url)
+        self.url = make_url(url)
+        tuning = app.extensions.get('db_tuning')
+        self.pragmas = tuning.pragmas if tuning is not None else {}
+        app.extensions['async_db'] = self
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            from sqlalchemy.ext.asyncio import create_async_engine
+
+            from app.db_tuning import install_sqlite_pragmas
+
+            self._engine = create_async_engine(self.url, pool_pre_ping=True)
+            install_sqlite_pragmas(self._engine.sync_engine, self.pragmas)
+        return self._engine
+
+    def session(self):
+        """Новая асинхронная сессия (использовать как async with)"""
+        if self._sessionmaker is None:
+            from sqlalchemy.ext.asyncio import async_sessionmaker
+
+            self._sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+        return self._sessionmaker()
+
+    async def dispose(self):
+        if self._engine is not None:
+            await self._engine.dispose()
+            self._engine = None
+            self._sessionmaker = None
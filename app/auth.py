@@ -1,44 +1,100 @@
-from flask import Blueprint, render_template, redirect, url_for, flash
+"""Вход, регистрация и выход.
+
+Попытки входа и регистрации ограничиваются корзинами токенов
+(app/rate_limit.py) до проверки пароля, поэтому перебор не занимает
+процессор хешированием. Корзина аккаунта (имя пользователя и адрес)
+расходуется только неудачными попытками: чужие ошибки с других адресов
+не блокируют вход владельцу. Занятость имени и email проверяется одним запросом;
+гонку двух одновременных регистраций ловят уникальные индексы таблицы.
+"""
+import math
+
+from flask import Blueprint, render_template, redirect, url_for, flash, request, make_response
 from flask_login import login_user, logout_user, login_required
-from app import db
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
+
+from app import db, rate_limiter
 from app.forms import LoginForm, RegistrationForm
-from app.models import User  # ← Теперь импортируем здесь
+from app.models import User
 
 auth_bp = Blueprint('auth', __name__)
 
 
+def too_many_attempts(template, form, retry_after):
+    """Ответ 429 с формой и временем до следующей попытки"""
+    seconds = math.ceil(retry_after)
+    flash(f'Слишком много попыток. Повторите через {seconds} с.', 'danger')
+    response = make_response(render_template(template, form=form), 429)
+    response.headers['Retry-After'] = str(seconds)
+    return response
+
+
+def registration_conflict(username, email):
+    """Сообщение о занятом имени пользователя или email (None, если оба свободны)"""
+    taken = db.session.execute(
+        select(User.username, User.email)
+        .where(or_(User.username == username, User.email == email))
+        .limit(2)
+    ).all()
+    if any(row.username == username for row in taken):
+        return 'Это имя пользователя уже занято.'
+    if taken:
+        return 'Этот email уже используется.'
+    return None
+
+
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def login():
+    """Вход в систему"""
     form = LoginForm()
     if form.validate_on_submit():
+        account_key = (form.username.data.lower(), request.remote_addr)
+        retry_after = (rate_limiter.hit('login', request.remote_addr)
+                       or rate_limiter.retry_after('login_username', account_key))
+        if retry_after:
+            return too_many_attempts('login.html', form, retry_after)
+
         user = User.query.filter_by(username=form.username.data).first()
         if user and user.check_password(form.password.data):
+            # Хеш, созданный прежней политикой, заменяется при входе
+            if user.rehash_password_if_needed(form.password.data):
+                db.session.commit()
             login_user(user)
             flash('Вы успешно вошли в систему!', 'success')
-            return redirect(url_for('main.index'))
+            return redirect(url_for('main.dashboard'))
         else:
+            rate_limiter.hit('login_username', account_key)
             flash('Неверное имя пользователя или пароль.', 'danger')
     return render_template('login.html', form=form)
 
+
 @auth_bp.route('/register', methods=['GET', 'POST'])
 def register():
+    """Регистрация нового пользователя"""
     form = RegistrationForm()
     if form.validate_on_submit():
-        # Валидация username
-        if User.query.filter_by(username=form.username.data).first():
-            flash('Это имя пользователя уже занято.', 'danger')
-            return render_template('register.html', form=form)
+        retry_after = rate_limiter.hit('register', request.remote_addr)
+        if retry_after:
+            return too_many_attempts('register.html', form, retry_after)
 
-        # Валидация email
-        if User.query.filter_by(email=form.email.data).first():
-            flash('Этот email уже используется.', 'danger')
+        conflict = registration_conflict(form.username.data, form.email.data)
+        if conflict:
+            flash(conflict, 'danger')
             return render_template('register.html', form=form)
 
         # Создание пользователя
         user = User(username=form.username.data, email=form.email.data)
         user.set_password(form.password.data)
         db.session.add(user)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Имя или email заняли между проверкой и вставкой
+            db.session.rollback()
+            flash(registration_conflict(form.username.data, form.email.data)
+                  or 'Не удалось зарегистрироваться, попробуйте еще раз.', 'danger')
+            return render_template('register.html', form=form)
 
         flash('Регистрация прошла успешно! Теперь вы можете войти.', 'success')
         return redirect(url_for('auth.login'))
@@ -49,6 +105,7 @@ def register():
 @auth_bp.route('/logout')
 @login_required
 def logout():
+    """Выход из системы"""
     logout_user()
     flash('Вы вышли из системы.', 'info')
-    return redirect(url_for('auth.login'))
\ No newline at end of file
+    return redirect(url_for('main.index'))
@@ -0,0 +1,140 @@
+"""Потоковая выгрузка всех расписаний пользователя одним ZIP-архивом.
+
+Архив пишется в поток без перемотки (ZipFile сам добавляет дескрипторы
+данных), и после каждого файла накопленные байты отдаются клиенту.
+Рендеринг выполняется в пуле процессов PdfExporter; одновременно в работе
+находится не больше ``window`` расписаний, поэтому память не растет с их
+количеством. Расписания читаются пакетами по ``window`` вместе с уроками
+(профиль загрузки ``export``): два запроса на пакет вместо двух на расписание.
+"""
+import re
+import zipfile
+from collections import deque
+
+from sqlalchemy import select
+
+from app import db
+from app.csv_export import render_schedule_csv
+from app.ics_export import render_schedule_ics
+from app.lesson_store import lesson_map
+from app.loading import load_schedules
+from app.models import Schedule
+from app.pdf_export import render_schedule_pdf
+from app.schedule_document import build_schedule_document
+
+EXPORT_FORMATS = ('pdf', 'csv', 'ics')
+
+_UNSAFE_FILENAME_CHARS = re.compile(r'[\\/:*?"<>|\x00-\x1f]+')
+
+
+def parse_formats(value):
+    """Форматы из строки вида "pdf,csv" (неизвестные отбрасываются, пустая строка - все)"""
+    if not value:
+        return EXPORT_FORMATS
+    requested = {part.strip().lower() for part in value.split(',')}
+    return tuple(fmt for fmt in EXPORT_FORMATS if fmt in requested)
+
+
+def archive_filename(document, extension):
+    """Имя файла в архиве; id в имени исключает совпадения одинаковых названий"""
+    title = _UNSAFE_FILENAME_CHARS.sub('_', document['title']).strip(' .') or 'Расписание'
+    return f"{title[:80]} ({document['id']}).{extension}"
+
+
+def render_schedule_files(document, formats, font_path=None):
+    """Рендерит файлы одного расписания (выполняется в процессе пула)"""
+    renderers = {
+        'pdf': lambda: render_schedule_pdf(document, font_path),
+        'csv': lambda: render_schedule_csv(document),
+        'ics': lambda: render_schedule_ics(document),
+    }
+    return {fmt: renderers[fmt]() for fmt in formats}
+
+
+def user_schedule_ids(user_id):
+    """id расписаний пользователя в порядке дашборда"""
+    return db.session.scalars(
+        select(Schedule.id)
+        .where(Schedule.user_id == user_id)
+        .order_by(Schedule.created_at.desc().nulls_last(), Schedule.id.desc())
+    ).all()
+
+
+class _StreamBuffer:
+    """Файловый объект только для записи: ZipFile пишет, генератор забирает байты"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_schedules_zip(schedule_ids, exporter, formats=EXPORT_FORMATS, window=None):
+    """Генератор байтов ZIP-архива с файлами расписаний.
+
+    Расписания и уроки загружаются пакетами по мере продвижения окна, PDF
+    из дискового кэша PdfExporter используются повторно, а свежие PDF
+    сохраняются в кэш для последующих выгрузок.
+    """
+    window = window or max(2, exporter.workers * 2)
+    buffer = _StreamBuffer()
+    pending = deque()
+
+    def submit(schedule):
+        document = build_schedule_document(schedule, lesson_map(schedule.lessons))
+        pdf_path = exporter.cache_path(schedule)
+
+        cached_pdf = None
+        if 'pdf' in formats and exporter.cached(schedule):
+            try:
+                with open(pdf_path, 'rb') as pdf_file:
+                    cached_pdf = pdf_file.read()
+            except OSError:
+                pass  # файл заменен новой версией - отрендерим заново
+
+        to_render = tuple(fmt for fmt in formats if fmt != 'pdf' or cached_pdf is None)
+        future = exporter.submit(render_schedule_files, document, to_render, exporter.font_path)
+        pending.append((document, pdf_path, cached_pdf, future))
+
+    def write_oldest(archive):
+        document, pdf_path, cached_pdf, future = pending.popleft()
+        files = future.result(timeout=exporter.timeout)
+        if cached_pdf is not None:
+            files['pdf'] = cached_pdf
+        elif 'pdf' in files:
+            exporter.store(document['id'], pdf_path, files['pdf'])
+
+        for fmt in formats:
+            archive.writestr(archive_filename(document, fmt), files[fmt])
+
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        try:
+            for start in range(0, len(schedule_ids), window):
+                # Удаленные во время выгрузки расписания просто не загрузятся
+                for schedule in load_schedules(schedule_ids[start:start + window], 'export'):
+                    submit(schedule)
+                    # Документ собран: расписание и уроки больше не нужны сессии
+                    db.session.expunge(schedule)
+                    if len(pending) >= window:
+                        write_oldest(archive)
+                        yield buffer.take()
+
+            while pending:
+                write_oldest(archive)
+                yield buffer.take()
+        finally:
+            # Клиент оборвал загрузку - оставшиеся задачи больше не нужны
+            for _, _, _, future in pending:
+                future.cancel()
+
+    yield buffer.take()
@@ -0,0 +1,136 @@
+"""Подписка на расписания в формате iCalendar.
+
+Календарные клиенты опрашивают ленту без cookie сессии, поэтому ссылка
+подписки содержит подписанный токен: id пользователя и его feed_secret.
+Ссылка уходит сторонним сервисам (Google Calendar), поэтому пользователь
+может отозвать ее, сменив секрет (User.rotate_feed_secret). Блок событий каждого
+расписания кэшируется в page_cache со штампом версии, так что лента
+пользователя пересобирается только из изменившихся расписаний, а ETag
+ленты вычисляется без загрузки уроков.
+"""
+import hashlib
+import hmac
+from datetime import timezone
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import select
+
+from app import db, page_cache
+from app.ics_export import render_events, wrap_calendar
+from app.lesson_store import load_lesson_maps
+from app.loading import schedule_options
+from app.models import Schedule, User
+from app.page_cache import schedule_stamp
+from app.schedule_document import build_schedule_document
+
+FEED_TOKEN_SALT = 'calendar-feed'
+
+
+def _serializer(salt=FEED_TOKEN_SALT):
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt=salt)
+
+
+def sign_user_token(user, salt):
+    """Подписанный токен [id, feed_secret]; salt задает назначение токена"""
+    return _serializer(salt).dumps([user.id, user.feed_secret])
+
+
+def user_token_claims(token, salt):
+    """(id пользователя, секрет) из подписи токена или None; секрет еще нужно сверить с базой"""
+    try:
+        claims = _serializer(salt).loads(token)
+    except BadSignature:
+        return None
+    if (not isinstance(claims, list) or len(claims) != 2
+            or not isinstance(claims[0], int) or not isinstance(claims[1], str)):
+        return None
+    return claims[0], claims[1]
+
+
+def feed_token(user):
+    """Токен для ссылок подписки пользователя (действует только для лент iCalendar)"""
+    return sign_user_token(user, FEED_TOKEN_SALT)
+
+
+def feed_claims(token):
+    return user_token_claims(token, FEED_TOKEN_SALT)
+
+
+def secret_matches(user, secret):
+    return user is not None and hmac.compare_digest(user.feed_secret or '', secret)
+
+
+def user_from_token(token):
+    """Пользователь действующего токена подписки или None"""
+    claims = feed_claims(token)
+    if claims is None:
+        return None
+    user = db.session.get(User, claims[0])
+    return user if secret_matches(user, claims[1]) else None
+
+
+def token_schedule(token, schedule_id, options=()):
+    """Расписание владельца токена одним запросом или None для чужого расписания и отозванного токена"""
+    claims = feed_claims(token)
+    if claims is None:
+        return None
+    user_id, secret = claims
+    row = db.session.execute(
+        select(Schedule, User.feed_secret)
+        .join(User, User.id == Schedule.user_id)
+        .where(Schedule.id == schedule_id, Schedule.user_id == user_id)
+        .options(*options)
+    ).first()
+    if row is None or not hmac.compare_digest(row.feed_secret or '', secret):
+        return None
+    return row.Schedule
+
+
+def events_cache_key(schedule_id):
+    return f'ics_events:{schedule_id}'
+
+
+def schedule_events_blocks(schedules):
+    """Блоки VEVENT расписаний: из кэша или свежие для изменившихся расписаний.
+
+    Уроки всех расписаний, которых нет в кэше, читаются одним запросом.
+    """
+    stamps = [schedule_stamp(schedule) for schedule in schedules]
+    blocks = [page_cache.get(events_cache_key(schedule.id), stamp)
+              for schedule, stamp in zip(schedules, stamps)]
+
+    missing = [index for index, block in enumerate(blocks) if block is None]
+    if missing:
+        lesson_maps = load_lesson_maps([schedules[index].id for index in missing])
+        for index in missing:
+            schedule = schedules[index]
+            blocks[index] = render_events(build_schedule_document(schedule, lesson_maps[schedule.id]))
+            page_cache.set(events_cache_key(schedule.id), stamps[index], blocks[index])
+    return blocks
+
+
+def feed_validators(schedules):
+    """(etag, last_modified) ленты из штампов версий входящих в нее расписаний"""
+    raw = '|'.join(f'{schedule.id}:{schedule_stamp(schedule)}:{schedule.title}' for schedule in schedules)
+    etag = hashlib.sha1(f'ics|{raw}'.encode('utf-8')).hexdigest()
+
+    last_modified = max((s.updated_at for s in schedules if s.updated_at is not None), default=None)
+    if last_modified is not None and last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return etag, last_modified
+
+
+def user_feed_schedules(user_id):
+    """Расписания пользователя для общей ленты (без уроков)"""
+    return db.session.scalars(
+        select(Schedule)
+        .where(Schedule.user_id == user_id)
+        .order_by(Schedule.created_at, Schedule.id)
+        .options(*schedule_options('feed'))
+    ).all()
+
+
+def render_feed(schedules, name):
+    """Лента iCalendar из блоков событий расписаний"""
+    return wrap_calendar(schedule_events_blocks(schedules), name)
@@ -0,0 +1,72 @@
+"""Сжатие ответов с выбором кодировки по заголовку Accept-Encoding.
+
+Brotli используется, если установлен пакет ``brotli``; иначе доступен
+только gzip. Маленькие ответы не сжимаются - заголовки и словарь сжатия
+съели бы весь выигрыш.
+"""
+import gzip
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен
+    brotli = None
+
+# Ответы меньше этого размера отдаются без сжатия
+MIN_COMPRESS_SIZE = 512
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def available_encodings():
+    """Поддерживаемые кодировки в порядке предпочтения сервера"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encodings):
+    """Лучшая кодировка по заголовку Accept-Encoding или None"""
+    # При равном весе у клиента выигрывает первая кодировка в списке сервера
+    return accept_encodings.best_match(available_encodings())
+
+
+def compress(data, encoding):
+    """Сжимает байты указанной кодировкой ('br' или 'gzip')"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f'Неизвестная кодировка: {encoding}')
+
+
+def compress_response(response, encoding):
+    """Сжимает тело готового ответа, если кодировка выбрана и ответ не слишком мал"""
+    if encoding is None or response.direct_passthrough:
+        return response
+    data = response.get_data()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return response
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def compress_html(response):
+    """after_request-обработчик: сжатие HTML-страниц (настройка COMPRESS_HTML)"""
+    if (not current_app.config.get('COMPRESS_HTML', True)
+            or response.mimetype != 'text/html'
+            or response.status_code != 200
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    compress_response(response, negotiate_encoding(request.accept_encodings))
+
+    # Сжатое тело отличается побайтно, поэтому сильный ETag становится слабым;
+    # If-None-Match сравнивает слабо, и условные GET продолжают работать
+    etag, weak = response.get_etag()
+    if etag and not weak and 'Content-Encoding' in response.headers:
+        response.set_etag(etag, weak=True)
+    return response
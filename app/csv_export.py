@@ -0,0 +1,20 @@
+"""Экспорт сетки расписания в CSV (открывается в Excel без настройки кодировки)"""
+import csv
+import io
+
+
+def render_schedule_csv(document):
+    """Сетка "время x дни" в CSV, байты в UTF-8 с BOM"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['Время'] + list(document['days']))
+
+    for lesson_index, slot in enumerate(document['lesson_times']):
+        time_label = f"{slot['start']} - {slot['end']}" if slot['end'] else slot['start']
+        row = [time_label]
+        for day_index in range(len(document['days'])):
+            lesson = document['lessons'].get(f'{day_index}_{lesson_index}')
+            row.append(lesson['subject_name'] if lesson else '')
+        writer.writerow(row)
+
+    return buffer.getvalue().encode('utf-8-sig')
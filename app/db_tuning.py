@@ -0,0 +1,127 @@
+"""Настройки соединений с базой данных.
+
+Для SQLite при каждом новом соединении выполняются PRAGMA: журнал WAL
+(читатели не блокируются пишущим ``save_schedule``), ``synchronous=NORMAL``
+(в режиме WAL безопасно и без fsync на каждую транзакцию), отображение файла
+в память, размер кэша страниц и ``busy_timeout`` - сколько ждать блокировку
+записи вместо немедленной ошибки ``database is locked``.
+
+Размер пула подбирается по типу базы: для SQLite соединения дешевые, но
+запись в файл все равно последовательная; для PostgreSQL пул ограничивается,
+а соединения проверяются перед выдачей и периодически пересоздаются.
+Переменные окружения:
+
+* ``DB_POOL_SIZE`` - постоянных соединений в процессе (по умолчанию - по
+  числу потоков воркера, см. gunicorn.conf.py);
+* ``DB_MAX_OVERFLOW`` - дополнительных соединений при пиковой нагрузке;
+* ``SQLITE_BUSY_TIMEOUT`` - ожидание блокировки SQLite, миллисекунды;
+* ``SQLITE_PRAGMAS=off`` - не менять настройки SQLite (например, если база
+  лежит на сетевом диске, где WAL не поддерживается).
+
+Сравнение под смешанной нагрузкой: benchmarks/bench_sqlite_concurrency.py.
+"""
+import os
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# PRAGMA для каждого нового соединения SQLite (порядок важен:
+# journal_mode до synchronous)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -32 * 1024,  # отрицательное значение - в килобайтах (32 МБ)
+    'busy_timeout': 5000,
+}
+
+DEFAULT_POOL_SIZE = 5
+
+
+def is_memory_sqlite(url):
+    url = make_url(url)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def sqlite_pragmas(config):
+    """PRAGMA с учетом конфигурации (SQLITE_PRAGMAS дополняет значения по умолчанию)"""
+    if os.environ.get('SQLITE_PRAGMAS') == 'off':
+        return {}
+    pragmas = dict(SQLITE_PRAGMAS)
+    if os.environ.get('SQLITE_BUSY_TIMEOUT'):
+        pragmas['busy_timeout'] = int(os.environ['SQLITE_BUSY_TIMEOUT'])
+    pragmas.update(config.get('SQLITE_PRAGMAS') or {})
+    return pragmas
+
+
+def engine_options(url):
+    """Параметры create_engine (пул соединений) для адреса базы"""
+    url = make_url(url)
+    pool_size = int(os.environ.get('DB_POOL_SIZE') or DEFAULT_POOL_SIZE)
+
+    if url.get_backend_name() == 'sqlite':
+        # База в памяти живет в одном соединении: пул выбирает Flask-SQLAlchemy
+        if is_memory_sqlite(url):
+            return {}
+        return {
+            'pool_size': pool_size,
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW') or pool_size),
+        }
+
+    return {
+        'pool_size': pool_size,
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW') or 10),
+        'pool_timeout': 10,
+        # Сервер закрывает простаивающие соединения: проверяем и пересоздаем
+        'pool_pre_ping': True,
+        'pool_recycle': 1800,
+    }
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+    finally:
+        cursor.close()
+
+
+def install_sqlite_pragmas(engine, pragmas):
+    """Выполнять PRAGMA при каждом новом соединении движка SQLite"""
+    if engine.dialect.name != 'sqlite':
+        return
+    # Для базы в памяти файла нет: WAL и mmap неприменимы
+    if is_memory_sqlite(engine.url):
+        pragmas = {name: value for name, value in pragmas.items()
+                   if name not in ('journal_mode', 'mmap_size')}
+
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, pragmas)
+
+
+class DatabaseTuning:
+    """Пул и PRAGMA для движков Flask-SQLAlchemy.
+
+    init_app вызывается до db.init_app (параметры пула), install - после
+    (обработчик соединений на созданный движок).
+    """
+
+    def __init__(self):
+        self.pragmas = dict(SQLITE_PRAGMAS)
+
+    def init_app(self, app):
+        self.pragmas = sqlite_pragmas(app.config)
+        options = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
+        options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+        app.extensions['db_tuning'] = self
+
+    def install(self, app, db):
+        with app.app_context():
+            for engine in db.engines.values():
+                install_sqlite_pragmas(engine, self.pragmas)
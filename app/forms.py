@@ -4,6 +4,7 @@ from wtforms.validators import DataRequired, Length, Email, EqualTo
 from wtforms import SelectMultipleField, widgets
 from datetime import datetime
 from app.models import User
+from app.lesson_times import TIME_VALUES
 
 
 class LoginForm(FlaskForm):
@@ -66,10 +67,5 @@ class ScheduleForm(FlaskForm):
         self.end_time.choices = self.get_time_choices()  # Добавлено для окончания
 
     def get_time_choices(self):
-        """Возвращает список времени с 8:00 до 20:45 с интервалом 5 минут"""
-        times = []
-        for hour in range(8, 21):
-            for minute in [0,5, 10, 15, 20, 25, 30, 35, 40, 45, 50, 55]:
-                time_str = f"{hour:02d}:{minute:02d}"
-                times.append((time_str, time_str))
-        return times
+        """Возвращает список времени с 8:00 до 20:55 с интервалом 5 минут"""
+        return [(time_str, time_str) for time_str in TIME_VALUES]
@@ -0,0 +1,63 @@
+"""Проверка готовности для /health.
+
+Ответ 200 означает, что процесс обрабатывает запросы и база данных отвечает
+на ``SELECT 1`` не дольше ``HEALTH_DB_TIMEOUT`` секунд; иначе 503, и
+балансировщик перестает направлять запросы на этот экземпляр. Запрос к базе
+выполняется в отдельном небольшом пуле потоков, поэтому зависшее соединение
+или исчерпанный пул не задерживают ответ дольше таймаута.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime
+
+from flask import jsonify
+from sqlalchemy import text
+
+DEFAULT_DB_TIMEOUT = 2
+
+_executor = None
+_lock = threading.Lock()
+
+
+def _get_executor():
+    # Пул создается при первой проверке, уже в процессе воркера
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='health-check')
+        return _executor
+
+
+def _ping(engine):
+    with engine.connect() as connection:
+        connection.execute(text('SELECT 1'))
+
+
+def check_database(engine, timeout=DEFAULT_DB_TIMEOUT):
+    """Результат проверки базы: {'status': 'ok' | 'error', ...}"""
+    started = time.perf_counter()
+    future = _get_executor().submit(_ping, engine)
+    try:
+        future.result(timeout=timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        return {'status': 'error', 'error': f'timeout after {timeout}s'}
+    except Exception as e:
+        return {'status': 'error', 'error': str(e)}
+    return {'status': 'ok', 'latency_ms': round((time.perf_counter() - started) * 1000, 2)}
+
+
+def health_response(checks):
+    """JSON-ответ /health: 200, если все проверки успешны, иначе 503"""
+    ready = all(check['status'] == 'ok' for check in checks.values())
+    response = jsonify({
+        'status': 'ok' if ready else 'error',
+        'message': 'Application is running' if ready else 'Application is not ready',
+        'timestamp': datetime.now().isoformat(),
+        'checks': checks,
+    })
+    response.status_code = 200 if ready else 503
+    response.headers['Cache-Control'] = 'no-store'
+    return response
@@ -0,0 +1,68 @@
+"""Условные GET-запросы (ETag / Last-Modified) для страниц и JSON расписаний.
+
+Валидатор строится из версии расписания (Schedule.version и updated_at),
+поэтому его можно проверить до загрузки уроков и рендеринга шаблона.
+HTML-страницы содержат CSRF-токен сессии, поэтому для них в валидатор
+дополнительно входит токен сессии и окно его действия.
+"""
+import hashlib
+import time
+from datetime import timezone
+
+from flask import current_app, request, session
+from werkzeug.http import is_resource_modified
+
+from app.page_cache import schedule_stamp
+
+# Политика кэширования для страниц авторизованного пользователя:
+# хранить только в браузере и перепроверять при каждом обращении
+PRIVATE_CACHE_CONTROL = 'private, no-cache'
+
+
+def _session_part():
+    """Часть валидатора, зависящая от CSRF-токена сессии"""
+    token = session.get('csrf_token', '')
+    time_limit = current_app.config.get('WTF_CSRF_TIME_LIMIT')
+    # Окно в половину срока действия токена: закэшированная страница
+    # не переживет подписанный в ней токен
+    window = int(time.time() // (time_limit / 2)) if time_limit else 0
+    return f'{token}:{window}'
+
+
+def schedule_validators(schedule, *parts, html=True):
+    """Возвращает (etag, last_modified) для представления расписания"""
+    raw = '|'.join([str(schedule.id), schedule_stamp(schedule), *map(str, parts)])
+    if html:
+        raw += '|' + _session_part()
+    etag = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    last_modified = schedule.updated_at
+    if last_modified is not None and last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return etag, last_modified
+
+
+def is_not_modified(etag, last_modified=None):
+    """Проверяет заголовки If-None-Match / If-Modified-Since текущего запроса"""
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    # Непоказанные flash-сообщения должны попасть на страницу
+    if session.get('_flashes'):
+        return False
+    return not is_resource_modified(request.environ, etag=etag, last_modified=last_modified)
+
+
+def set_validators(response, etag, last_modified=None, cache_control=PRIVATE_CACHE_CONTROL):
+    """Добавляет к ответу ETag, Last-Modified и Cache-Control"""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = cache_control
+    response.vary.add('Cookie')
+    return response
+
+
+def not_modified_response(etag, last_modified=None, cache_control=PRIVATE_CACHE_CONTROL):
+    """Пустой ответ 304 Not Modified с теми же валидаторами"""
+    response = current_app.response_class(status=304)
+    return set_validators(response, etag, last_modified, cache_control)
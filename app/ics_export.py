@@ -0,0 +1,148 @@
+"""Генерация iCalendar (RFC 5545) из снимка расписания.
+
+Каждая заполненная ячейка сетки превращается в одно еженедельно
+повторяющееся событие (RRULE:FREQ=WEEKLY), а не в список отдельных
+занятий, поэтому размер файла не зависит от срока действия расписания.
+Время указывается без часового пояса (floating time) - занятия идут по
+местному времени календаря пользователя.
+"""
+from datetime import date, datetime, timedelta, timezone
+from urllib.parse import urlsplit
+
+from app.weekdays import WEEKDAY_CODES
+
+PRODUCT_ID = '-//School Schedule//Schedule Export//RU'
+UID_DOMAIN = 'school-schedule'
+
+# Коды дней RRULE (BYDAY) в порядке WEEKDAY_CODES
+ICS_WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+
+# Дата отсчета для расписаний без даты создания
+DEFAULT_ANCHOR_DATE = date(2024, 1, 1)
+
+
+def escape_text(value):
+    """Экранирование значения TEXT (RFC 5545, 3.3.11)"""
+    return (value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n').replace('\r', '\\n'))
+
+
+def safe_url(value):
+    """Ссылка для свойства URL: только http(s) без управляющих символов, иначе None.
+
+    Значение URI не экранируется (RFC 5545, 3.3.13), поэтому CR/LF в
+    сохраненной ссылке иначе добавили бы в событие произвольные свойства.
+    """
+    value = (value or '').strip()
+    if not value or any(ord(char) < 32 or ord(char) == 127 for char in value):
+        return None
+    if urlsplit(value).scheme.lower() not in ('http', 'https'):
+        return None
+    return value
+
+
+def fold_line(line):
+    """Переносит строку длиннее 75 октетов (RFC 5545, 3.1), не разрывая символы UTF-8"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+
+    parts = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Не разрезаем многобайтовый символ посередине
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+        limit = 74  # продолжение начинается с пробела
+    return '\r\n '.join(parts)
+
+
+def _parse_datetime(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def _format_utc(value):
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime('%Y%m%dT%H%M%SZ')
+
+
+def _first_weekday(anchor, weekday):
+    """Первая дата с днем недели weekday (0 - понедельник) не раньше anchor"""
+    return anchor + timedelta(days=(weekday - anchor.weekday()) % 7)
+
+
+def _slot_datetime(day, value):
+    hours, minutes = value.split(':')
+    return datetime(day.year, day.month, day.day, int(hours), int(minutes))
+
+
+def schedule_events(document):
+    """Строки VEVENT для всех заполненных ячеек расписания"""
+    created_at = _parse_datetime(document.get('created_at'))
+    updated_at = _parse_datetime(document.get('updated_at')) or created_at
+    anchor = created_at.date() if created_at else DEFAULT_ANCHOR_DATE
+    stamp = _format_utc(updated_at) if updated_at else _format_utc(datetime.combine(anchor, datetime.min.time()))
+
+    lines = []
+    for day_index, day_code in enumerate(document['day_codes']):
+        weekday = WEEKDAY_CODES.index(day_code)
+        first_day = _first_weekday(anchor, weekday)
+
+        for lesson_index, slot in enumerate(document['lesson_times']):
+            lesson = document['lessons'].get(f'{day_index}_{lesson_index}')
+            # Слоты по умолчанию не содержат времени - такие уроки в календарь не попадают
+            if not lesson or not lesson['subject_name'] or not slot['end']:
+                continue
+
+            lines.extend((
+                'BEGIN:VEVENT',
+                f"UID:schedule-{document['id']}-{day_code}-{lesson_index}@{UID_DOMAIN}",
+                f'DTSTAMP:{stamp}',
+                f"DTSTART:{_slot_datetime(first_day, slot['start']):%Y%m%dT%H%M%S}",
+                f"DTEND:{_slot_datetime(first_day, slot['end']):%Y%m%dT%H%M%S}",
+                f'RRULE:FREQ=WEEKLY;BYDAY={ICS_WEEKDAYS[weekday]}',
+                f"SUMMARY:{escape_text(lesson['subject_name'])}",
+                f"CATEGORIES:{escape_text(document['title'])}",
+            ))
+            link = safe_url(lesson.get('lesson_link'))
+            if link:
+                lines.append(f'URL:{link}')
+                if lesson.get('link_text'):
+                    lines.append(f"DESCRIPTION:{escape_text(lesson['link_text'])}")
+            lines.append('END:VEVENT')
+    return lines
+
+
+def render_events(document):
+    """Блок VEVENT одного расписания в готовом виде (строка с CRLF), пригоден для кэширования"""
+    return ''.join(fold_line(line) + '\r\n' for line in schedule_events(document))
+
+
+def wrap_calendar(event_blocks, name):
+    """Собирает VCALENDAR из готовых блоков событий, байты в UTF-8"""
+    header = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODUCT_ID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape_text(name)}',
+    ]
+    parts = [fold_line(line) + '\r\n' for line in header]
+    parts.extend(event_blocks)
+    parts.append('END:VCALENDAR\r\n')
+    return ''.join(parts).encode('utf-8')
+
+
+def render_calendar_ics(documents, name):
+    """Календарь из нескольких расписаний, байты в UTF-8"""
+    return wrap_calendar((render_events(document) for document in documents), name)
+
+
+def render_schedule_ics(document):
+    """Календарь одного расписания, байты в UTF-8"""
+    return render_calendar_ics([document], document['title'])
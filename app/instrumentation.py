@@ -0,0 +1,169 @@
+"""Замеры запросов: время обработки, SQL-запросы и рендеринг шаблонов.
+
+Для каждого запроса собираются общее время, количество и суммарное время
+SQL-запросов (события SQLAlchemy) и время рендеринга шаблонов (сигналы
+Flask). Итог пишется одной JSON-строкой в журнал ``app.requests``:
+
+    {"event": "request", "method": "POST", "endpoint": "main.save_schedule",
+     "status": 200, "duration_ms": 12.4, "db_queries": 3, "db_ms": 4.1,
+     "template_ms": 0.0, ...}
+
+Пишется доля ``INSTRUMENTATION_SAMPLE_RATE`` запросов, а также все запросы
+медленнее ``INSTRUMENTATION_SLOW_MS`` и ответы с ошибкой 5xx. Запись идет
+через очередь в отдельном потоке, поэтому поток запроса не ждет вывода.
+``INSTRUMENTATION_ENABLED = False`` (переменная окружения
+``INSTRUMENTATION_ENABLED=0``) отключает замеры.
+"""
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import time
+from contextvars import ContextVar
+
+from flask import before_render_template, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Замеры текущего запроса (у каждого потока и asyncio-задачи свои)
+_current = ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    __slots__ = ('started_at', 'db_queries', 'db_time', 'template_time', '_template_started')
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self._template_started = []
+
+    @property
+    def duration(self):
+        return time.perf_counter() - self.started_at
+
+
+def current_stats():
+    """Замеры текущего запроса или None вне запроса / при отключенных замерах"""
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = conn.info.get('query_started')
+    if stats is not None and started:
+        stats.db_queries += 1
+        stats.db_time += time.perf_counter() - started.pop()
+
+
+def _before_render_template(sender, template, context, **extra):
+    stats = _current.get()
+    if stats is not None:
+        stats._template_started.append(time.perf_counter())
+
+
+def _template_rendered(sender, template, context, **extra):
+    stats = _current.get()
+    if stats is not None and stats._template_started:
+        stats.template_time += time.perf_counter() - stats._template_started.pop()
+
+
+class Instrumentation:
+    """Расширение Flask: замеры запросов и выборочная запись в журнал"""
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.sample_rate = 0.0
+        self.slow_threshold = None
+        self.logger = logging.getLogger('app.requests')
+        self._listener = None
+        self._listener_pid = None
+        self._request_observers = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('INSTRUMENTATION_ENABLED', os.environ.get('INSTRUMENTATION_ENABLED', '1') != '0')
+        app.config.setdefault('INSTRUMENTATION_SAMPLE_RATE',
+                              float(os.environ.get('INSTRUMENTATION_SAMPLE_RATE') or 0.05))
+        app.config.setdefault('INSTRUMENTATION_SLOW_MS', float(os.environ.get('INSTRUMENTATION_SLOW_MS') or 500))
+
+        self.enabled = app.config['INSTRUMENTATION_ENABLED']
+        self.sample_rate = app.config['INSTRUMENTATION_SAMPLE_RATE']
+        self.slow_threshold = app.config['INSTRUMENTATION_SLOW_MS'] / 1000
+        app.extensions['instrumentation'] = self
+        if not self.enabled:
+            return
+
+        # Обработчики на классе Engine охватывают и синхронный, и асинхронный движок
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        before_render_template.connect(_before_render_template, app)
+        template_rendered.connect(_template_rendered, app)
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._teardown_request)
+
+    def add_request_observer(self, observer):
+        """observer(request, response, stats) вызывается в конце каждого замеренного запроса"""
+        self._request_observers.append(observer)
+
+    def _start_request(self):
+        _current.set(RequestStats())
+
+    def _finish_request(self, response):
+        stats = _current.get()
+        if stats is None:
+            return response
+        duration = stats.duration
+        for observer in self._request_observers:
+            observer(request, response, stats)
+        if (duration >= self.slow_threshold or response.status_code >= 500
+                or random.random() < self.sample_rate):
+            self._emit({
+                'event': 'request',
+                'method': request.method,
+                'path': request.path,
+                'endpoint': request.endpoint,
+                'status': response.status_code,
+                'duration_ms': round(duration * 1000, 2),
+                'db_queries': stats.db_queries,
+                'db_ms': round(stats.db_time * 1000, 2),
+                'template_ms': round(stats.template_time * 1000, 2),
+                'response_bytes': response.content_length,
+            })
+        return response
+
+    def _teardown_request(self, exc):
+        _current.set(None)
+
+    def _emit(self, record):
+        self._ensure_listener()
+        self.logger.info(json.dumps(record, ensure_ascii=False))
+
+    def _ensure_listener(self):
+        """Поток записи журнала создается в каждом процессе (после fork воркера gunicorn)"""
+        if self._listener_pid == os.getpid():
+            return
+        self._listener_pid = os.getpid()
+        if self.logger.handlers and self._listener is None:
+            return  # журнал настроен приложением или сервером
+
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        log_queue = queue.SimpleQueue()
+        self.logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self._listener = logging.handlers.QueueListener(log_queue, handler)
+        self._listener.start()
@@ -0,0 +1,74 @@
+"""Пакетное сохранение уроков расписания.
+
+Вместо создания ORM-объекта Lesson на каждую ячейку сетка уроков
+записывается одним INSERT через executemany, без накладных расходов
+unit of work сессии.
+"""
+from sqlalchemy import insert, delete, select
+
+from app import db
+from app.models import Lesson
+
+
+def lesson_row(schedule_id, day_index, lesson_index, lesson_data):
+    """Возвращает словарь значений для вставки одной ячейки урока"""
+    return {
+        'schedule_id': schedule_id,
+        'day_index': day_index,
+        'lesson_index': lesson_index,
+        'subject_name': lesson_data.get('subject_name', ''),
+        'color': lesson_data.get('color', '#FFFFFF'),
+        'lesson_link': lesson_data.get('lesson_link', ''),
+        'link_text': lesson_data.get('link_text', ''),
+        'font_family': lesson_data.get('font_family', 'Bookman Old Style'),
+    }
+
+
+def bulk_insert_lessons(rows):
+    """Вставляет все уроки одним пакетным запросом, возвращает количество строк"""
+    if not rows:
+        return 0
+    db.session.execute(insert(Lesson), rows)
+    return len(rows)
+
+
+def replace_schedule_lessons(schedule_id, rows):
+    """Полностью заменяет сетку уроков расписания (без commit)"""
+    db.session.execute(delete(Lesson).where(Lesson.schedule_id == schedule_id))
+    return bulk_insert_lessons(rows)
+
+
+def lesson_map(lessons):
+    """Уроки {"день_урок": {...}} для экспорта из строк запроса или объектов Lesson"""
+    return {
+        f'{lesson.day_index}_{lesson.lesson_index}': {
+            'subject_name': lesson.subject_name,
+            'color': lesson.color,
+            'lesson_link': lesson.lesson_link,
+            'link_text': lesson.link_text,
+        }
+        for lesson in lessons
+    }
+
+
+def load_lesson_maps(schedule_ids):
+    """{id расписания: уроки {"день_урок": {...}}} одним запросом без создания ORM-объектов"""
+    grouped = {schedule_id: [] for schedule_id in schedule_ids}
+    rows = db.session.execute(
+        select(Lesson.schedule_id, Lesson.day_index, Lesson.lesson_index, Lesson.subject_name,
+               Lesson.color, Lesson.lesson_link, Lesson.link_text)
+        .where(Lesson.schedule_id.in_(grouped))
+    )
+    for row in rows:
+        grouped[row.schedule_id].append(row)
+    return {schedule_id: lesson_map(lessons) for schedule_id, lessons in grouped.items()}
+
+
+def lesson_grid_select(schedule_id):
+    """Запрос всех полей сетки уроков расписания (для синхронной и асинхронной сессии)"""
+    return (
+        select(Lesson.day_index, Lesson.lesson_index, Lesson.subject_name, Lesson.color,
+               Lesson.font_family, Lesson.lesson_link, Lesson.link_text)
+        .where(Lesson.schedule_id == schedule_id)
+        .order_by(Lesson.day_index, Lesson.lesson_index)
+    )
@@ -0,0 +1,66 @@
+"""Предрасчитанная таблица времени уроков.
+
+Время начала и окончания расписания выбирается из фиксированного набора
+значений ЧЧ:ММ (с 08:00 до 20:55 с шагом 5 минут), поэтому разбор строк
+и расчет слотов уроков выполняются один раз и затем берутся из кэша.
+"""
+from datetime import datetime
+from functools import lru_cache
+
+# Фиксированная длительность урока в минутах
+LESSON_DURATION = 60
+
+# Количество уроков, если время не задано или задано неверно
+DEFAULT_LESSONS_COUNT = 6
+
+# Все значения времени, доступные в форме создания расписания
+TIME_VALUES = tuple(f"{hour:02d}:{minute:02d}"
+                    for hour in range(8, 21)
+                    for minute in range(0, 60, 5))
+
+_MINUTES_BY_TIME = {value: int(value[:2]) * 60 + int(value[3:]) for value in TIME_VALUES}
+
+
+def parse_minutes(value):
+    """Переводит строку ЧЧ:ММ в минуты от начала суток (ValueError при неверном формате)"""
+    minutes = _MINUTES_BY_TIME.get(value)
+    if minutes is None:
+        parsed = datetime.strptime(value, '%H:%M')
+        minutes = parsed.hour * 60 + parsed.minute
+    return minutes
+
+
+def format_minutes(minutes):
+    """Переводит минуты от начала суток в строку ЧЧ:ММ"""
+    return f"{(minutes // 60) % 24:02d}:{minutes % 60:02d}"
+
+
+@lru_cache(maxsize=4096)
+def lesson_slots(start_time, end_time):
+    """Возвращает кортеж слотов {'start', 'end'} для пары времени начала и окончания.
+
+    Результат кэшируется и разделяется между запросами, поэтому изменять
+    возвращаемые словари нельзя. При неверном формате времени ValueError.
+    """
+    start = parse_minutes(start_time)
+    end = parse_minutes(end_time)
+
+    # Количество уроков по 60 минут каждый - ОКРУГЛЯЕМ В БОЛЬШУЮ СТОРОНУ
+    lessons_count = max(1, (end - start + LESSON_DURATION - 1) // LESSON_DURATION)
+
+    return tuple(
+        {
+            'start': format_minutes(start + LESSON_DURATION * i),
+            'end': format_minutes(start + LESSON_DURATION * (i + 1)),
+        }
+        for i in range(lessons_count)
+    )
+
+
+def lessons_count(start_time, end_time):
+    """Количество уроков в день для пары времени (ValueError при неверном формате)"""
+    return len(lesson_slots(start_time, end_time))
+
+
+# Слоты по умолчанию, если время не задано или задано неверно
+DEFAULT_LESSON_SLOTS = tuple({'start': f'Урок {i + 1}', 'end': ''} for i in range(DEFAULT_LESSONS_COUNT))
@@ -0,0 +1,51 @@
+"""Профили загрузки связей для страниц и выгрузок.
+
+Связи ``Schedule.lessons`` и ``User.schedules`` объявлены ленивыми, и любое
+обращение к ним в цикле дает N+1 запросов. Поэтому каждый путь явно
+указывает, что ему нужно:
+
+* ``dashboard`` - карточки расписаний, связи не нужны;
+* ``view`` / ``edit`` - сетка читается отдельным колоночным запросом
+  (lesson_store.lesson_grid_select), связи не нужны;
+* ``feed`` - расписания ленты календаря; уроки читаются колоночным запросом
+  только для расписаний, которых нет в кэше событий;
+* ``export`` - пакет расписаний вместе с уроками: один SELECT ... IN на пакет.
+
+Случайное обращение к связи, не загруженной профилем, вызывает ошибку
+(raiseload), а не тихий дополнительный запрос. Бюджеты запросов страниц
+проверяет benchmarks/check_query_budget.py.
+"""
+from sqlalchemy import select
+from sqlalchemy.orm import raiseload, selectinload
+
+from app import db
+from app.models import Schedule
+
+LOADER_PROFILES = {
+    'dashboard': (raiseload(Schedule.lessons), raiseload(Schedule.author)),
+    'view': (raiseload(Schedule.lessons),),
+    'edit': (raiseload(Schedule.lessons),),
+    'feed': (raiseload(Schedule.lessons), raiseload(Schedule.author)),
+    'export': (selectinload(Schedule.lessons), raiseload(Schedule.author)),
+}
+
+
+def schedule_options(profile):
+    """Параметры загрузки Schedule для профиля"""
+    return LOADER_PROFILES[profile]
+
+
+def schedule_query(profile):
+    """Schedule.query с параметрами загрузки профиля"""
+    return Schedule.query.options(*schedule_options(profile))
+
+
+def load_schedules(schedule_ids, profile='export'):
+    """Расписания по списку id одним запросом (плюс запросы связей профиля), в порядке списка"""
+    schedules = db.session.scalars(
+        select(Schedule)
+        .where(Schedule.id.in_(schedule_ids))
+        .options(*schedule_options(profile))
+    ).all()
+    by_id = {schedule.id: schedule for schedule in schedules}
+    return [by_id[schedule_id] for schedule_id in schedule_ids if schedule_id in by_id]
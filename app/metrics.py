@@ -0,0 +1,445 @@
+"""Метрики приложения в текстовом формате Prometheus (``/metrics``).
+
+Реестр хранит счетчики, показатели (gauge) и гистограммы в памяти процесса
+под общей блокировкой. Собираются:
+
+* ``http_requests_total`` и ``http_request_duration_seconds`` по endpoint;
+* ``http_requests_in_flight`` - запросы в обработке;
+* ``db_queries_total`` - SQL-запросы по endpoint (при включенных замерах
+  app/instrumentation.py);
+* ``db_pool_connections`` - соединения пула по состояниям;
+* ``cache_requests_total`` - попадания и промахи кэша страниц и пользователей;
+* ``rate_limit_rejected_total`` - отказы ограничителя частоты;
+* ``lesson_save_size`` - количество уроков в сохранениях сетки.
+
+У каждого воркера gunicorn свой реестр. Если задан каталог
+``METRICS_MULTIPROC_DIR`` (gunicorn.conf.py создает его при старте), воркер
+раз в ``METRICS_FLUSH_INTERVAL`` секунд сохраняет снимок реестра в файл,
+а ``/metrics`` суммирует снимки всех воркеров. Счетчики и гистограммы завершившихся воркеров
+переносятся в общий архив и не теряются, показатели учитываются только
+у работающих.
+
+Доступ: если задан ``METRICS_TOKEN``, нужен заголовок
+``Authorization: Bearer <токен>``; без токена ``/metrics`` отвечает только
+на запросы с loopback-адреса (127.0.0.1, ::1). За обратным прокси на том же
+хосте адрес клиента должен быть восстановлен (ProxyFix), иначе все запросы
+через прокси будут выглядеть локальными.
+"""
+import atexit
+import glob
+import hmac
+import ipaddress
+import json
+import math
+import os
+import threading
+import time
+
+from flask import Response, abort, g, request
+
+try:
+    import fcntl
+except ImportError:  # Windows: только метрики текущего процесса
+    fcntl = None
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Границы гистограммы времени ответа, секунды
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Границы гистограммы размера сохранения: до 7 дней по 13 уроков
+SAVE_SIZE_BUCKETS = (0, 1, 5, 10, 20, 35, 50, 70, 91)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def samples(self):
+        """[(значения меток, значение)] для снимка реестра"""
+        with self.registry.lock:
+            return [[list(key), value] for key, value in self.values.items()]
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self.registry.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = {'buckets': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            entry['buckets'][index] += 1
+            entry['sum'] += value
+            entry['count'] += 1
+
+    def samples(self):
+        with self.registry.lock:
+            return [[list(key), {'buckets': list(entry['buckets']), 'sum': entry['sum'],
+                                 'count': entry['count']}]
+                    for key, entry in self.values.items()]
+
+
+class CallbackMetric(Metric):
+    """Значения считываются функцией при сборе: [(метки, значение)]"""
+
+    def __init__(self, registry, name, documentation, labelnames, kind, callback):
+        super().__init__(registry, name, documentation, labelnames)
+        self.kind = kind
+        self.callback = callback
+
+    def samples(self):
+        return [[list(self._key(labels)), value] for labels, value in self.callback()]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._metrics = {}
+
+    def _add(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(self, name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._add(Gauge(self, name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(self, name, documentation, labelnames, buckets))
+
+    def callback(self, name, documentation, labelnames, kind, callback):
+        return self._add(CallbackMetric(self, name, documentation, labelnames, kind, callback))
+
+    def snapshot(self):
+        """Состояние реестра в виде, пригодном для JSON"""
+        families = {}
+        for metric in self._metrics.values():
+            families[metric.name] = {
+                'type': metric.kind,
+                'help': metric.documentation,
+                'labels': list(metric.labelnames),
+                'buckets': list(getattr(metric, 'buckets', ())),
+                'samples': metric.samples(),
+            }
+        return families
+
+
+def merge_snapshots(snapshots):
+    """Сумма снимков нескольких процессов (у гистограмм - поэлементно)"""
+    merged = {}
+    for families in snapshots:
+        for name, family in families.items():
+            target = merged.setdefault(name, {**family, 'samples': {}})
+            for labels, value in family['samples']:
+                key = tuple(labels)
+                current = target['samples'].get(key)
+                if family['type'] == 'histogram':
+                    if current is None:
+                        current = target['samples'][key] = {'buckets': [0] * len(value['buckets']),
+                                                            'sum': 0.0, 'count': 0}
+                    current['buckets'] = [a + b for a, b in zip(current['buckets'], value['buckets'])]
+                    current['sum'] += value['sum']
+                    current['count'] += value['count']
+                else:
+                    target['samples'][key] = (current or 0) + value
+    for family in merged.values():
+        family['samples'] = [[list(key), value] for key, value in family['samples'].items()]
+    return merged
+
+
+def without_gauges(families):
+    return {name: family for name, family in families.items() if family['type'] != 'gauge'}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_text(families):
+    """Текстовый формат Prometheus 0.0.4"""
+    lines = []
+    for name, family in sorted(families.items()):
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        for values, value in family['samples']:
+            if family['type'] != 'histogram':
+                lines.append(f"{name}{_labels(family['labels'], values)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip([*family['buckets'], math.inf], value['buckets']):
+                cumulative += count
+                le = (('le', _number(bound) if bound == math.inf else repr(float(bound))),)
+                lines.append(f"{name}_bucket{_labels(family['labels'], values, le)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(family['labels'], values)} {_number(value['sum'])}")
+            lines.append(f"{name}_count{_labels(family['labels'], values)} {value['count']}")
+    return '\n'.join(lines) + '\n'
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MultiprocessStore:
+    """Снимки реестров воркеров в общем каталоге"""
+
+    ARCHIVE = 'archive.json'
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f'metrics-{pid}.json')
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write(path, families):
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(families, f)
+        os.replace(tmp_path, path)
+
+    def write(self, families):
+        self._write(self._path(os.getpid()), families)
+
+    def collect(self):
+        """Сумма снимков: работающие воркеры + архив завершившихся"""
+        with open(os.path.join(self.directory, '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                archive_path = os.path.join(self.directory, self.ARCHIVE)
+                archive = self._read(archive_path) or {}
+                live, dead_paths = [], []
+                for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+                    families = self._read(path)
+                    if families is None:
+                        continue
+                    pid = int(os.path.basename(path)[len('metrics-'):-len('.json')])
+                    if _process_alive(pid):
+                        live.append(families)
+                    else:
+                        archive = merge_snapshots([archive, without_gauges(families)])
+                        dead_paths.append(path)
+                if dead_paths:
+                    self._write(archive_path, archive)
+                    for path in dead_paths:
+                        os.remove(path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return merge_snapshots([archive, *live])
+
+
+class Metrics:
+    """Расширение Flask: реестр метрик, замеры запросов и маршрут /metrics"""
+
+    def __init__(self, app=None):
+        self.registry = MetricsRegistry()
+        self.store = None
+        self.flush_interval = 5
+        self.token = None
+        self._flush_pid = None
+
+        self.requests = self.registry.counter(
+            'http_requests_total', 'Обработанные HTTP-запросы', ('endpoint', 'method', 'status'))
+        self.latency = self.registry.histogram(
+            'http_request_duration_seconds', 'Время обработки запроса', ('endpoint',))
+        self.in_flight = self.registry.gauge('http_requests_in_flight', 'Запросы в обработке')
+        self.db_queries = self.registry.counter('db_queries_total', 'SQL-запросы по endpoint', ('endpoint',))
+        self.lesson_saves = self.registry.histogram(
+            'lesson_save_size', 'Уроков в одном сохранении сетки', ('mode',), SAVE_SIZE_BUCKETS)
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('METRICS_ENABLED', os.environ.get('METRICS_ENABLED', '1') != '0')
+        app.config.setdefault('METRICS_MULTIPROC_DIR', os.environ.get('METRICS_MULTIPROC_DIR'))
+        app.config.setdefault('METRICS_FLUSH_INTERVAL', 5)
+        app.config.setdefault('METRICS_TOKEN', os.environ.get('METRICS_TOKEN'))
+        app.extensions['metrics'] = self
+        if not app.config['METRICS_ENABLED']:
+            return
+
+        if app.config['METRICS_MULTIPROC_DIR'] and fcntl is not None:
+            self.store = MultiprocessStore(app.config['METRICS_MULTIPROC_DIR'])
+        self.flush_interval = app.config['METRICS_FLUSH_INTERVAL']
+        self.token = app.config['METRICS_TOKEN']
+        self._register_app_metrics(app)
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+
+    def _register_app_metrics(self, app):
+        from app import db, page_cache, rate_limiter, user_cache
+
+        def pool_connections():
+            samples = []
+            with app.app_context():
+                engines = list(db.engines.values())
+            for engine in engines:
+                pool = engine.pool
+                if not hasattr(pool, 'checkedout'):
+                    continue
+                checked_out = pool.checkedout()
+                samples.append(({'state': 'checked_out'}, checked_out))
+                samples.append(({'state': 'idle'}, pool.checkedin()))
+                samples.append(({'state': 'overflow'}, max(pool.overflow(), 0)))
+            return samples
+
+        def cache_requests():
+            return [
+                ({'cache': 'page', 'result': 'hit'}, page_cache.hits),
+                ({'cache': 'page', 'result': 'miss'}, page_cache.misses),
+                ({'cache': 'user', 'result': 'hit'}, user_cache.hits),
+                ({'cache': 'user', 'result': 'miss'}, user_cache.misses),
+            ]
+
+        def rate_limit_rejected():
+            return [({'scope': scope}, count) for scope, count in rate_limiter.rejected.items()]
+
+        self.registry.callback('db_pool_connections', 'Соединения пула БД по состояниям',
+                               ('state',), 'gauge', pool_connections)
+        self.registry.callback('cache_requests_total', 'Обращения к кэшам по результату',
+                               ('cache', 'result'), 'counter', cache_requests)
+        self.registry.callback('rate_limit_rejected_total', 'Отклоненные ограничителем частоты запросы',
+                               ('scope',), 'counter', rate_limit_rejected)
+
+    def observe_lesson_save(self, count, mode):
+        """Размер сохранения сетки уроков ('full' - вся сетка, 'patch' - измененные ячейки)"""
+        self.lesson_saves.observe(count, mode=mode)
+
+    def _start_request(self):
+        g._metrics_started = time.perf_counter()
+        self.in_flight.inc()
+
+    def _finish_request(self, response):
+        started = g.pop('_metrics_started', None)
+        if started is None:
+            return response
+        endpoint = request.endpoint or 'none'
+        self.latency.observe(time.perf_counter() - started, endpoint=endpoint)
+        self.requests.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+
+        from app.instrumentation import current_stats
+
+        stats = current_stats()
+        if stats is not None and stats.db_queries:
+            self.db_queries.inc(stats.db_queries, endpoint=endpoint)
+        return response
+
+    def _teardown_request(self, exc):
+        g.pop('_metrics_started', None)
+        self.in_flight.dec()
+        self._ensure_flusher()
+
+    def _ensure_flusher(self):
+        """Поток сохранения снимков создается в каждом процессе (после fork воркера gunicorn)"""
+        if self.store is None or self._flush_pid == os.getpid():
+            return
+        with self.registry.lock:
+            if self._flush_pid == os.getpid():
+                return
+            self._flush_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True).start()
+        # Последний снимок воркера сохраняется при его завершении
+        atexit.register(self.flush)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError:
+                pass  # каталог недоступен: повторим в следующий раз
+
+    def flush(self):
+        if self.store is not None:
+            self.store.write(self.registry.snapshot())
+
+    def collect(self):
+        if self.store is None:
+            return self.registry.snapshot()
+        self.flush()
+        return self.store.collect()
+
+    def _allowed(self):
+        if self.token:
+            return hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {self.token}')
+        try:
+            return ipaddress.ip_address(request.remote_addr or '').is_loopback
+        except ValueError:
+            return False
+
+    def metrics_view(self):
+        if not self._allowed():
+            abort(403)
+        response = Response(render_text(self.collect()), content_type=CONTENT_TYPE)
+        response.headers['Cache-Control'] = 'no-store'
+        return response
@@ -1,37 +1,67 @@
-from app import db, login_manager
+from app import db, login_manager, password_policy, user_cache
+from app.lesson_times import lessons_count, DEFAULT_LESSONS_COUNT, LESSON_DURATION
+from app.weekdays import days_to_mask, mask_to_days, day_bit
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.ext.hybrid import hybrid_method
+from app.user_cache import install_invalidation
 from datetime import datetime
-import json
+import logging
+import secrets
+
+logger = logging.getLogger(__name__)
+
+
+def new_feed_secret():
+    """Случайный секрет, входящий в подписанные ссылки календаря пользователя"""
+    return secrets.token_urlsafe(16)
 
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False)
+    password_hash = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Смена секрета отзывает все выданные ссылки подписки на календарь
+    feed_secret = db.Column(db.String(32), nullable=False, default=new_feed_secret)
 
     schedules = db.relationship('Schedule', backref='author', lazy=True, cascade='all, delete-orphan')
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_policy.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_policy.verify(self.password_hash, password)
+
+    def rehash_password_if_needed(self, password):
+        """После успешного входа пересчитывает хеш, созданный не текущим методом (без commit)"""
+        if not password_policy.needs_rehash(self.password_hash):
+            return False
+        self.set_password(password)
+        return True
+
+    def rotate_feed_secret(self):
+        """Новый секрет ссылок календаря: старые ссылки перестают работать (без commit)"""
+        self.feed_secret = new_feed_secret()
 
     def __repr__(self):
         return f'<User {self.username}>'
 
 
 class Schedule(db.Model):
+    # Покрывает выборку панели управления: WHERE user_id ORDER BY created_at, id
+    __table_args__ = (
+        db.Index('ix_schedule_user_created', 'user_id', 'created_at', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    days_of_week = db.Column(db.String(200))
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    days_mask = db.Column(db.SmallInteger, nullable=False, default=0, server_default='0')
     start_time = db.Column(db.String(5))
     end_time = db.Column(db.String(5))
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -40,46 +70,88 @@ class Schedule(db.Model):
     def __repr__(self):
         return f'<Schedule {self.title}>'
 
-    @property
-    def days_count(self):
-        """Возвращает количество дней в расписании"""
-        if self.days_of_week:
-            try:
-                days_list = json.loads(self.days_of_week)
-                return len(days_list)
-            except (json.JSONDecodeError, TypeError):
-                return 0
-        return 0
+    @classmethod
+    def bump_version_if(cls, schedule_id, expected_version):
+        """Атомарно увеличивает версию, если она все еще равна expected_version.
+
+        Проверка и увеличение - один UPDATE ... WHERE version = :expected, поэтому
+        из двух параллельных сохранений с одной версией пройдет только одно.
+        Возвращает новую версию или None, если версия уже изменилась.
+        """
+        result = db.session.execute(
+            db.update(cls)
+            .where(cls.id == schedule_id, cls.version == expected_version)
+            .values(version=cls.version + 1, updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            return None
+        return expected_version + 1
+
+    # Кэш производной геометрии сетки (дни и количество уроков).
+    # Сбрасывается при изменении start_time/end_time/days_mask и при перезагрузке из БД.
+    _geometry = None
+
+    def _compute_geometry(self):
+        """Однократно восстанавливает дни недели и рассчитывает количество уроков"""
+        day_codes = mask_to_days(self.days_mask)
 
-    @property
-    def lessons_per_day(self):
-        """Автоматически рассчитывает количество уроков в день (фиксированная длительность 60 минут)"""
         # Проверка на None
         if not self.start_time or not self.end_time:
-            print(
-                f"⚠️ WARNING: start_time or end_time is None. start_time: {self.start_time}, end_time: {self.end_time}")
-            return 6  # Значение по умолчанию
+            lessons = DEFAULT_LESSONS_COUNT  # Значение по умолчанию
+        else:
+            try:
+                # Количество уроков берется из общей кэшированной таблицы слотов
+                lessons = lessons_count(self.start_time, self.end_time)
+            except ValueError as e:
+                logger.warning('Неверное время расписания %s: %r-%r: %s', self.id, self.start_time, self.end_time, e)
+                lessons = DEFAULT_LESSONS_COUNT  # Значение по умолчанию при ошибке
 
-        try:
-            start = datetime.strptime(self.start_time, '%H:%M')
-            end = datetime.strptime(self.end_time, '%H:%M')
+        return {'day_codes': day_codes, 'lessons_per_day': lessons}
 
-            # Расчет разницы в минутах
-            total_minutes = (end - start).total_seconds() / 60
+    @property
+    def geometry(self):
+        """Производная геометрия сетки, рассчитанная один раз для загруженного экземпляра"""
+        if self._geometry is None:
+            self._geometry = self._compute_geometry()
+        return self._geometry
 
-            # Количество уроков по 60 минут каждый - ОКРУГЛЯЕМ В БОЛЬШУЮ СТОРОНУ
-            lessons_count = int((total_minutes + 59) // 60)  # Округляем вверх
+    def invalidate_geometry(self):
+        """Сбрасывает кэш геометрии сетки"""
+        self._geometry = None
 
-            return max(1, lessons_count)  # Минимум 1 урок
-        except ValueError as e:
-            print(f"❌ ERROR in lessons_per_day calculation: {e}")
-            print(f"🔍 DEBUG: start_time: {self.start_time}, end_time: {self.end_time}")
-            return 6  # Значение по умолчанию при ошибке
+    @property
+    def day_codes(self):
+        """Коды дней недели расписания в календарном порядке"""
+        return self.geometry['day_codes']
+
+    @day_codes.setter
+    def day_codes(self, value):
+        self.days_mask = days_to_mask(value)
+
+    @property
+    def days_count(self):
+        """Возвращает количество дней в расписании"""
+        return len(self.geometry['day_codes'])
+
+    @hybrid_method
+    def has_day(self, day_code):
+        """Есть ли в расписании указанный день (работает и в SQL-запросах)"""
+        return bool((self.days_mask or 0) & day_bit(day_code))
+
+    @has_day.expression
+    def has_day(cls, day_code):
+        return cls.days_mask.op('&')(day_bit(day_code)) != 0
+
+    @property
+    def lessons_per_day(self):
+        """Автоматически рассчитывает количество уроков в день (фиксированная длительность 60 минут)"""
+        return self.geometry['lessons_per_day']
 
     @property
     def lesson_duration(self):
         """Фиксированная длительность урока - 60 минут"""
-        return 60
+        return LESSON_DURATION
 
     @property
     def created_at_display(self):
@@ -96,7 +168,22 @@ class Schedule(db.Model):
         return 'Не указана'
 
 
+def _invalidate_schedule_geometry(target, *args):
+    target.invalidate_geometry()
+
+
+for _attribute in (Schedule.days_mask, Schedule.start_time, Schedule.end_time):
+    db.event.listen(_attribute, 'set', _invalidate_schedule_geometry)
+db.event.listen(Schedule, 'refresh', _invalidate_schedule_geometry)
+db.event.listen(Schedule, 'expire', _invalidate_schedule_geometry)
+
+
 class Lesson(db.Model):
+    # Одна ячейка сетки на расписание; индекс также покрывает выборки по schedule_id
+    __table_args__ = (
+        db.Index('ix_lesson_schedule_slot', 'schedule_id', 'day_index', 'lesson_index', unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     schedule_id = db.Column(db.Integer, db.ForeignKey('schedule.id'), nullable=False)
     day_index = db.Column(db.Integer)
@@ -122,7 +209,11 @@ class Lesson(db.Model):
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Снимок из кэша вместо SELECT на каждый запрос (см. app/user_cache.py)
+    return user_cache.load(int(user_id))
+
+
+install_invalidation(user_cache, User)
 
 
 # Константы для использования в формах и шаблонах
@@ -0,0 +1,160 @@
+"""Кэш отрендеренных фрагментов страниц.
+
+Фрагмент хранится под ключом (например, ``view_schedule:42``) вместе со
+штампом версии данных. Если штамп при чтении не совпадает с сохраненным,
+фрагмент считается устаревшим. Хранилище выбирается конфигурацией:
+
+* ``PAGE_CACHE_BACKEND = 'memory'`` - LRU в памяти процесса (по умолчанию);
+* ``PAGE_CACHE_BACKEND = 'redis'`` - Redis по адресу ``PAGE_CACHE_REDIS_URL``;
+* ``PAGE_CACHE_BACKEND = 'null'`` - кэш отключен.
+"""
+import threading
+from collections import OrderedDict
+
+
+class MemoryBackend:
+    """LRU-хранилище в памяти процесса, ограниченное количеством записей"""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Хранилище в Redis (или совместимом сервере) с ограничением времени жизни записей"""
+
+    def __init__(self, client, prefix='page:', ttl=3600):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('Для PAGE_CACHE_BACKEND = "redis" установите пакет redis')
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        stamp, _, value = raw.decode('utf-8').partition('\n')
+        return stamp, value
+
+    def set(self, key, value):
+        stamp, html = value
+        self.client.set(self.prefix + key, f'{stamp}\n{html}'.encode('utf-8'), ex=self.ttl)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+
+class NullBackend:
+    """Отключенный кэш"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+
+class PageCache:
+    """Кэш фрагментов с проверкой штампа версии и счетчиками попаданий"""
+
+    def __init__(self, app=None):
+        self.backend = NullBackend()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PAGE_CACHE_BACKEND', 'memory')
+        app.config.setdefault('PAGE_CACHE_MAX_ENTRIES', 512)
+        app.config.setdefault('PAGE_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+        app.config.setdefault('PAGE_CACHE_TTL', 3600)
+
+        backend = app.config['PAGE_CACHE_BACKEND']
+        if backend == 'memory':
+            self.backend = MemoryBackend(app.config['PAGE_CACHE_MAX_ENTRIES'])
+        elif backend == 'redis':
+            self.backend = RedisBackend.from_url(app.config['PAGE_CACHE_REDIS_URL'],
+                                                 ttl=app.config['PAGE_CACHE_TTL'])
+        elif backend == 'null':
+            self.backend = NullBackend()
+        else:
+            raise ValueError(f'Неизвестный PAGE_CACHE_BACKEND: {backend}')
+
+        app.extensions['page_cache'] = self
+
+    def get(self, key, stamp):
+        """Возвращает фрагмент, если он сохранен для того же штампа версии"""
+        entry = self.backend.get(key)
+        hit = entry is not None and entry[0] == stamp
+        # Счетчики общие для потоков воркера, поэтому обновляются под блокировкой
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return entry[1] if hit else None
+
+    def has(self, key, stamp):
+        """Есть ли актуальный фрагмент (без учета в счетчиках попаданий)"""
+        entry = self.backend.get(key)
+        return entry is not None and entry[0] == stamp
+
+    def set(self, key, stamp, html):
+        self.backend.set(key, (stamp, html))
+
+    def delete(self, key):
+        self.backend.delete(key)
+
+    def clear(self):
+        self.backend.clear()
+
+
+def schedule_stamp(schedule):
+    """Штамп версии расписания: меняется при сохранении уроков и изменении самого расписания"""
+    updated = schedule.updated_at.isoformat() if schedule.updated_at else ''
+    return f'{schedule.version}:{updated}'
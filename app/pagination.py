@@ -0,0 +1,57 @@
+"""Keyset-пагинация списков расписаний.
+
+Курсор указывает на последнюю показанную запись (created_at, id), поэтому
+следующая страница выбирается по индексу без OFFSET и не «плывет»,
+если пользователь создает или удаляет расписания во время прокрутки.
+"""
+import base64
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+# Количество карточек на одной странице панели управления
+DASHBOARD_PAGE_SIZE = 24
+
+
+def encode_cursor(created_at, item_id):
+    """Кодирует позицию (created_at, id) в непрозрачную строку для URL"""
+    created = created_at.isoformat() if created_at is not None else ''
+    raw = f'{created}|{item_id}'.encode('ascii')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Декодирует курсор в (created_at, id); ValueError для поврежденного курсора"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created, item_id = base64.urlsafe_b64decode(padded.encode('ascii')).decode('ascii').split('|')
+        return (datetime.fromisoformat(created) if created else None), int(item_id)
+    except (UnicodeError, TypeError, ValueError) as e:
+        raise ValueError(f'Неверный курсор: {cursor}') from e
+
+
+def newest_first_page(query, model, cursor=None, limit=DASHBOARD_PAGE_SIZE):
+    """Возвращает (items, next_cursor) для сортировки created_at DESC NULLS LAST, id DESC"""
+    if cursor:
+        created_at, item_id = decode_cursor(cursor)
+        if created_at is None:
+            # Курсор уже в хвосте записей без даты
+            query = query.filter(model.created_at.is_(None), model.id < item_id)
+        else:
+            query = query.filter(or_(
+                model.created_at < created_at,
+                and_(model.created_at == created_at, model.id < item_id),
+                model.created_at.is_(None),
+            ))
+
+    items = (query
+             .order_by(model.created_at.desc().nulls_last(), model.id.desc())
+             .limit(limit + 1)
+             .all())
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return items, next_cursor
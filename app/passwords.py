@@ -0,0 +1,93 @@
+"""Политика хеширования паролей.
+
+Алгоритм и стоимость задаются строкой метода Werkzeug в
+``PASSWORD_HASH_METHOD`` (переменная окружения с тем же именем), например
+``scrypt:32768:8:1`` (по умолчанию) или ``pbkdf2:sha256:600000``. Хеши,
+созданные другим методом, пересчитываются при успешном входе - после смены
+политики пароли переходят на новую стоимость без участия пользователей.
+
+Проверка пароля - основная нагрузка на процессор при утреннем пике входов.
+Она выполняется в ограниченном пуле потоков (``PASSWORD_VERIFY_WORKERS``,
+по умолчанию - доля ядер на один воркер gunicorn, как у пула PDF; 0 - в
+потоке запроса): scrypt и PBKDF2 освобождают GIL, а пулы всех воркеров
+вместе не дают одновременным входам занять больше ядер, чем есть на машине. Стоимость каждого метода на этой машине показывает
+benchmarks/bench_password_hash.py.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from app.pdf_export import default_workers
+
+DEFAULT_HASH_METHOD = 'scrypt:32768:8:1'
+
+# Количество параметров в полной записи метода
+_METHOD_PARAMS = {'scrypt': 3, 'pbkdf2': 2}
+
+
+def hash_method(password_hash):
+    """Метод со стоимостью из сохраненного хеша ("scrypt:32768:8:1$соль$хеш")"""
+    return (password_hash or '').split('$', 1)[0]
+
+
+def normalize_method(method):
+    """Полная запись метода с параметрами по умолчанию ("pbkdf2" -> "pbkdf2:sha256:...")"""
+    if method.count(':') == _METHOD_PARAMS.get(method.split(':', 1)[0]):
+        return method
+    # Параметры по умолчанию знает только Werkzeug: берем их из пробного хеша
+    return hash_method(generate_password_hash('', method))
+
+
+class PasswordPolicy:
+    """Хеширование, проверка в пуле потоков и пересчет устаревших хешей"""
+
+    def __init__(self, app=None):
+        self.method = DEFAULT_HASH_METHOD
+        self.workers = 0
+        self.timeout = None
+        self._executor = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_METHOD', os.environ.get('PASSWORD_HASH_METHOD') or DEFAULT_HASH_METHOD)
+        app.config.setdefault('PASSWORD_VERIFY_WORKERS',
+                              int(os.environ.get('PASSWORD_VERIFY_WORKERS') or default_workers()))
+        app.config.setdefault('PASSWORD_VERIFY_TIMEOUT', 30)
+
+        self.method = normalize_method(app.config['PASSWORD_HASH_METHOD'])
+        self.workers = app.config['PASSWORD_VERIFY_WORKERS']
+        self.timeout = app.config['PASSWORD_VERIFY_TIMEOUT']
+        app.extensions['password_policy'] = self
+
+    def _get_executor(self):
+        # Пул создается при первой проверке, уже в процессе воркера
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix='password-verify')
+            return self._executor
+
+    def hash(self, password):
+        return generate_password_hash(password, self.method)
+
+    def needs_rehash(self, password_hash):
+        return hash_method(password_hash) != self.method
+
+    def verify(self, password_hash, password):
+        """Проверяет пароль (в пуле, если он включен)"""
+        if not password_hash:
+            return False
+        if not self.workers:
+            return check_password_hash(password_hash, password)
+        future = self._get_executor().submit(check_password_hash, password_hash, password)
+        return future.result(timeout=self.timeout)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
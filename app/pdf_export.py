@@ -0,0 +1,263 @@
+"""Серверный экспорт расписания в PDF.
+
+Рендеринг выполняется функцией render_schedule_pdf в пуле процессов.
+Запрос только ставит задачу в пул и сразу отвечает 202 с адресом статуса;
+поток обработки запросов не ждет рендеринга. Готовый файл сохраняется
+обратным вызовом задачи на диск под именем, включающим версию расписания,
+поэтому повторная выгрузка неизмененного расписания отдается без рендеринга.
+
+Настройки приложения:
+
+* ``PDF_CACHE_DIR`` - каталог для готовых PDF (по умолчанию ``instance/pdf_cache``);
+* ``PDF_WORKERS`` - количество процессов рендеринга в каждом процессе
+  приложения (по умолчанию переменная окружения ``PDF_WORKERS`` или доля
+  ядер на один воркер gunicorn, см. default_workers);
+* ``PDF_RENDER_TIMEOUT`` - через сколько секунд незавершенная задача
+  считается неудачной;
+* ``PDF_FONT_PATH`` - TTF-шрифт с кириллицей.
+"""
+import glob
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.page_cache import schedule_stamp
+
+# Шрифты с кириллицей, которые ищутся, если PDF_FONT_PATH не задан
+FONT_CANDIDATES = (
+    'C:/Windows/Fonts/arial.ttf',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/usr/share/fonts/dejavu/DejaVuSans.ttf',
+    '/Library/Fonts/Arial.ttf',
+    '/System/Library/Fonts/Supplemental/Arial.ttf',
+)
+
+PDF_FONT_NAME = 'ScheduleFont'
+
+logger = logging.getLogger(__name__)
+
+
+def default_workers():
+    """Доля ядер на один процесс приложения (как в gunicorn.conf.py).
+
+    Пул создается в каждом воркере gunicorn, поэтому пул на все ядра в
+    каждом из 2 * ядра + 1 воркеров перегрузил бы процессор.
+    """
+    cpu_count = os.cpu_count() or 1
+    web_workers = int(os.environ.get('WEB_CONCURRENCY') or cpu_count * 2 + 1)
+    return max(1, cpu_count // web_workers)
+
+
+def find_font(font_path=None):
+    """Возвращает путь к TTF-шрифту с кириллицей или None"""
+    for candidate in (font_path, *FONT_CANDIDATES):
+        if candidate and os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def _register_font(font_path):
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    if font_path is None:
+        return 'Helvetica'
+    if PDF_FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, font_path))
+    return PDF_FONT_NAME
+
+
+def render_schedule_pdf(document, font_path=None):
+    """Рендерит сетку расписания в PDF (альбомный A4) и возвращает байты файла"""
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.lib.units import mm
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, TableStyle
+    from xml.sax.saxutils import escape
+
+    font_name = _register_font(font_path)
+    days = document['days']
+    lesson_times = document['lesson_times']
+
+    title_style = ParagraphStyle('title', fontName=font_name, fontSize=18, leading=22, spaceAfter=6 * mm)
+    cell_style = ParagraphStyle('cell', fontName=font_name, fontSize=10, leading=12, alignment=1)
+    header_style = ParagraphStyle('header', parent=cell_style, textColor=colors.white)
+
+    rows = [[Paragraph('Время', header_style)] + [Paragraph(escape(day), header_style) for day in days]]
+    styles = [
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#BDBDBD')),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4CAF50')),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ]
+
+    for lesson_index, slot in enumerate(lesson_times):
+        time_label = f"{slot['start']} - {slot['end']}" if slot['end'] else slot['start']
+        row = [Paragraph(escape(time_label), cell_style)]
+        for day_index in range(len(days)):
+            lesson = document['lessons'].get(f'{day_index}_{lesson_index}')
+            if lesson and lesson['subject_name']:
+                row.append(Paragraph(escape(lesson['subject_name']), cell_style))
+                try:
+                    background = colors.HexColor(lesson['color'])
+                except ValueError:
+                    background = colors.white
+                styles.append(('BACKGROUND', (day_index + 1, lesson_index + 1),
+                                (day_index + 1, lesson_index + 1), background))
+            else:
+                row.append('')
+        rows.append(row)
+
+    page_size = landscape(A4)
+    margin = 12 * mm
+    time_width = 28 * mm
+    day_width = (page_size[0] - 2 * margin - time_width) / max(1, len(days))
+
+    table = Table(rows, colWidths=[time_width] + [day_width] * len(days), repeatRows=1)
+    table.setStyle(TableStyle(styles))
+
+    buffer = io.BytesIO()
+    pdf = SimpleDocTemplate(buffer, pagesize=page_size, title=document['title'],
+                            leftMargin=margin, rightMargin=margin, topMargin=margin, bottomMargin=margin)
+    pdf.build([Paragraph(escape(document['title']), title_style), table])
+    return buffer.getvalue()
+
+
+class PdfExporter:
+    """Пул рендеринга PDF с дисковым кэшем по версии расписания"""
+
+    def __init__(self, app=None):
+        self._executor = None
+        self._pending = {}
+        self._failed = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PDF_CACHE_DIR', os.path.join(app.instance_path, 'pdf_cache'))
+        app.config.setdefault('PDF_WORKERS', int(os.environ.get('PDF_WORKERS') or 0) or default_workers())
+        app.config.setdefault('PDF_RENDER_TIMEOUT', 30)
+        app.config.setdefault('PDF_FONT_PATH', None)
+
+        self.cache_dir = app.config['PDF_CACHE_DIR']
+        self.workers = app.config['PDF_WORKERS']
+        self.timeout = app.config['PDF_RENDER_TIMEOUT']
+        self.font_path = find_font(app.config['PDF_FONT_PATH'])
+        if app.config['PDF_FONT_PATH'] and self.font_path != app.config['PDF_FONT_PATH']:
+            logger.warning('PDF_FONT_PATH %s не найден', app.config['PDF_FONT_PATH'])
+        if self.font_path is None:
+            # Во встроенном Helvetica нет кириллицы: вместо текста будут пустые квадраты
+            logger.warning('TTF-шрифт с кириллицей не найден, PDF будет использовать Helvetica '
+                           'без кириллицы; укажите PDF_FONT_PATH')
+        app.extensions['pdf_exporter'] = self
+
+    def _get_executor(self):
+        # Пул создается при первом экспорте, а не при импорте приложения.
+        # Вызывается под self._lock.
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def cache_path(self, schedule):
+        """Путь к файлу PDF для текущей версии расписания"""
+        digest = hashlib.sha1(schedule_stamp(schedule).encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.cache_dir, f'schedule-{schedule.id}-v{schedule.version}-{digest}.pdf')
+
+    def cached(self, schedule):
+        """Путь к готовому PDF, если он уже есть на диске"""
+        path = self.cache_path(schedule)
+        return path if os.path.exists(path) else None
+
+    def status(self, schedule, build_document):
+        """Состояние PDF текущей версии: ('ready', путь), ('pending', None) или ('failed', None).
+
+        Если файла нет и задача не запущена, ставит рендеринг в пул и сразу
+        возвращает 'pending'; build_document() вызывается только в этом случае.
+        Одновременные запросы одной версии расписания получают одну задачу.
+        """
+        path = self.cache_path(schedule)
+        if os.path.exists(path):
+            return 'ready', path
+
+        with self._lock:
+            if self._failed.pop(path, None):
+                return 'failed', None
+            pending = self._pending.get(path)
+            if pending is not None:
+                future, started_at = pending
+                if time.monotonic() - started_at <= self.timeout:
+                    return 'pending', None
+                # Зависшая задача: следующий запрос запустит рендеринг заново
+                del self._pending[path]
+                return 'failed', None
+
+        document = build_document()
+        with self._lock:
+            if path in self._pending:
+                return 'pending', None
+            future = self._get_executor().submit(render_schedule_pdf, document, self.font_path)
+            self._pending[path] = (future, time.monotonic())
+        # Вне блокировки: для уже завершенной задачи обратный вызов выполняется сразу
+        schedule_id = schedule.id
+        future.add_done_callback(lambda done: self._finish(schedule_id, path, done))
+        return 'pending', None
+
+    def _finish(self, schedule_id, path, future):
+        """Обратный вызов задачи: сохраняет файл или запоминает ошибку для статуса"""
+        with self._lock:
+            pending = self._pending.get(path)
+            if pending is None or pending[0] is not future:
+                return
+            del self._pending[path]
+            try:
+                self._store(schedule_id, path, future.result())
+            except Exception as e:
+                logger.exception('Ошибка рендеринга PDF %s', path)
+                self._failed[path] = repr(e)
+
+    def submit(self, fn, *args):
+        """Отправляет произвольную задачу рендеринга в пул процессов"""
+        with self._lock:
+            return self._get_executor().submit(fn, *args)
+
+    def store(self, schedule_id, path, data):
+        """Сохраняет в кэш PDF, отрендеренный не через status() (например, массовой выгрузкой)"""
+        with self._lock:
+            if path not in self._pending:
+                self._store(schedule_id, path, data)
+
+    def _store(self, schedule_id, path, data):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Атомарная запись, чтобы параллельный запрос не отдал недописанный файл
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as tmp_file:
+            tmp_file.write(data)
+        os.replace(tmp_path, path)
+
+        # Файлы предыдущих версий больше не нужны
+        for old_path in glob.glob(os.path.join(self.cache_dir, f'schedule-{schedule_id}-v*.pdf')):
+            if old_path != path:
+                try:
+                    os.remove(old_path)
+                except OSError:
+                    pass
+
+    def discard(self, schedule_id):
+        """Удаляет все сохраненные PDF расписания"""
+        for path in glob.glob(os.path.join(self.cache_dir, f'schedule-{schedule_id}-v*.pdf')):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
@@ -0,0 +1,58 @@
+"""Подсчет SQL-запросов и проверка бюджета запросов страницы.
+
+    with query_budget(4, 'дашборд'):
+        client.get('/dashboard')
+
+Если внутри блока выполнено больше запросов, чем разрешено, выбрасывается
+QueryBudgetExceeded (подкласс AssertionError) со списком выполненных
+запросов - так N+1 видно сразу. Используется скриптом
+benchmarks/check_query_budget.py.
+"""
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryCounter:
+    """Запросы, выполненные всеми движками за время подсчета"""
+
+    def __init__(self):
+        self.statements = []
+
+    def __len__(self):
+        return len(self.statements)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(engine=Engine):
+    """Считает запросы движка (по умолчанию - всех движков процесса)"""
+    counter = QueryCounter()
+    event.listen(engine, 'before_cursor_execute', counter._on_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', counter._on_execute)
+
+
+@contextmanager
+def query_budget(budget, label='', engine=Engine):
+    """Проверяет, что блок выполнил не больше budget запросов"""
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > budget:
+        statements = '\n'.join(f'  {index + 1}. {" ".join(statement.split())}'
+                               for index, statement in enumerate(counter.statements))
+        raise QueryBudgetExceeded(
+            f'{label or "блок"}: {counter.count} запросов при бюджете {budget}\n{statements}')
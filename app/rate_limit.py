@@ -0,0 +1,115 @@
+"""Ограничение частоты запросов корзиной токенов в памяти процесса.
+
+Каждому ключу (например, IP-адресу для входа) соответствует корзина на
+``burst`` токенов, которая пополняется со скоростью ``per_minute`` токенов
+в минуту; запрос забирает один токен. Пустая корзина означает отказ с
+указанием, через сколько секунд появится следующий токен. Так перебор
+паролей не может занять процессор хешированием: отказ не требует ни
+обращения к базе, ни проверки хеша.
+
+Лимиты задаются в ``RATE_LIMITS`` как {область: (burst, per_minute)}.
+Корзины хранятся в LRU на ``RATE_LIMIT_MAX_KEYS`` ключей; счетчики
+отдельные в каждом процессе gunicorn. ``RATE_LIMIT_ENABLED = False``
+(переменная окружения ``RATE_LIMIT_ENABLED=0``) отключает ограничение,
+например для нагрузочных тестов с одного адреса. За обратным прокси адрес клиента должен быть
+восстановлен (ProxyFix), иначе все запросы попадут в одну корзину.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_RATE_LIMITS = {
+    # Попытки входа с одного адреса
+    'login': (10, 10),
+    # Неудачные попытки входа в один аккаунт с одного адреса
+    'login_username': (5, 5),
+    # Регистрации с одного адреса
+    'register': (5, 2),
+}
+
+
+class TokenBucket:
+    __slots__ = ('tokens', 'updated_at')
+
+    def __init__(self, tokens, now):
+        self.tokens = tokens
+        self.updated_at = now
+
+    def refill(self, burst, rate, now):
+        self.tokens = min(burst, self.tokens + (now - self.updated_at) * rate)
+        self.updated_at = now
+
+    def take(self, burst, rate, now):
+        """Забирает токен; возвращает 0 или секунды до появления токена"""
+        self.refill(burst, rate, now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / rate
+
+
+class RateLimiter:
+    """Корзины токенов по (область, ключ) с отказами, подсчитанными по областям"""
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.limits = dict(DEFAULT_RATE_LIMITS)
+        self.max_keys = 10000
+        self.rejected = {}
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RATE_LIMIT_ENABLED', os.environ.get('RATE_LIMIT_ENABLED', '1') != '0')
+        app.config.setdefault('RATE_LIMITS', {})
+        app.config.setdefault('RATE_LIMIT_MAX_KEYS', 10000)
+
+        self.enabled = app.config['RATE_LIMIT_ENABLED']
+        self.limits = {**DEFAULT_RATE_LIMITS, **app.config['RATE_LIMITS']}
+        self.max_keys = app.config['RATE_LIMIT_MAX_KEYS']
+        app.extensions['rate_limiter'] = self
+
+    def hit(self, scope, key):
+        """Учитывает запрос; возвращает 0, если он разрешен, иначе секунды ожидания"""
+        if not self.enabled or scope not in self.limits:
+            return 0
+        burst, per_minute = self.limits[scope]
+        rate = per_minute / 60
+        now = time.monotonic()
+
+        with self._lock:
+            bucket = self._buckets.get((scope, key))
+            if bucket is None:
+                bucket = self._buckets[(scope, key)] = TokenBucket(burst, now)
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end((scope, key))
+            retry_after = bucket.take(burst, rate, now)
+            if retry_after:
+                self.rejected[scope] = self.rejected.get(scope, 0) + 1
+            return retry_after
+
+    def retry_after(self, scope, key):
+        """Секунды до появления токена (0, если он есть); токен не забирается"""
+        if not self.enabled or scope not in self.limits:
+            return 0
+        burst, per_minute = self.limits[scope]
+        rate = per_minute / 60
+
+        with self._lock:
+            bucket = self._buckets.get((scope, key))
+            if bucket is None:
+                return 0
+            bucket.refill(burst, rate, time.monotonic())
+            if bucket.tokens >= 1:
+                return 0
+            self.rejected[scope] = self.rejected.get(scope, 0) + 1
+            return (1 - bucket.tokens) / rate
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
@@ -1,59 +1,108 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
-from flask_login import login_required, current_user, logout_user, login_user
-from app import db
-from app.forms import LoginForm, RegistrationForm, ScheduleForm
+from flask import (Blueprint, render_template, redirect, url_for, flash, request, jsonify, make_response,
+                   send_file, Response, stream_with_context, abort, current_app)
+from markupsafe import Markup
+from flask_login import login_required, current_user
+from app import db, metrics, page_cache, pdf_exporter, user_cache
+from app.health import check_database, health_response
+from app.page_cache import schedule_stamp
+from app.schedule_document import build_schedule_document
+from app.http_cache import (schedule_validators, is_not_modified, not_modified_response,
+                            set_validators, PRIVATE_CACHE_CONTROL)
+from app.forms import ScheduleForm
 from app.models import Schedule, Lesson, User, AVAILABLE_FONTS
+from app.lesson_store import lesson_row, replace_schedule_lessons, lesson_grid_select
+from app.loading import schedule_query, schedule_options
+from app.lesson_times import lesson_slots, DEFAULT_LESSON_SLOTS
+from app.weekdays import days_to_mask, count_days
+from app.pagination import newest_first_page
+from app.stats import user_schedule_stats
+from app.api import api_token, build_schedule_payload
+from app.bulk_export import stream_schedules_zip, user_schedule_ids, parse_formats
+from app.calendar_feed import (feed_token, user_from_token, token_schedule, feed_validators, render_feed,
+                               user_feed_schedules, events_cache_key)
+from urllib.parse import quote
 import json
 from datetime import datetime, timedelta
 
 # Создаем Blueprint с именем 'main'
 main = Blueprint('main', __name__)
 
+# Через сколько секунд клиенту повторить запрос статуса PDF
+PDF_POLL_INTERVAL = 1
+
+
+@main.after_request
+def apply_cache_policy(response):
+    """Страницы авторизованного пользователя не должны попадать в общие кэши"""
+    if current_user.is_authenticated and 'Cache-Control' not in response.headers:
+        response.headers['Cache-Control'] = PRIVATE_CACHE_CONTROL
+        response.vary.add('Cookie')
+    return response
+
 
 @main.app_template_filter('count_days')
-def count_days_filter(days_json):
-    """Фильтр для подсчета дней из JSON строки"""
+def count_days_filter(days_mask):
+    """Фильтр для подсчета дней по маске дней недели"""
     try:
-        days_list = json.loads(days_json)
-        return len(days_list)
-    except (json.JSONDecodeError, TypeError):
+        return count_days(days_mask)
+    except TypeError:
         return 0
 
 
 def calculate_lesson_times(start_time, end_time):
     """Рассчитывает время начала и окончания каждого урока (фиксированная длительность 60 минут)"""
+    # Проверка на None
+    if not start_time or not end_time:
+        # Возвращаем значения по умолчанию
+        return DEFAULT_LESSON_SLOTS
+
     try:
-        # Проверка на None
-        if not start_time or not end_time:
-            print(f"⚠️ WARNING: start_time or end_time is None. start_time: {start_time}, end_time: {end_time}")
-            # Возвращаем значения по умолчанию
-            return [{'start': f'Урок {i + 1}', 'end': ''} for i in range(6)]
-
-        start = datetime.strptime(start_time, '%H:%M')
-        end = datetime.strptime(end_time, '%H:%M')
-
-        # Расчет общего времени в минутах
-        total_minutes = (end - start).total_seconds() / 60
-
-        # Количество уроков по 60 минут каждый - ОКРУГЛЯЕМ В БОЛЬШУЮ СТОРОНУ
-        lessons_count = int((total_minutes + 59) // 60)  # Округляем вверх
-        lessons_count = max(1, lessons_count)  # Минимум 1 урок
-
-        times = []
-        for i in range(lessons_count):
-            lesson_start = start + timedelta(minutes=60 * i)  # Фиксированная длительность 60 минут
-            lesson_end = lesson_start + timedelta(minutes=60)  # Фиксированная длительность 60 минут
-            times.append({
-                'start': lesson_start.strftime('%H:%M'),
-                'end': lesson_end.strftime('%H:%M')
-            })
-
-        return times
+        # Слоты берутся из общей кэшированной таблицы
+        return lesson_slots(start_time, end_time)
     except ValueError as e:
-        print(f"❌ ERROR in calculate_lesson_times: {e}")
-        print(f"🔍 DEBUG: start_time: {start_time}, end_time: {end_time}")
+        current_app.logger.warning('Неверное время расписания %r-%r: %s', start_time, end_time, e)
         # Если формат времени неверный, возвращаем простую нумерацию
-        return [{'start': f'Урок {i + 1}', 'end': ''} for i in range(6)]
+        return DEFAULT_LESSON_SLOTS
+
+
+def lessons_from_rows(rows):
+    """Словарь уроков {"день_урок": {...}} из строк lesson_grid_select"""
+    return {
+        f"{row.day_index}_{row.lesson_index}": {
+            'subject_name': row.subject_name,
+            'color': row.color,
+            'lesson_link': row.lesson_link,
+            'link_text': row.link_text,
+            'font_family': row.font_family
+        }
+        for row in rows
+    }
+
+
+def load_lessons_dict(schedule_id):
+    """Загружает уроки расписания в словарь {"день_урок": {...}}"""
+    return lessons_from_rows(db.session.execute(lesson_grid_select(schedule_id)))
+
+
+# Способы построения сетки на странице просмотра: на сервере или в браузере из JSON
+VIEW_RENDER_MODES = ('server', 'client')
+
+
+def view_schedule_cache_key(schedule_id, mode='server'):
+    """Ключ кэша отрендеренной сетки страницы просмотра расписания"""
+    return f'view_schedule:{mode}:{schedule_id}'
+
+
+def discard_view_schedule_cache(schedule_id):
+    """Удаляет из кэша сетку страницы просмотра во всех режимах"""
+    for mode in VIEW_RENDER_MODES:
+        page_cache.delete(view_schedule_cache_key(schedule_id, mode))
+
+
+def view_render_mode():
+    """Режим построения сетки: параметр ?render= или настройка VIEW_SCHEDULE_RENDER_MODE"""
+    mode = request.args.get('render') or current_app.config.get('VIEW_SCHEDULE_RENDER_MODE', 'client')
+    return mode if mode in VIEW_RENDER_MODES else 'server'
 
 
 def get_day_display_name(day_code):
@@ -87,75 +136,44 @@ def index():
     return render_template('index.html')
 
 
-# Вход в систему - ДОБАВЛЯЕМ ЭТОТ МАРШРУТ
-@main.route('/login', methods=['GET', 'POST'])
-def login():
-    """Вход в систему"""
-    form = LoginForm()
-    if form.validate_on_submit():
-        user = User.query.filter_by(username=form.username.data).first()
-        if user and user.check_password(form.password.data):
-            login_user(user)
-            flash('Вы успешно вошли в систему!', 'success')
-            return redirect(url_for('main.dashboard'))
-        else:
-            flash('Неверное имя пользователя или пароль.', 'danger')
-    return render_template('login.html', form=form)
-
-
-# Регистрация - ДОБАВЛЯЕМ ЭТОТ МАРШРУТ
-@main.route('/register', methods=['GET', 'POST'])
-def register():
-    """Регистрация нового пользователя"""
-    form = RegistrationForm()
-    if form.validate_on_submit():
-        # Валидация username
-        if User.query.filter_by(username=form.username.data).first():
-            flash('Это имя пользователя уже занято.', 'danger')
-            return render_template('register.html', form=form)
-
-        # Валидация email
-        if User.query.filter_by(email=form.email.data).first():
-            flash('Этот email уже используется.', 'danger')
-            return render_template('register.html', form=form)
-
-        # Создание пользователя
-        user = User(username=form.username.data, email=form.email.data)
-        user.set_password(form.password.data)
-        db.session.add(user)
-        db.session.commit()
-
-        flash('Регистрация прошла успешно! Теперь вы можете войти.', 'success')
-        return redirect(url_for('main.login'))
-
-    return render_template('register.html', form=form)
-
-
-# Выход из системы
-@main.route('/logout')
-@login_required
-def logout():
-    """Выход из системы"""
-    logout_user()
-    flash('Вы вышли из системы.', 'info')
-    return redirect(url_for('main.index'))
-
-
 # Панель управления пользователя
 @main.route('/dashboard')
 @login_required
 def dashboard():
-    """Личный кабинет пользователя со списком расписаний"""
-    schedules = Schedule.query.filter_by(user_id=current_user.id).all()
+    """Личный кабинет пользователя со списком расписаний.
 
-    # Безопасная сортировка с обработкой None значений
-    sorted_schedules = sorted(
-        schedules,
-        key=lambda x: x.created_at if x.created_at is not None else datetime.min,
-        reverse=True
-    )
+    Расписания выдаются страницами (новые сначала) по курсору ?cursor=.
+    С параметром ?format=json возвращается следующая порция карточек
+    для подгрузки при прокрутке.
+    """
+    cursor = request.args.get('cursor')
+    try:
+        schedules, next_cursor = newest_first_page(
+            schedule_query('dashboard').filter_by(user_id=current_user.id), Schedule, cursor)
+    except ValueError:
+        if request.args.get('format') == 'json':
+            return jsonify({'success': False, 'error': 'Неверный курсор'}), 400
+        return redirect(url_for('main.dashboard'))
 
-    return render_template('dashboard.html', schedules=sorted_schedules)
+    if request.args.get('format') == 'json':
+        return jsonify({
+            'success': True,
+            'schedules': [{
+                'id': schedule.id,
+                'title': schedule.title,
+                'days_count': schedule.days_count,
+                'lessons_per_day': schedule.lessons_per_day,
+                'start_time': schedule.start_time,
+                'end_time': schedule.end_time,
+                'created_at': schedule.created_at.isoformat() if schedule.created_at else None,
+            } for schedule in schedules],
+            'html': render_template('_schedule_cards.html', schedules=schedules),
+            'next_cursor': next_cursor,
+        })
+
+    calendar_url = url_for('main.user_calendar', token=feed_token(current_user), _external=True)
+    return render_template('dashboard.html', schedules=schedules, next_cursor=next_cursor,
+                           calendar_url=calendar_url)
 
 
 # Создание нового расписания
@@ -167,9 +185,6 @@ def create_schedule():
 
     if form.validate_on_submit():
         try:
-            print(f"DEBUG: Form data - {form.data}")
-            print(f"DEBUG: Days of week data - {form.days_of_week.data}, type: {type(form.days_of_week.data)}")
-
             # Проверка времени (без всплывающих окон)
             start_time = form.start_time.data
             end_time = form.end_time.data
@@ -198,15 +213,14 @@ def create_schedule():
             else:
                 days_list = form.days_of_week.data
 
-            # Конвертируем в JSON строку
-            days_json = json.dumps(days_list)
-            print(f"DEBUG: Days JSON - {days_json}")
+            # Конвертируем в маску дней недели
+            days_mask = days_to_mask(days_list)
 
             # Создаем новое расписание
             schedule = Schedule(
                 title=form.title.data,
                 user_id=current_user.id,
-                days_of_week=days_json,
+                days_mask=days_mask,
                 start_time=form.start_time.data,
                 end_time=form.end_time.data
             )
@@ -219,9 +233,7 @@ def create_schedule():
 
         except Exception as e:
             db.session.rollback()
-            print(f"ERROR in create_schedule: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            current_app.logger.exception('Ошибка создания расписания')
             flash(f'Ошибка при создании расписания: {str(e)}', 'danger')
 
     return render_template('create_schedule.html', form=form)
@@ -232,17 +244,19 @@ def create_schedule():
 @login_required
 def edit_schedule(schedule_id):
     """Страница редактирования расписания"""
-    schedule = Schedule.query.get_or_404(schedule_id)
+    schedule = schedule_query('edit').get_or_404(schedule_id)
 
     # Проверяем, что пользователь имеет доступ к этому расписанию
     if schedule.user_id != current_user.id:
         flash('У вас нет доступа к этому расписанию.', 'danger')
         return redirect(url_for('main.dashboard'))
 
-    try:
-        days_list = json.loads(schedule.days_of_week)
-    except (json.JSONDecodeError, TypeError):
-        days_list = ['mon', 'tue', 'wed', 'thu', 'fri']
+    # Повторный запрос без изменений расписания получает 304 без рендеринга
+    etag, last_modified = schedule_validators(schedule, 'edit')
+    if is_not_modified(etag, last_modified):
+        return not_modified_response(etag, last_modified)
+
+    days_list = schedule.day_codes
 
     # Безопасное преобразование кодов дней в читаемые названия
     display_days = [get_day_display_name(day) for day in days_list]
@@ -251,17 +265,7 @@ def edit_schedule(schedule_id):
     lesson_times = calculate_lesson_times(schedule.start_time, schedule.end_time)
 
     # Загружаем существующие уроки если они есть и преобразуем в словари
-    lessons = {}
-    existing_lessons = Lesson.query.filter_by(schedule_id=schedule_id).all()
-    for lesson in existing_lessons:
-        key = f"{lesson.day_index}_{lesson.lesson_index}"
-        lessons[key] = {
-            'subject_name': lesson.subject_name,
-            'color': lesson.color,
-            'lesson_link': lesson.lesson_link,
-            'link_text': lesson.link_text,
-            'font_family': lesson.font_family
-        }
+    lessons = load_lessons_dict(schedule_id)
 
     # Список доступных предметов для красивого выбора
     available_subjects = [
@@ -279,48 +283,57 @@ def edit_schedule(schedule_id):
         "#d6d4fb", "#fcbfe7", "#ffffff", "#caf2c0", "#f5d5fb", "#fbffbd", "#a5e1f7"
     ]
 
-    return render_template('edit_schedule.html',
-                           schedule=schedule,
-                           days=display_days,
-                           day_codes=days_list,
-                           lesson_times=lesson_times,
-                           lessons=lessons,
-                           available_subjects=available_subjects,
-                           popular_colors=popular_colors,
-                           available_fonts=AVAILABLE_FONTS)
+    response = make_response(render_template('edit_schedule.html',
+                                             schedule=schedule,
+                                             days=display_days,
+                                             day_codes=days_list,
+                                             lesson_times=lesson_times,
+                                             lessons=lessons,
+                                             available_subjects=available_subjects,
+                                             popular_colors=popular_colors,
+                                             available_fonts=AVAILABLE_FONTS))
+    return set_validators(response, etag, last_modified)
 
 
 # Сохранение расписания
 @main.route('/schedule/<int:schedule_id>/save', methods=['POST'])
 @login_required
 def save_schedule(schedule_id):
-    print(f"🔍 DEBUG: Save request received for schedule {schedule_id}")
+    """Сохраняет сетку расписания целиком.
 
+    Ожидает JSON вида {"version": 3, "lessons": {"0_1": {...}, ...}}; если
+    версия клиента устарела, возвращается 409 и актуальная версия. Тело без
+    "lessons" (словарь ячеек, как у прежних клиентов) сохраняется поверх
+    версии, загруженной из базы.
+    """
     try:
         schedule = Schedule.query.get_or_404(schedule_id)
-        print(f"🔍 DEBUG: Schedule found: {schedule.title}")
 
         # Проверка прав доступа
         if schedule.user_id != current_user.id:
             return jsonify({'success': False, 'error': 'Access denied'}), 403
 
-        data = request.get_json()
-        print(f"🔍 DEBUG: Received data: {data}")
+        data = request.get_json(silent=True)
 
-        if not data:
+        if not data or not isinstance(data, dict):
             return jsonify({'success': False, 'error': 'No data provided'}), 400
 
-        # Удаляем существующие уроки
-        Lesson.query.filter_by(schedule_id=schedule_id).delete()
+        if 'lessons' in data:
+            version = data.get('version')
+            if not isinstance(version, int) or isinstance(version, bool):
+                return jsonify({'success': False, 'error': 'Invalid version'}), 400
+            if not isinstance(data['lessons'], dict):
+                return jsonify({'success': False, 'error': 'No data provided'}), 400
+            data = data['lessons']
+        else:
+            version = schedule.version
 
         # Получаем дни недели из расписания
-        try:
-            days_list = json.loads(schedule.days_of_week)
-        except (json.JSONDecodeError, TypeError):
-            days_list = ['mon', 'tue', 'wed', 'thu', 'fri']
+        days_list = schedule.day_codes
+        lessons_per_day = schedule.lessons_per_day
 
-        # Сохраняем новые уроки
-        new_lessons_count = 0
+        # Собираем строки новых уроков
+        rows = []
         for key, lesson_data in data.items():
             if '_' in key:
                 try:
@@ -328,83 +341,211 @@ def save_schedule(schedule_id):
 
                     # Используем автоматически рассчитанное количество уроков
                     if (0 <= day_index < len(days_list) and
-                            0 <= lesson_index < schedule.lessons_per_day):
-                        font_family = lesson_data.get('font_family', 'Bookman Old Style')
-                        print(f"🔍 DEBUG: Saving lesson {key} with font: '{font_family}'")
-
-                        lesson = Lesson(
-                            schedule_id=schedule_id,
-                            day_index=day_index,
-                            lesson_index=lesson_index,
-                            subject_name=lesson_data.get('subject_name', ''),
-                            color=lesson_data.get('color', '#FFFFFF'),
-                            lesson_link=lesson_data.get('lesson_link', ''),
-                            link_text=lesson_data.get('link_text', ''),
-                            font_family=font_family
-                        )
-                        db.session.add(lesson)
-                        new_lessons_count += 1
-
-                except (ValueError, TypeError) as e:
-                    print(f"🔍 DEBUG: Error processing key {key}: {e}")
-                    continue
+                            0 <= lesson_index < lessons_per_day):
+                        rows.append(lesson_row(schedule_id, day_index, lesson_index, lesson_data))
+
+                except (ValueError, TypeError, AttributeError):
+                    continue  # неверный ключ ячейки пропускается
+
+        # Проверка версии и ее увеличение одним UPDATE до записи уроков
+        new_version = Schedule.bump_version_if(schedule_id, version)
+        if new_version is None:
+            db.session.rollback()
+            current_version = db.session.scalar(db.select(Schedule.version).where(Schedule.id == schedule_id))
+            return version_conflict_response(current_version)
+
+        # Заменяем существующие уроки одним пакетным INSERT
+        new_lessons_count = replace_schedule_lessons(schedule_id, rows)
+        metrics.observe_lesson_save(new_lessons_count, 'full')
 
         db.session.commit()
-        print(f"🔍 DEBUG: Successfully saved {new_lessons_count} lessons")
-        return jsonify({'success': True, 'message': f'Сохранено {new_lessons_count} уроков'})
+        discard_view_schedule_cache(schedule_id)
+        return jsonify({'success': True,
+                        'message': f'Сохранено {new_lessons_count} уроков',
+                        'version': new_version})
 
     except Exception as e:
         db.session.rollback()
-        print(f"❌ ERROR in save_schedule: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        current_app.logger.exception('Ошибка сохранения расписания %s', schedule_id)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
-# Просмотр расписания
-@main.route('/schedule/<int:schedule_id>/view')
-@login_required
-def view_schedule(schedule_id):
-    """Страница просмотра готового расписания"""
-    schedule = Schedule.query.get_or_404(schedule_id)
+def version_conflict_response(version):
+    """409: расписание изменено другим сохранением; клиент получает актуальную версию"""
+    return jsonify({'success': False,
+                    'error': 'Расписание было изменено в другом окне. Обновите страницу.',
+                    'version': version}), 409
 
-    # Проверяем права доступа
-    if schedule.user_id != current_user.id:
-        flash('У вас нет доступа к этому расписанию.', 'danger')
-        return redirect(url_for('main.dashboard'))
 
+# Частичное сохранение расписания (только измененные ячейки)
+@main.route('/schedule/<int:schedule_id>/lessons', methods=['PATCH'])
+@login_required
+def patch_schedule_lessons(schedule_id):
+    """Сохраняет только измененные ячейки расписания.
+
+    Ожидает JSON вида {"version": 3, "changes": {"0_1": {...}, "2_4": null}}.
+    Ячейка со значением null удаляется, остальные добавляются или обновляются.
+    Если версия клиента устарела, возвращается 409 и актуальная версия.
+    """
     try:
-        days_list = json.loads(schedule.days_of_week)
-    except (json.JSONDecodeError, TypeError):
-        days_list = ['mon', 'tue', 'wed', 'thu', 'fri']
+        schedule = Schedule.query.get_or_404(schedule_id)
+
+        # Проверка прав доступа
+        if schedule.user_id != current_user.id:
+            return jsonify({'success': False, 'error': 'Access denied'}), 403
+
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or not isinstance(data.get('changes'), dict):
+            return jsonify({'success': False, 'error': 'No data provided'}), 400
+
+        version = data.get('version')
+        if not isinstance(version, int) or isinstance(version, bool):
+            return jsonify({'success': False, 'error': 'Invalid version'}), 400
+
+        if any(value is not None and not isinstance(value, dict) for value in data['changes'].values()):
+            return jsonify({'success': False, 'error': 'Invalid lesson data'}), 400
+
+        days_list = schedule.day_codes
+        lessons_per_day = schedule.lessons_per_day
+
+        # Разбираем ключи вида "day_lesson" и отбрасываем ячейки вне сетки
+        changes = {}
+        for key, lesson_data in data['changes'].items():
+            try:
+                day_index, lesson_index = map(int, key.split('_'))
+            except (ValueError, TypeError, AttributeError):
+                continue
+            if 0 <= day_index < len(days_list) and 0 <= lesson_index < lessons_per_day:
+                changes[(day_index, lesson_index)] = lesson_data
+
+        if not changes:
+            if version != schedule.version:
+                return version_conflict_response(schedule.version)
+            return jsonify({'success': True, 'message': 'Нет изменений', 'version': schedule.version})
+
+        # Проверка версии и ее увеличение одним UPDATE до записи уроков
+        new_version = Schedule.bump_version_if(schedule_id, version)
+        if new_version is None:
+            db.session.rollback()
+            current_version = db.session.scalar(db.select(Schedule.version).where(Schedule.id == schedule_id))
+            return version_conflict_response(current_version)
+
+        # Загружаем только затронутые уроки одним запросом
+        existing = {
+            (lesson.day_index, lesson.lesson_index): lesson
+            for lesson in Lesson.query.filter(
+                Lesson.schedule_id == schedule_id,
+                db.tuple_(Lesson.day_index, Lesson.lesson_index).in_(list(changes))
+            )
+        }
+
+        updated_count = 0
+        deleted_count = 0
+        for (day_index, lesson_index), lesson_data in changes.items():
+            lesson = existing.get((day_index, lesson_index))
+
+            if not lesson_data:
+                if lesson is not None:
+                    db.session.delete(lesson)
+                    deleted_count += 1
+                continue
+
+            if lesson is None:
+                lesson = Lesson(schedule_id=schedule_id, day_index=day_index, lesson_index=lesson_index)
+                db.session.add(lesson)
+
+            lesson.subject_name = lesson_data.get('subject_name', '')
+            lesson.color = lesson_data.get('color', '#FFFFFF')
+            lesson.lesson_link = lesson_data.get('lesson_link', '')
+            lesson.link_text = lesson_data.get('link_text', '')
+            lesson.font_family = lesson_data.get('font_family', 'Bookman Old Style')
+            updated_count += 1
+
+        db.session.commit()
+        discard_view_schedule_cache(schedule_id)
+        metrics.observe_lesson_save(len(changes), 'patch')
+        return jsonify({'success': True,
+                        'message': f'Сохранено уроков: {updated_count}, удалено: {deleted_count}',
+                        'version': new_version})
+
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception('Ошибка частичного сохранения расписания %s', schedule_id)
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+def schedule_view_response(schedule, rows=None):
+    """Страница просмотра расписания (общая для WSGI и ASGI).
+
+    rows - заранее загруженные строки lesson_grid_select; без них уроки
+    загружаются синхронно, если сетки нет в кэше.
+    """
+    mode = view_render_mode()
+
+    # Повторный запрос без изменений расписания получает 304 без рендеринга
+    etag, last_modified = schedule_validators(schedule, 'view', mode)
+    if is_not_modified(etag, last_modified):
+        return not_modified_response(etag, last_modified)
+
+    days_list = schedule.day_codes
 
     # Безопасное преобразование кодов дней
     display_days = [get_day_display_name(day) for day in days_list]
 
-    # Используем новую функцию с временем окончания
-    lesson_times = calculate_lesson_times(schedule.start_time, schedule.end_time)
+    # Сетка расписания берется из кэша, пока не изменится версия расписания
+    cache_key = view_schedule_cache_key(schedule.id, mode)
+    stamp = schedule_stamp(schedule)
+    schedule_content = page_cache.get(cache_key, stamp)
+
+    if schedule_content is None:
+        # Используем новую функцию с временем окончания
+        lesson_times = calculate_lesson_times(schedule.start_time, schedule.end_time)
+
+        if mode == 'client':
+            # Вместо трех циклов по сетке в шаблоне - один компактный JSON для schedule-view.js
+            schedule_data = build_schedule_payload(schedule, ('subjects', 'lessons', 'links'), rows)
+            schedule_data['days'] = len(display_days)
+            schedule_data['times'] = [[slot['start'], slot['end']]
+                                      for slot in lesson_times[:schedule.lessons_per_day]]
+            schedule_content = render_template('_view_schedule_content.html',
+                                               schedule=schedule,
+                                               days=display_days,
+                                               client_render=True,
+                                               schedule_data=schedule_data)
+        else:
+            # Загружаем уроки и преобразуем в словари
+            lessons = load_lessons_dict(schedule.id) if rows is None else lessons_from_rows(rows)
 
-    # Загружаем уроки и преобразуем в словари
-    lessons = {}
-    existing_lessons = Lesson.query.filter_by(schedule_id=schedule_id).all()
-    for lesson in existing_lessons:
-        key = f"{lesson.day_index}_{lesson.lesson_index}"
-        lessons[key] = {
-            'subject_name': lesson.subject_name,
-            'color': lesson.color,
-            'lesson_link': lesson.lesson_link,
-            'link_text': lesson.link_text,
-            'font_family': lesson.font_family
-        }
+            schedule_content = render_template('_view_schedule_content.html',
+                                               schedule=schedule,
+                                               days=display_days,
+                                               lesson_times=lesson_times,
+                                               lessons=lessons)
+        page_cache.set(cache_key, stamp, schedule_content)
 
     current_time = datetime.now().strftime("%d.%m.%Y %H:%M")
 
-    return render_template('view_schedule.html',
-                           schedule=schedule,
-                           days=display_days,
-                           lesson_times=lesson_times,
-                           lessons=lessons,
-                           current_time=current_time)
+    response = make_response(render_template('view_schedule.html',
+                                             schedule=schedule,
+                                             days=display_days,
+                                             schedule_content=Markup(schedule_content),
+                                             current_time=current_time))
+    return set_validators(response, etag, last_modified)
+
+
+# Просмотр расписания
+@main.route('/schedule/<int:schedule_id>/view')
+@login_required
+def view_schedule(schedule_id):
+    """Страница просмотра готового расписания"""
+    schedule = schedule_query('view').get_or_404(schedule_id)
+
+    # Проверяем права доступа
+    if schedule.user_id != current_user.id:
+        flash('У вас нет доступа к этому расписанию.', 'danger')
+        return redirect(url_for('main.dashboard'))
+
+    return schedule_view_response(schedule)
 
 
 # Удаление расписания
@@ -425,6 +566,9 @@ def delete_schedule(schedule_id):
         # Удаляем само расписание
         db.session.delete(schedule)
         db.session.commit()
+        discard_view_schedule_cache(schedule_id)
+        page_cache.delete(events_cache_key(schedule_id))
+        pdf_exporter.discard(schedule_id)
 
         flash('Расписание успешно удалено.', 'success')
     except Exception as e:
@@ -479,97 +623,205 @@ def internal_error(error):
 # Health check
 @main.route('/health')
 def health_check():
-    """Проверка работоспособности приложения"""
-    return jsonify({
-        'status': 'ok',
-        'message': 'Application is running',
-        'timestamp': datetime.now().isoformat()
+    """Проверка готовности: 503, если база не отвечает за HEALTH_DB_TIMEOUT секунд"""
+    return health_response({
+        'database': check_database(db.engine, current_app.config['HEALTH_DB_TIMEOUT']),
     })
 
 
-# Дополнительные маршруты для будущего использования
+# Экспорт расписания в PDF
 @main.route('/export-pdf/<int:schedule_id>')
 @login_required
 def export_pdf(schedule_id):
-    """Экспорт в PDF (заглушка)"""
-    flash('Функция экспорта в PDF будет реализована в ближайшее время.', 'info')
-    return redirect(url_for('main.view_schedule', schedule_id=schedule_id))
+    """Экспорт в PDF: готовый файл отдается сразу, иначе рендеринг ставится в пул и отвечается 202.
 
+    Поток запроса не ждет рендеринга: клиент опрашивает адрес статуса
+    (Location), а без JavaScript страница сама обновляется через Refresh.
+    """
+    schedule = schedule_query('view').get_or_404(schedule_id)
 
-@main.route('/sync-google/<int:schedule_id>')
-@login_required
-def sync_google_calendar(schedule_id):
-    """Синхронизация с Google Calendar (заглушка)"""
-    flash('Функция синхронизации с Google Calendar будет реализована в ближайшее время.', 'info')
-    return redirect(url_for('main.view_schedule', schedule_id=schedule_id))
+    # Проверяем права доступа
+    if schedule.user_id != current_user.id:
+        flash('У вас нет доступа к этому расписанию.', 'danger')
+        return redirect(url_for('main.dashboard'))
 
+    state, path = pdf_export_state(schedule)
+    if state == 'failed':
+        flash('Не удалось сформировать PDF. Попробуйте позже.', 'danger')
+        return redirect(url_for('main.view_schedule', schedule_id=schedule_id))
 
-# Функция для исправления старых данных
-@main.route('/fix-old-data')
+    if state == 'pending':
+        status_url = url_for('main.export_pdf_status', schedule_id=schedule_id)
+        if request.accept_mimetypes.best == 'application/json':
+            response = jsonify({'status': 'pending', 'status_url': status_url})
+        else:
+            response = make_response(render_template('pdf_pending.html', schedule=schedule))
+            response.headers['Refresh'] = str(PDF_POLL_INTERVAL)
+        response.status_code = 202
+        response.headers['Location'] = status_url
+        response.headers['Retry-After'] = str(PDF_POLL_INTERVAL)
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+
+    response = send_file(path, mimetype='application/pdf', as_attachment=True,
+                         download_name=f'Расписание - {schedule.title}.pdf',
+                         conditional=True)
+    response.headers['Cache-Control'] = PRIVATE_CACHE_CONTROL
+    return response
+
+
+@main.route('/export-pdf/<int:schedule_id>/status')
+@login_required
+def export_pdf_status(schedule_id):
+    """Статус рендеринга PDF: 202 - в работе, 200 - готов (download_url), 500 - ошибка"""
+    schedule = schedule_query('view').get_or_404(schedule_id)
+    if schedule.user_id != current_user.id:
+        return jsonify({'status': 'error', 'error': 'Access denied'}), 403
+
+    state, _ = pdf_export_state(schedule)
+    if state == 'ready':
+        response = jsonify({'status': 'ready',
+                            'download_url': url_for('main.export_pdf', schedule_id=schedule_id)})
+    elif state == 'pending':
+        response = jsonify({'status': 'pending'})
+        response.status_code = 202
+        response.headers['Retry-After'] = str(PDF_POLL_INTERVAL)
+    else:
+        response = jsonify({'status': 'failed', 'error': 'Не удалось сформировать PDF. Попробуйте позже.'})
+        response.status_code = 500
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+def pdf_export_state(schedule):
+    """Состояние PDF расписания; при необходимости ставит рендеринг в пул"""
+    return pdf_exporter.status(
+        schedule, lambda: build_schedule_document(schedule, load_lessons_dict(schedule.id)))
+
+
+@main.route('/export-all')
 @login_required
-def fix_old_data():
-    """Исправление старых данных с опечаткой 'san'"""
-    if current_user.username != 'admin':
-        flash('Доступ запрещен.', 'danger')
+def export_all_schedules():
+    """Выгрузка всех расписаний пользователя ZIP-архивом (PDF, CSV, ICS), архив отдается потоком"""
+    formats = parse_formats(request.args.get('formats'))
+    schedule_ids = user_schedule_ids(current_user.id)
+
+    if not formats or not schedule_ids:
+        flash('Нет расписаний для выгрузки.' if formats else 'Неизвестный формат выгрузки.', 'info')
         return redirect(url_for('main.dashboard'))
 
-    try:
-        schedules = Schedule.query.all()
-        fixed_count = 0
+    filename = f"Расписания {datetime.now():%Y-%m-%d}.zip"
+    response = Response(stream_with_context(stream_schedules_zip(schedule_ids, pdf_exporter, formats)),
+                        mimetype='application/zip')
+    response.headers['Content-Disposition'] = (
+        f"attachment; filename=\"schedules.zip\"; filename*=UTF-8''{quote(filename)}")
+    response.headers['Cache-Control'] = PRIVATE_CACHE_CONTROL
+    # Прокси не должны буферизовать архив целиком
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
-        for schedule in schedules:
-            days_list = json.loads(schedule.days_of_week)
 
-            if 'san' in days_list:
-                corrected_days = ['sun' if day == 'san' else day for day in days_list]
-                schedule.days_of_week = json.dumps(corrected_days)
-                fixed_count += 1
+ICS_MIMETYPE = 'text/calendar; charset=utf-8'
 
-        db.session.commit()
-        flash(f'Исправлено расписаний: {fixed_count}', 'success')
+# Подписка Google Calendar на внешний календарь по ссылке
+GOOGLE_CALENDAR_SUBSCRIBE_URL = 'https://calendar.google.com/calendar/render?cid={}'
+
+
+def calendar_response(schedules, name):
+    """Ответ с лентой iCalendar и поддержкой условного GET"""
+    etag, last_modified = feed_validators(schedules)
+    if is_not_modified(etag, last_modified):
+        return not_modified_response(etag, last_modified)
+
+    response = make_response(render_feed(schedules, name))
+    response.mimetype = ICS_MIMETYPE
+    return set_validators(response, etag, last_modified)
+
+
+@main.route('/schedule/<int:schedule_id>/calendar.ics')
+def schedule_calendar(schedule_id):
+    """Лента iCalendar одного расписания (по сессии владельца или токену подписки)"""
+    token = request.args.get('token')
+    if token:
+        schedule = token_schedule(token, schedule_id, schedule_options('feed'))
+    elif current_user.is_authenticated:
+        schedule = db.session.get(Schedule, schedule_id, options=schedule_options('feed'))
+        if schedule is not None and schedule.user_id != current_user.id:
+            schedule = None
+    else:
+        schedule = None
+    # Чужое и несуществующее расписание и отозванный токен неразличимы
+    if schedule is None:
+        abort(404)
+
+    return calendar_response([schedule], schedule.title)
 
-    except Exception as e:
-        db.session.rollback()
-        flash(f'Ошибка при исправлении данных: {str(e)}', 'danger')
 
+@main.route('/calendar/<token>.ics')
+def user_calendar(token):
+    """Общая лента iCalendar всех расписаний пользователя"""
+    user = user_from_token(token)
+    if user is None:
+        abort(404)
+
+    return calendar_response(user_feed_schedules(user.id), f'Расписания {user.username}')
+
+
+@main.route('/calendar/rotate-token', methods=['POST'])
+@login_required
+def rotate_calendar_token():
+    """Отзывает выданные ссылки подписки на календарь и выдает новые"""
+    current_user.rotate_feed_secret()
+    db.session.commit()
+    # Снимок со старым секретом мог быть снова закэширован параллельным запросом до commit
+    user_cache.invalidate(current_user.id)
+    flash('Ссылка подписки на календарь обновлена. Старые ссылки больше не работают - '
+          'переподключите календарь.', 'success')
     return redirect(url_for('main.dashboard'))
 
 
+@main.route('/sync-google/<int:schedule_id>')
+@login_required
+def sync_google_calendar(schedule_id):
+    """Подписка Google Calendar на ленту iCalendar расписания"""
+    schedule = Schedule.query.get_or_404(schedule_id)
+
+    # Проверяем права доступа
+    if schedule.user_id != current_user.id:
+        flash('У вас нет доступа к этому расписанию.', 'danger')
+        return redirect(url_for('main.dashboard'))
+
+    feed_url = url_for('main.schedule_calendar', schedule_id=schedule_id,
+                       token=feed_token(current_user), _external=True)
+    # Google Calendar принимает ссылки подписки в схеме webcal
+    webcal_url = 'webcal://' + feed_url.split('://', 1)[1]
+    return redirect(GOOGLE_CALENDAR_SUBSCRIBE_URL.format(quote(webcal_url, safe='')))
+
+
 @main.route('/user_profile')
 @login_required
 def user_profile():
     """Страница профиля пользователя"""
     try:
-        print(f"DEBUG: Loading profile for user {current_user.id}")
-
-        # Получаем статистику пользователя
-        schedules_count = Schedule.query.filter_by(user_id=current_user.id).count()
-        print(f"DEBUG: Schedules count: {schedules_count}")
-
-        # Считаем общее количество уроков
-        total_lessons = 0
-        user_schedules = Schedule.query.filter_by(user_id=current_user.id).all()
+        # Вся статистика считается одним SQL-запросом
+        stats = user_schedule_stats(current_user.id)
+        return render_template('profile.html', api_token=api_token(current_user), **stats)
 
-        for schedule in user_schedules:
-            try:
-                days_list = json.loads(schedule.days_of_week)
-                total_lessons += schedule.lessons_per_day * len(days_list)
-            except (json.JSONDecodeError, TypeError) as e:
-                print(f"DEBUG: Error parsing days for schedule {schedule.id}: {e}")
-                total_lessons += schedule.lessons_per_day * 5
-
-        print(f"DEBUG: Total lessons: {total_lessons}")
+    except Exception:
+        current_app.logger.exception('Ошибка загрузки профиля')
+        flash('Ошибка при загрузке профиля', 'error')
+        return redirect(url_for('main.dashboard'))
 
-        return render_template('profile.html',
-                               schedules_count=schedules_count,
-                               total_lessons=total_lessons)
 
+@main.route('/user_profile/stats')
+@login_required
+def user_profile_stats():
+    """Статистика расписаний пользователя в формате JSON"""
+    try:
+        return jsonify({'success': True, **user_schedule_stats(current_user.id)})
     except Exception as e:
-        print(f"ERROR in user_profile: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        flash('Ошибка при загрузке профиля', 'error')
-        return redirect(url_for('main.dashboard'))
+        current_app.logger.exception('Ошибка статистики профиля')
+        return jsonify({'success': False, 'error': str(e)}), 500
 
 
 @main.route('/change-password', methods=['POST'])
@@ -601,6 +853,8 @@ def change_password():
         # Устанавливаем новый пароль
         current_user.set_password(new_password)
         db.session.commit()
+        # Снимок мог быть снова закэширован параллельным запросом до commit
+        user_cache.invalidate(current_user.id)
 
         flash('Пароль успешно изменен', 'success')
         return redirect(url_for('main.user_profile'))
@@ -633,10 +887,11 @@ def update_schedule_title(schedule_id):
 
         schedule.title = new_title
         db.session.commit()
+        discard_view_schedule_cache(schedule_id)
 
         return jsonify({'success': True, 'message': 'Название сохранено'})
 
     except Exception as e:
         db.session.rollback()
-        print(f"ERROR in update_schedule_title: {str(e)}")
+        current_app.logger.exception('Ошибка изменения названия расписания %s', schedule_id)
         return jsonify({'success': False, 'error': str(e)}), 500
\ No newline at end of file
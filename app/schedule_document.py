@@ -0,0 +1,34 @@
+"""Снимок расписания для экспорта (PDF, CSV, iCalendar).
+
+Снимок состоит только из простых типов, поэтому его можно передать в
+процесс пула рендеринга, не таща за собой ORM-объекты и сессию.
+"""
+from app.lesson_times import lesson_slots, DEFAULT_LESSON_SLOTS
+from app.models import DAY_NAMES
+
+
+def build_schedule_document(schedule, lessons):
+    """Строит снимок расписания из модели и словаря уроков {"день_урок": {...}}"""
+    day_codes = list(schedule.day_codes)
+
+    try:
+        lesson_times = lesson_slots(schedule.start_time, schedule.end_time)
+    except (TypeError, ValueError):
+        lesson_times = DEFAULT_LESSON_SLOTS
+
+    return {
+        'id': schedule.id,
+        'title': schedule.title,
+        'day_codes': day_codes,
+        'days': [DAY_NAMES.get(code, code) for code in day_codes],
+        'lesson_times': [dict(slot) for slot in lesson_times][:schedule.lessons_per_day],
+        'lessons': {
+            key: {'subject_name': lesson.get('subject_name') or '',
+                  'color': lesson.get('color') or '#FFFFFF',
+                  'lesson_link': lesson.get('lesson_link') or '',
+                  'link_text': lesson.get('link_text') or ''}
+            for key, lesson in lessons.items()
+        },
+        'created_at': schedule.created_at.isoformat() if schedule.created_at else None,
+        'updated_at': schedule.updated_at.isoformat() if schedule.updated_at else None,
+    }
@@ -0,0 +1,68 @@
+"""Статистика расписаний пользователя, рассчитываемая одним SQL-запросом.
+
+Количество уроков в день и количество дней считаются прямо в SQL по тем же
+правилам, что и Schedule.lessons_per_day / Schedule.days_count, поэтому
+расписания не загружаются в Python.
+"""
+from sqlalchemy import case, cast, func, select, Integer
+
+from app import db
+from app.models import Schedule, Lesson
+from app.lesson_times import LESSON_DURATION, DEFAULT_LESSONS_COUNT
+from app.weekdays import WEEKDAY_CODES
+
+
+def _minutes_expr(column):
+    """Строка ЧЧ:ММ -> минуты от начала суток"""
+    return (cast(func.substr(column, 1, 2), Integer) * 60 +
+            cast(func.substr(column, 4, 2), Integer))
+
+
+def lessons_per_day_expr():
+    """SQL-выражение, эквивалентное Schedule.lessons_per_day"""
+    lessons = ((_minutes_expr(Schedule.end_time) - _minutes_expr(Schedule.start_time) +
+                LESSON_DURATION - 1) // LESSON_DURATION)
+    return case(
+        (Schedule.start_time.is_(None), DEFAULT_LESSONS_COUNT),
+        (Schedule.end_time.is_(None), DEFAULT_LESSONS_COUNT),
+        (Schedule.start_time == '', DEFAULT_LESSONS_COUNT),
+        (Schedule.end_time == '', DEFAULT_LESSONS_COUNT),
+        (lessons < 1, 1),
+        else_=lessons,
+    )
+
+
+def days_count_expr():
+    """SQL-выражение, эквивалентное Schedule.days_count (число единичных битов маски)"""
+    expr = None
+    for index in range(len(WEEKDAY_CODES)):
+        bit = case((Schedule.days_mask.op('&')(1 << index) != 0, 1), else_=0)
+        expr = bit if expr is None else expr + bit
+    return expr
+
+
+def user_schedule_stats(user_id):
+    """Возвращает словарь со статистикой расписаний пользователя.
+
+    schedules_count - количество расписаний,
+    total_lessons - общее количество ячеек уроков во всех сетках,
+    filled_lessons - количество заполненных ячеек.
+    """
+    filled = (select(Lesson.schedule_id, func.count(Lesson.id).label('filled'))
+              .where(Lesson.subject_name.is_not(None), Lesson.subject_name != '')
+              .group_by(Lesson.schedule_id)
+              .subquery())
+
+    query = (select(func.count(Schedule.id),
+                    func.coalesce(func.sum(lessons_per_day_expr() * days_count_expr()), 0),
+                    func.coalesce(func.sum(filled.c.filled), 0))
+             .select_from(Schedule)
+             .outerjoin(filled, filled.c.schedule_id == Schedule.id)
+             .where(Schedule.user_id == user_id))
+
+    schedules_count, total_lessons, filled_lessons = db.session.execute(query).one()
+    return {
+        'schedules_count': schedules_count,
+        'total_lessons': int(total_lessons),
+        'filled_lessons': int(filled_lessons),
+    }
@@ -0,0 +1,114 @@
+"""Кэш пользователя сессии для login_manager.user_loader.
+
+Без кэша каждый запрос авторизованного пользователя (страница, сохранение
+сетки, подгрузка карточек) начинается с SELECT из таблицы user. Кэш хранит
+снимок строки в памяти процесса не дольше ``USER_CACHE_TTL`` секунд и не
+больше ``USER_CACHE_MAX_ENTRIES`` записей (LRU).
+
+Снимок - отсоединенный объект User без хеша пароля. В запросе он
+присоединяется к сессии через ``merge(load=False)`` без обращения к базе,
+поэтому изменения current_user сохраняются как обычно, а ``password_hash``
+при проверке пароля всегда читается из базы. Запись удаляется при любом
+UPDATE/DELETE пользователя в этом процессе; в других процессах снимок
+устаревает не позже чем через TTL.
+
+``USER_CACHE_TTL = 0`` отключает кэш.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+# Поля снимка: все, кроме хеша пароля
+_SKIPPED_COLUMNS = ('password_hash',)
+
+
+class UserCache:
+    """LRU-кэш снимков пользователей с ограниченным временем жизни и счетчиками попаданий"""
+
+    def __init__(self, app=None):
+        self.ttl = 0
+        self.max_entries = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('USER_CACHE_TTL', 60)
+        app.config.setdefault('USER_CACHE_MAX_ENTRIES', 4096)
+        self.ttl = app.config['USER_CACHE_TTL']
+        self.max_entries = app.config['USER_CACHE_MAX_ENTRIES']
+        app.extensions['user_cache'] = self
+
+    def load(self, user_id):
+        """Пользователь для текущей сессии БД: из снимка или из базы"""
+        from app import db
+        from app.models import User
+
+        snapshot = self._get(user_id)
+        if snapshot is not None:
+            return db.session.merge(snapshot, load=False)
+
+        user = db.session.get(User, user_id)
+        if user is not None and self.ttl:
+            self._set(user_id, self._snapshot(user))
+        return user
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _snapshot(user):
+        """Отсоединенная копия загруженных полей пользователя без хеша пароля"""
+        mapper = inspect(user).mapper
+        snapshot = mapper.class_(**{
+            column.key: getattr(user, column.key)
+            for column in mapper.column_attrs
+            if column.key not in _SKIPPED_COLUMNS
+        })
+        make_transient_to_detached(snapshot)
+        return snapshot
+
+    def _get(self, user_id):
+        """Снимок из кэша или None; попадания и промахи считаются под блокировкой"""
+        with self._lock:
+            entry = self._entries.get(user_id) if self.ttl else None
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[user_id]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+    def _set(self, user_id, snapshot):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, snapshot)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def install_invalidation(cache, model):
+    """Сбрасывать снимок при изменении или удалении пользователя"""
+
+    def invalidate(mapper, connection, target):
+        cache.invalidate(target.id)
+
+    event.listen(model, 'after_update', invalidate)
+    event.listen(model, 'after_delete', invalidate)
@@ -0,0 +1,53 @@
+"""Компактное хранение дней недели расписания в виде 7-битной маски.
+
+Бит 0 - понедельник, бит 6 - воскресенье. Порядок дней всегда
+календарный, поэтому список дней однозначно восстанавливается из маски.
+"""
+
+WEEKDAY_CODES = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+# Маска всех дней недели
+ALL_DAYS_MASK = (1 << len(WEEKDAY_CODES)) - 1
+
+# Опечатки, встречавшиеся в старых данных
+DAY_CODE_CORRECTIONS = {
+    'san': 'sun',
+    'sut': 'sat',
+    'thus': 'thu',
+    'wend': 'wed'
+}
+
+_BIT_BY_CODE = {code: 1 << index for index, code in enumerate(WEEKDAY_CODES)}
+
+# Предрасчитанные списки дней для всех 128 значений маски
+_CODES_BY_MASK = tuple(
+    tuple(code for code, bit in _BIT_BY_CODE.items() if mask & bit)
+    for mask in range(ALL_DAYS_MASK + 1)
+)
+
+
+def day_bit(day_code):
+    """Бит маски для кода дня (ValueError для неизвестного кода)"""
+    code = DAY_CODE_CORRECTIONS.get(day_code, day_code)
+    try:
+        return _BIT_BY_CODE[code]
+    except KeyError:
+        raise ValueError(f'Неверный день недели: {day_code}')
+
+
+def days_to_mask(day_codes):
+    """Переводит список кодов дней в маску"""
+    mask = 0
+    for day_code in day_codes:
+        mask |= day_bit(day_code)
+    return mask
+
+
+def mask_to_days(mask):
+    """Переводит маску в кортеж кодов дней в календарном порядке"""
+    return _CODES_BY_MASK[(mask or 0) & ALL_DAYS_MASK]
+
+
+def count_days(mask):
+    """Количество дней в маске"""
+    return len(mask_to_days(mask))
@@ -0,0 +1,8 @@
+"""ASGI-точка входа: асинхронные маршруты чтения поверх Flask-приложения.
+
+    uvicorn asgi:app --workers 4
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+"""
+from app.asgi import create_asgi_app
+
+app = create_asgi_app()
@@ -0,0 +1,95 @@
+"""Сравнение сохранения сетки уроков: ORM по одному объекту против пакетного INSERT.
+
+Запуск:
+    python benchmarks/bench_lesson_insert.py --schedules 10000 --days 7 --lessons 13
+
+Каждое расписание сохраняется отдельной транзакцией, как при нажатии
+кнопки «Сохранить» в редакторе.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+def make_grid(days, lessons):
+    return {
+        (day_index, lesson_index): {
+            'subject_name': f'Предмет {lesson_index}',
+            'color': '#C8E6C9',
+            'lesson_link': '',
+            'link_text': '',
+            'font_family': 'Arial',
+        }
+        for day_index in range(days)
+        for lesson_index in range(lessons)
+    }
+
+
+def save_per_object(db, Lesson, schedule_id, grid):
+    for (day_index, lesson_index), lesson_data in grid.items():
+        db.session.add(Lesson(schedule_id=schedule_id, day_index=day_index,
+                              lesson_index=lesson_index, **lesson_data))
+    db.session.commit()
+
+
+def save_bulk(db, schedule_id, grid):
+    from app.lesson_store import lesson_row, bulk_insert_lessons
+
+    rows = [lesson_row(schedule_id, day_index, lesson_index, lesson_data)
+            for (day_index, lesson_index), lesson_data in grid.items()]
+    bulk_insert_lessons(rows)
+    db.session.commit()
+
+
+def run(label, save, schedule_ids, rows_per_schedule):
+    started = time.perf_counter()
+    for schedule_id in schedule_ids:
+        save(schedule_id)
+    elapsed = time.perf_counter() - started
+    total_rows = len(schedule_ids) * rows_per_schedule
+    print(f'{label:<12} {elapsed:8.2f} s  {total_rows / elapsed:12.0f} уроков/с  '
+          f'{len(schedule_ids) / elapsed:8.0f} сохранений/с')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--schedules', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--lessons', type=int, default=13)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-lessons-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+
+    from app import create_app, db
+    from app.models import User, Schedule, Lesson
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com', password_hash='-')
+        db.session.add(user)
+        db.session.commit()
+
+        # Расписания создаются заранее, чтобы измерять только запись уроков
+        schedules = [Schedule(title=f'Расписание {i}', user_id=user.id,
+                              days_mask=0, start_time='08:00', end_time='21:00')
+                     for i in range(args.schedules * 2)]
+        db.session.add_all(schedules)
+        db.session.commit()
+        ids = [schedule.id for schedule in schedules]
+
+        grid = make_grid(args.days, args.lessons)
+        print(f'Сетка {args.days}×{args.lessons}, расписаний: {args.schedules}')
+        run('per-object', lambda sid: save_per_object(db, Lesson, sid, grid),
+            ids[:args.schedules], len(grid))
+        run('bulk', lambda sid: save_bulk(db, sid, grid),
+            ids[args.schedules:], len(grid))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Микробенчмарк расчета времени уроков: strptime на каждый запрос против кэшированной таблицы.
+
+Запуск:
+    python benchmarks/bench_lesson_times.py --number 20000
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.lesson_times import TIME_VALUES, lesson_slots, lessons_count  # noqa: E402
+
+
+def legacy_lesson_times(start_time, end_time):
+    """Прежняя реализация calculate_lesson_times"""
+    start = datetime.strptime(start_time, '%H:%M')
+    end = datetime.strptime(end_time, '%H:%M')
+    total_minutes = (end - start).total_seconds() / 60
+    lessons = max(1, int((total_minutes + 59) // 60))
+    times = []
+    for i in range(lessons):
+        lesson_start = start + timedelta(minutes=60 * i)
+        lesson_end = lesson_start + timedelta(minutes=60)
+        times.append({'start': lesson_start.strftime('%H:%M'), 'end': lesson_end.strftime('%H:%M')})
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--number', type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    pairs = []
+    for _ in range(200):
+        start, end = sorted(rng.sample(TIME_VALUES, 2))
+        pairs.append((start, end))
+
+    # Проверяем, что результаты совпадают с прежней реализацией
+    for start, end in pairs:
+        assert list(lesson_slots(start, end)) == legacy_lesson_times(start, end), (start, end)
+
+    def run_legacy():
+        for start, end in pairs:
+            legacy_lesson_times(start, end)
+
+    def run_cached():
+        for start, end in pairs:
+            lesson_slots(start, end)
+            lessons_count(start, end)
+
+    calls = args.number // len(pairs) or 1
+    for label, func in (('strptime', run_legacy), ('cached', run_cached)):
+        elapsed = timeit.timeit(func, number=calls)
+        per_call = elapsed / (calls * len(pairs)) * 1e6
+        print(f'{label:<10} {per_call:8.3f} мкс на расчет')
+
+
+if __name__ == '__main__':
+    main()
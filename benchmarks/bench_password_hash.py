@@ -0,0 +1,84 @@
+"""Стоимость проверки пароля для разных методов хеширования.
+
+Запуск:
+    python benchmarks/bench_password_hash.py
+    python benchmarks/bench_password_hash.py --methods scrypt:16384:8:1 pbkdf2:sha256:600000 --seconds 3
+
+Для каждого метода измеряется время одной проверки в одном потоке (входов
+в секунду на ядро) и пропускная способность пула из --threads потоков,
+как у PasswordPolicy. Выбранный метод задается PASSWORD_HASH_METHOD;
+старые хеши пересчитываются при входе пользователей.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+DEFAULT_METHODS = (
+    'scrypt:32768:8:1',
+    'scrypt:16384:8:1',
+    'scrypt:8192:8:1',
+    'pbkdf2:sha256:1000000',
+    'pbkdf2:sha256:600000',
+    'pbkdf2:sha256:260000',
+)
+
+
+def single_thread(password_hash, password, seconds):
+    """Времена последовательных проверок в течение seconds"""
+    timings = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline or len(timings) < 3:
+        started = time.perf_counter()
+        check_password_hash(password_hash, password)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def pooled(password_hash, password, seconds, threads):
+    """Проверок в секунду при threads параллельных проверках"""
+    def worker(deadline):
+        count = 0
+        while time.perf_counter() < deadline:
+            check_password_hash(password_hash, password)
+            count += 1
+        return count
+
+    started = time.perf_counter()
+    deadline = started + seconds
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        total = sum(executor.map(worker, [deadline] * threads))
+    return total / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--methods', nargs='+', default=DEFAULT_METHODS)
+    parser.add_argument('--seconds', type=float, default=2, help='длительность замера каждого метода')
+    parser.add_argument('--threads', type=int, default=os.cpu_count() or 1, help='потоков пула проверки')
+    args = parser.parse_args()
+
+    from app.passwords import DEFAULT_HASH_METHOD
+
+    password = 'correct horse battery staple'
+    print(f'ядер: {os.cpu_count()}, потоков пула: {args.threads}')
+    print(f"{'метод':26} {'проверка, мс':>13} {'входов/с на ядро':>17} {'входов/с, пул':>14} {'длина хеша':>11}")
+    for method in args.methods:
+        password_hash = generate_password_hash(password, method)
+        timings = single_thread(password_hash, password, args.seconds)
+        median = statistics.median(timings)
+        throughput = pooled(password_hash, password, args.seconds, args.threads)
+        marker = ' *' if method == DEFAULT_HASH_METHOD else ''
+        print(f'{method + marker:26} {median * 1000:13.1f} {1 / median:17.1f} {throughput:14.1f} '
+              f'{len(password_hash):11d}')
+    print('* - метод по умолчанию')
+
+
+if __name__ == '__main__':
+    main()
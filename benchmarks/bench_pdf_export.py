@@ -0,0 +1,69 @@
+"""Пропускная способность серверного рендеринга PDF (PDF/с) для сеток на 5 и 7 дней.
+
+Запуск:
+    python benchmarks/bench_pdf_export.py --count 200 --workers 4
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.pdf_export import find_font, render_schedule_pdf  # noqa: E402
+
+DAY_NAMES = ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота', 'Воскресенье']
+SUBJECTS = ['Алгебра', 'Физика', 'Русский язык', 'История', 'Химия', 'Биология', 'Информатика']
+COLORS = ['#FFF9C4', '#C8E6C9', '#B3E5FC', '#E1BEE7', '#FFE0B2', '#FFCDD2', '#D1C4E9']
+
+
+def make_document(days, lessons):
+    return {
+        'title': f'Расписание на {days} дней',
+        'days': DAY_NAMES[:days],
+        'lesson_times': [{'start': f'{8 + i:02d}:00', 'end': f'{9 + i:02d}:00'} for i in range(lessons)],
+        'lessons': {
+            f'{day_index}_{lesson_index}': {
+                'subject_name': SUBJECTS[(day_index + lesson_index) % len(SUBJECTS)],
+                'color': COLORS[(day_index * lessons + lesson_index) % len(COLORS)],
+            }
+            for day_index in range(days)
+            for lesson_index in range(lessons)
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=200, help='количество PDF в каждом прогоне')
+    parser.add_argument('--lessons', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    font_path = find_font()
+    print(f'Шрифт: {font_path or "Helvetica (без кириллицы)"}, процессов: {args.workers}')
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        # Прогрев пула: импорт reportlab и регистрация шрифта в каждом процессе
+        list(executor.map(render_schedule_pdf, [make_document(5, 1)] * args.workers,
+                          [font_path] * args.workers))
+
+        for days in (5, 7):
+            document = make_document(days, args.lessons)
+
+            started = time.perf_counter()
+            for _ in range(args.count):
+                render_schedule_pdf(document, font_path)
+            serial = args.count / (time.perf_counter() - started)
+
+            started = time.perf_counter()
+            list(executor.map(render_schedule_pdf, [document] * args.count, [font_path] * args.count))
+            pooled = args.count / (time.perf_counter() - started)
+
+            print(f'{days} дней × {args.lessons} уроков: '
+                  f'{serial:7.1f} PDF/с в одном потоке, {pooled:7.1f} PDF/с в пуле')
+
+
+if __name__ == '__main__':
+    main()
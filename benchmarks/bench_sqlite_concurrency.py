@@ -0,0 +1,159 @@
+"""Смешанная нагрузка на SQLite: чтение расписаний во время сохранений.
+
+Запуск:
+    python benchmarks/bench_sqlite_concurrency.py --readers 16 --writers 4 --duration 15
+
+Тест выполняется дважды на новой файловой базе: с настройками из
+app/db_tuning.py (WAL, synchronous=NORMAL, mmap, cache_size, busy_timeout)
+и с настройками SQLite по умолчанию (SQLITE_PRAGMAS=off). Читатели в цикле
+запрашивают JSON API и дашборд, писатели сохраняют сетку уроков через
+``/schedule/<id>/save``. Запросы идут через тестовый клиент Flask в потоках
+одного процесса, то есть измеряется работа приложения с базой без сети.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+PROFILES = {
+    'tuned': None,
+    'default': 'off',
+}
+
+
+def make_grid(days, lessons, revision):
+    return {
+        f'{day_index}_{lesson_index}': {
+            'subject_name': f'Предмет {lesson_index} ({revision})',
+            'color': '#C8E6C9',
+            'font_family': 'Arial',
+        }
+        for day_index in range(days)
+        for lesson_index in range(lessons)
+    }
+
+
+def seed(db, count):
+    from app.lesson_store import bulk_insert_lessons, lesson_row
+    from app.models import Schedule, User
+
+    db.create_all()
+    for index in range(count):
+        user = User(username=f'bench{index}', email=f'bench{index}@example.com')
+        user.set_password('bench-password')
+        db.session.add(user)
+        db.session.flush()
+        schedule = Schedule(title=f'Расписание {index}', user_id=user.id,
+                            days_mask=0b11111, start_time='08:00', end_time='14:00')
+        db.session.add(schedule)
+        db.session.flush()
+        bulk_insert_lessons([
+            lesson_row(schedule.id, day, lesson, {'subject_name': f'Предмет {lesson}'})
+            for day in range(5) for lesson in range(6)
+        ])
+    db.session.commit()
+
+
+def login(app, index):
+    client = app.test_client()
+    client.post('/login', data={'username': f'bench{index}', 'password': 'bench-password'})
+    return client
+
+
+def reader(client, schedule_id, deadline, results, errors):
+    paths = (f'/api/v1/schedules/{schedule_id}', '/dashboard')
+    while time.monotonic() < deadline:
+        for path in paths:
+            name = 'read ' + path.split('/')[1]
+            started = time.perf_counter()
+            response = client.get(path)
+            elapsed = time.perf_counter() - started
+            if response.status_code == 200:
+                results[name].append(elapsed)
+            else:
+                errors[name] += 1
+
+
+def writer(client, schedule_id, deadline, results, errors):
+    revision = 0
+    while time.monotonic() < deadline:
+        revision += 1
+        started = time.perf_counter()
+        response = client.post(f'/schedule/{schedule_id}/save', json=make_grid(5, 6, revision))
+        elapsed = time.perf_counter() - started
+        if response.status_code == 200:
+            results['save'].append(elapsed)
+        else:
+            errors['save'] += 1
+
+
+def percentile(values, fraction):
+    return statistics.quantiles(values, n=100)[int(fraction * 100) - 1] if len(values) > 1 else values[0]
+
+
+def run_profile(profile, args):
+    workdir = tempfile.mkdtemp(prefix='bench-sqlite-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    # Все пользователи входят с одного адреса
+    os.environ['RATE_LIMIT_ENABLED'] = '0'
+    if PROFILES[profile]:
+        os.environ['SQLITE_PRAGMAS'] = PROFILES[profile]
+    else:
+        os.environ.pop('SQLITE_PRAGMAS', None)
+
+    from app import create_app, db
+
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    total_users = args.readers + args.writers
+    with app.app_context():
+        seed(db, total_users)
+
+    results = defaultdict(list)
+    errors = defaultdict(int)
+    deadline = time.monotonic() + args.duration
+    threads = []
+    for index in range(total_users):
+        target = reader if index < args.readers else writer
+        threads.append(threading.Thread(target=target, args=(
+            login(app, index), index + 1, deadline, results, errors)))
+
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    with app.app_context():
+        db.engine.dispose()
+
+    print(f'\n{profile}: {args.readers} читателей, {args.writers} писателей, {elapsed:.1f} с')
+    print(f"{'операция':16} {'в секунду':>10} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9} {'ошибок':>7}")
+    for name in sorted(set(results) | set(errors)):
+        values = results.get(name) or [0.0]
+        print(f'{name:16} {len(results.get(name, [])) / elapsed:10.1f} {percentile(values, 0.5) * 1000:9.1f} '
+              f'{percentile(values, 0.95) * 1000:9.1f} {percentile(values, 0.99) * 1000:9.1f} '
+              f'{errors.get(name, 0):7d}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--readers', type=int, default=16)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=15, help='секунд на профиль')
+    parser.add_argument('--profile', choices=[*PROFILES, 'both'], default='both')
+    args = parser.parse_args()
+
+    for profile in (PROFILES if args.profile == 'both' else [args.profile]):
+        run_profile(profile, args)
+
+
+if __name__ == '__main__':
+    main()
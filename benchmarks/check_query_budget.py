@@ -0,0 +1,113 @@
+"""Проверка бюджетов SQL-запросов страниц: число запросов не должно расти с данными.
+
+Запуск (код возврата 1, если какая-либо страница превысила бюджет):
+    python benchmarks/check_query_budget.py
+
+Пользователь получает --schedules расписаний с заполненной сеткой, затем
+каждая страница запрашивается с холодным кэшем страниц. Бюджет включает
+загрузку пользователя сессии. Превышение обычно означает N+1: обращение к
+ленивой связи, не загруженной профилем из app/loading.py.
+"""
+import argparse
+import math
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# Адрес, допустимое число запросов и нужен ли вход (ленту календаря
+# запрашивает календарное приложение без сессии)
+PAGE_BUDGETS = (
+    ('/dashboard', 2, True),
+    ('/dashboard?format=json', 2, True),
+    ('/schedule/1/view?render=server', 3, True),
+    ('/schedule/1/view?render=client', 3, True),
+    ('/schedule/1/edit', 3, True),
+    ('/api/v1/schedules/1', 3, True),
+    ('/schedule/1/calendar.ics?token={token}', 2, False),
+    ('/calendar/{token}.ics', 3, False),
+)
+
+# Выгрузка читает расписания пакетами по окну: пользователь, список id
+# и два запроса (расписания и уроки) на пакет
+EXPORT_PATH = '/export-all?formats=csv,ics'
+
+
+def export_budget(schedules_count, window):
+    return 2 + 2 * math.ceil(schedules_count / window)
+
+
+def seed(db, schedules_count):
+    from app.lesson_store import bulk_insert_lessons, lesson_row
+    from app.models import Schedule, User
+
+    db.create_all()
+    user = User(username='budget', email='budget@example.com')
+    user.set_password('budget-password')
+    db.session.add(user)
+    db.session.flush()
+    for index in range(schedules_count):
+        schedule = Schedule(title=f'Расписание {index}', user_id=user.id,
+                            days_mask=0b11111, start_time='08:00', end_time='14:00')
+        db.session.add(schedule)
+        db.session.flush()
+        bulk_insert_lessons([
+            lesson_row(schedule.id, day, lesson, {'subject_name': f'Предмет {lesson}'})
+            for day in range(5) for lesson in range(6)
+        ])
+    db.session.commit()
+    return user.id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--schedules', type=int, default=30)
+    parser.add_argument('--verbose', action='store_true', help='выводить запросы каждой страницы')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='query-budget-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'budget.db')
+
+    from app import create_app, db, page_cache, pdf_exporter
+    from app.calendar_feed import feed_token
+    from app.models import User
+    from app.query_budget import QueryBudgetExceeded, query_budget
+
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        user_id = seed(db, args.schedules)
+    with app.test_request_context():
+        token = feed_token(db.session.get(User, user_id))
+
+    anonymous = app.test_client()
+    client = app.test_client()
+    client.post('/login', data={'username': 'budget', 'password': 'budget-password'})
+
+    window = max(2, pdf_exporter.workers * 2)
+    pages = [*PAGE_BUDGETS, (EXPORT_PATH, export_budget(args.schedules, window), True)]
+
+    failures = 0
+    for path, budget, authenticated in pages:
+        path = path.format(token=token)
+        page_cache.clear()
+        try:
+            with query_budget(budget, path) as counter:
+                response = (client if authenticated else anonymous).get(path)
+                response.get_data()  # потоковые ответы выполняются при чтении
+            ok = response.status_code == 200
+            message = f'{counter.count}/{budget} запросов, HTTP {response.status_code}'
+        except QueryBudgetExceeded as e:
+            ok, message = False, str(e)
+        failures += not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {path}: {message}")
+        if args.verbose and ok:
+            for statement in counter.statements:
+                print('     ' + ' '.join(statement.split())[:150])
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
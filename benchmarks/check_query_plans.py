@@ -0,0 +1,46 @@
+"""Проверка планов запросов: горячие выборки должны использовать индексы, а не полный скан.
+
+Запуск (код возврата 1, если какой-либо запрос сканирует всю таблицу):
+    python benchmarks/check_query_plans.py
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# Запрос и имя индекса, который SQLite должен выбрать для него
+EXPECTED_PLANS = (
+    ('SELECT * FROM lesson WHERE schedule_id = 1', 'ix_lesson_schedule_slot'),
+    ('DELETE FROM lesson WHERE schedule_id = 1', 'ix_lesson_schedule_slot'),
+    ('SELECT * FROM lesson WHERE schedule_id = 1 AND day_index = 2 AND lesson_index = 3',
+     'ix_lesson_schedule_slot'),
+    ('SELECT * FROM schedule WHERE user_id = 1', 'ix_schedule_user'),
+    ('SELECT count(*) FROM schedule WHERE user_id = 1', 'ix_schedule_user'),
+    ('SELECT * FROM schedule WHERE user_id = 1 ORDER BY created_at DESC NULLS LAST, id DESC LIMIT 25',
+     'ix_schedule_user_created'),
+)
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix='query-plans-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'plans.db')
+
+    from app import create_app, db
+
+    app = create_app()
+    failures = 0
+    with app.app_context():
+        db.create_all()
+        with db.engine.connect() as connection:
+            for query, index_name in EXPECTED_PLANS:
+                plan = ' | '.join(row[-1] for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + query))
+                ok = index_name in plan
+                failures += not ok
+                print(f"{'OK  ' if ok else 'FAIL'} {query}\n     {plan}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""Нагрузочный тест запущенного сервера: утренний пик просмотров расписаний.
+
+Каждый виртуальный пользователь входит в систему своим аккаунтом и в цикле
+открывает дашборд, страницу просмотра и JSON API своих расписаний. В конце
+выводятся запросы в секунду, перцентили задержки и количество ошибок по
+каждому адресу. Нужна только стандартная библиотека.
+
+Подготовка и запуск: пользователи loadtest1..N с паролем из --password
+должны существовать и иметь хотя бы одно расписание. Ключ --seed создает
+их в базе DATABASE_URL (той же, что у сервера):
+
+    python benchmarks/load_test.py --seed --users 50
+    RATE_LIMIT_ENABLED=0 gunicorn -c gunicorn.conf.py wsgi:app
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --users 50 --duration 60
+
+Все пользователи входят с одного адреса, поэтому ограничение частоты входов
+на сервере нужно отключить (RATE_LIMIT_ENABLED=0).
+
+Для сравнения с сервером разработки запустите run.py и укажите порт 5000.
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from http.cookiejar import CookieJar
+
+CSRF_RE = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+SCHEDULE_RE = re.compile(r'/schedule/(\d+)/view')
+
+
+class VirtualUser:
+    def __init__(self, base_url, username, password):
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.password = password
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()))
+        self.schedule_ids = []
+
+    def request(self, path, data=None):
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        with self.opener.open(self.base_url + path, data=body, timeout=30) as response:
+            return response.status, response.read().decode('utf-8', 'replace')
+
+    def login(self):
+        _, page = self.request('/login')
+        token = CSRF_RE.search(page)
+        self.request('/login', {'username': self.username, 'password': self.password,
+                                'csrf_token': token.group(1) if token else ''})
+        _, dashboard = self.request('/dashboard')
+        self.schedule_ids = sorted(set(SCHEDULE_RE.findall(dashboard)))
+        if not self.schedule_ids:
+            raise RuntimeError(f'{self.username}: не удалось войти или нет расписаний')
+
+    def scenario(self):
+        """Пути одного цикла пользователя"""
+        yield '/dashboard'
+        for schedule_id in self.schedule_ids[:3]:
+            yield f'/schedule/{schedule_id}/view'
+            yield f'/api/v1/schedules/{schedule_id}'
+
+
+def run_user(user, deadline, results, errors):
+    try:
+        user.login()
+    except Exception as e:
+        errors['login'].append(repr(e))
+        return
+
+    while time.monotonic() < deadline:
+        for path in user.scenario():
+            name = re.sub(r'/\d+', '/<id>', path)
+            started = time.perf_counter()
+            try:
+                user.request(path)
+            except (urllib.error.URLError, OSError) as e:
+                errors[name].append(repr(e))
+                continue
+            results[name].append(time.perf_counter() - started)
+
+
+def seed_users(count, prefix, password):
+    """Создает пользователей нагрузочного теста с расписанием на 5 дней"""
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    from app import create_app, db
+    from app.lesson_store import bulk_insert_lessons, lesson_row
+    from app.models import Schedule, User
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        for index in range(count):
+            username = f'{prefix}{index + 1}'
+            if User.query.filter_by(username=username).first():
+                continue
+            user = User(username=username, email=f'{username}@example.com')
+            user.set_password(password)
+            db.session.add(user)
+            db.session.flush()
+
+            schedule = Schedule(title=f'5{chr(0x410 + index % 8)} класс', user_id=user.id,
+                                days_mask=0b11111, start_time='08:00', end_time='14:00')
+            db.session.add(schedule)
+            db.session.flush()
+            bulk_insert_lessons([
+                lesson_row(schedule.id, day, lesson, {'subject_name': f'Предмет {day * 6 + lesson}'})
+                for day in range(5) for lesson in range(6)
+            ])
+        db.session.commit()
+    print(f'Пользователи {prefix}1..{prefix}{count} готовы')
+
+
+def percentile(values, fraction):
+    return statistics.quantiles(values, n=100)[int(fraction * 100) - 1] if len(values) > 1 else values[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--users', type=int, default=20, help='одновременных пользователей')
+    parser.add_argument('--duration', type=float, default=30, help='длительность, секунды')
+    parser.add_argument('--user-prefix', default='loadtest')
+    parser.add_argument('--password', default='loadtest')
+    parser.add_argument('--seed', action='store_true', help='создать пользователей и выйти')
+    args = parser.parse_args()
+
+    if args.seed:
+        seed_users(args.users, args.user_prefix, args.password)
+        return
+
+    results = defaultdict(list)
+    errors = defaultdict(list)
+    deadline = time.monotonic() + args.duration
+    threads = [
+        threading.Thread(target=run_user, args=(
+            VirtualUser(args.url, f'{args.user_prefix}{index + 1}', args.password), deadline, results, errors))
+        for index in range(args.users)
+    ]
+
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    total = sum(len(values) for values in results.values())
+    print(f'{args.users} пользователей, {elapsed:.1f} с, {total} запросов, {total / elapsed:.1f} запросов/с')
+    print(f"{'адрес':32} {'запросов':>9} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9} {'ошибок':>7}")
+    for name in sorted(set(results) | set(errors)):
+        values = results.get(name) or [0.0]
+        print(f'{name:32} {len(results.get(name, [])):9d} {percentile(values, 0.5) * 1000:9.1f} '
+              f'{percentile(values, 0.95) * 1000:9.1f} {percentile(values, 0.99) * 1000:9.1f} '
+              f'{len(errors.get(name, [])):7d}')
+    for name, messages in errors.items():
+        print(f'{name}: {messages[0]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Настройки gunicorn для production.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Все значения можно переопределить переменными окружения:
+
+* ``BIND`` / ``PORT`` - адрес (по умолчанию ``0.0.0.0:8000``);
+* ``WEB_CONCURRENCY`` - количество процессов (по умолчанию 2 * ядра + 1);
+* ``WEB_THREADS`` - потоков в процессе: больше 1 - потоковые воркеры
+  ``gthread``, 1 - классические prefork-воркеры ``sync``;
+* ``WEB_MAX_REQUESTS`` - после скольких запросов воркер перезапускается;
+* ``WEB_TIMEOUT`` - предельное время обработки запроса, секунды;
+* ``LOG_LEVEL`` - уровень журнала gunicorn;
+* ``METRICS_MULTIPROC_DIR`` - каталог снимков метрик воркеров (по умолчанию
+  новый временный каталог при каждом запуске, см. app/metrics.py);
+* ``METRICS_TOKEN`` - токен доступа к ``/metrics``. Без него ``/metrics``
+  отвечает только на запросы с 127.0.0.1 и ::1: сервер слушает
+  ``0.0.0.0``, поэтому для сбора метрик с другого хоста задайте токен.
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+cpu_count = multiprocessing.cpu_count()
+
+bind = os.environ.get('BIND') or f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# Запросы в основном ждут базу данных, поэтому процессов больше, чем ядер
+workers = int(os.environ.get('WEB_CONCURRENCY') or cpu_count * 2 + 1)
+threads = int(os.environ.get('WEB_THREADS') or 4)
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+# Пулы рендеринга PDF и проверки паролей создаются в каждом воркере: делим ядра между ними
+os.environ.setdefault('PDF_WORKERS', str(max(1, cpu_count // workers)))
+os.environ.setdefault('PASSWORD_VERIFY_WORKERS', str(max(1, cpu_count // workers)))
+
+# Каждому потоку воркера - свое постоянное соединение с базой (см. app/db_tuning.py)
+os.environ.setdefault('DB_POOL_SIZE', str(threads))
+
+# /metrics суммирует метрики всех воркеров через общий каталог; новый
+# каталог при запуске не смешивает счетчики с предыдущим запуском
+metrics_tmp_dir = None
+if not os.environ.get('METRICS_MULTIPROC_DIR'):
+    metrics_tmp_dir = tempfile.mkdtemp(prefix='metrics-', dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+    os.environ['METRICS_MULTIPROC_DIR'] = metrics_tmp_dir
+
+# Приложение создается один раз в мастер-процессе, воркеры получают его при fork
+preload_app = True
+
+# Плавный перезапуск воркеров: ограничивает рост памяти, jitter не дает
+# всем воркерам перезапуститься одновременно
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS') or 1000)
+max_requests_jitter = max_requests // 10
+graceful_timeout = 30
+timeout = int(os.environ.get('WEB_TIMEOUT') or 60)
+keepalive = 5
+
+# Пульс воркеров в памяти, а не на диске
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):
+    """Соединения с БД, открытые в мастере, не должны использоваться воркерами"""
+    from app import db
+
+    # wsgi:app - само Flask-приложение, asgi:app - обертка AsyncReadApp над ним
+    app = worker.app.wsgi()
+    app = getattr(app, 'flask_app', app)
+    if not hasattr(app, 'app_context'):
+        return
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def on_exit(server):
+    """Временный каталог метрик удаляется при остановке мастера"""
+    if metrics_tmp_dir:
+        shutil.rmtree(metrics_tmp_dir, ignore_errors=True)
@@ -0,0 +1,148 @@
+"""store days of week as bitmask
+
+Revision ID: c81d4e0f5a62
+Revises: a3f1c9e2b7d4
+Create Date: 2026-10-18 11:40:02.518734
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81d4e0f5a62'
+down_revision = 'a3f1c9e2b7d4'
+branch_labels = None
+depends_on = None
+
+WEEKDAY_CODES = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+DAY_CODE_CORRECTIONS = {'san': 'sun', 'sut': 'sat', 'thus': 'thu', 'wend': 'wed'}
+DEFAULT_DAYS_MASK = 0b0011111  # пн-пт для поврежденных записей
+
+schedule_table = sa.table(
+    'schedule',
+    sa.column('id', sa.Integer),
+    sa.column('days_of_week', sa.String),
+    sa.column('days_mask', sa.SmallInteger),
+)
+
+lesson_table = sa.table(
+    'lesson',
+    sa.column('id', sa.Integer),
+    sa.column('schedule_id', sa.Integer),
+    sa.column('day_index', sa.Integer),
+)
+
+
+def _old_day_codes(value):
+    """Дни в порядке старого JSON-списка: по этим позициям записан lesson.day_index"""
+    try:
+        day_codes = json.loads(value)
+    except (TypeError, ValueError):
+        day_codes = None
+    if not isinstance(day_codes, list):
+        # Приложение показывало поврежденные записи как пн-пт
+        return [code for index, code in enumerate(WEEKDAY_CODES) if DEFAULT_DAYS_MASK & (1 << index)]
+    return day_codes
+
+
+def _codes_to_mask(day_codes):
+    mask = 0
+    for day_code in day_codes:
+        if not isinstance(day_code, str):
+            continue
+        day_code = DAY_CODE_CORRECTIONS.get(day_code, day_code)
+        if day_code in WEEKDAY_CODES:
+            mask |= 1 << WEEKDAY_CODES.index(day_code)
+    return mask
+
+
+def _day_index_map(day_codes, mask):
+    """{старый day_index: новый} - дни в маске идут в календарном порядке.
+
+    Неизвестные коды не попадают в словарь; у повторяющегося дня остается
+    первая позиция, как первый столбец с этим днем.
+    """
+    new_codes = [code for index, code in enumerate(WEEKDAY_CODES) if mask & (1 << index)]
+    mapping = {}
+    for old_index, day_code in enumerate(day_codes):
+        if not isinstance(day_code, str):
+            continue
+        day_code = DAY_CODE_CORRECTIONS.get(day_code, day_code)
+        if day_code in new_codes:
+            new_index = new_codes.index(day_code)
+            if new_index not in mapping.values():
+                mapping[old_index] = new_index
+    return mapping
+
+
+def _remap_lessons(connection, schedule_id, mapping):
+    """Переносит уроки в новые столбцы дней и удаляет уроки дней, которых больше нет"""
+    lessons = connection.execute(
+        sa.select(lesson_table.c.id, lesson_table.c.day_index)
+        .where(lesson_table.c.schedule_id == schedule_id)
+    ).fetchall()
+
+    dropped = [lesson_id for lesson_id, day_index in lessons if day_index not in mapping]
+    if dropped:
+        connection.execute(lesson_table.delete().where(lesson_table.c.id.in_(dropped)))
+
+    # Через отрицательные индексы, чтобы перестановка дней не нарушала
+    # уникальность (schedule_id, day_index, lesson_index) на промежуточных шагах
+    moved = [(lesson_id, mapping[day_index]) for lesson_id, day_index in lessons
+             if day_index in mapping and mapping[day_index] != day_index]
+    for lesson_id, new_index in moved:
+        connection.execute(lesson_table.update().where(lesson_table.c.id == lesson_id)
+                           .values(day_index=-1 - new_index))
+    if moved:
+        connection.execute(
+            lesson_table.update()
+            .where(lesson_table.c.schedule_id == schedule_id, lesson_table.c.day_index < 0)
+            .values(day_index=-1 - lesson_table.c.day_index)
+        )
+
+
+def _mask_to_json(mask):
+    return json.dumps([code for index, code in enumerate(WEEKDAY_CODES) if (mask or 0) & (1 << index)])
+
+
+def upgrade():
+    with op.batch_alter_table('schedule', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('days_mask', sa.SmallInteger(), server_default='0', nullable=False))
+
+    connection = op.get_bind()
+    rows = connection.execute(sa.select(schedule_table.c.id, schedule_table.c.days_of_week)).fetchall()
+    for schedule_id, days_of_week in rows:
+        day_codes = _old_day_codes(days_of_week)
+        mask = _codes_to_mask(day_codes)
+        connection.execute(
+            schedule_table.update()
+            .where(schedule_table.c.id == schedule_id)
+            .values(days_mask=mask)
+        )
+
+        # lesson.day_index - позиция в старом списке; в маске дни упорядочены,
+        # без повторов и опечаток, поэтому уроки переносятся в новые столбцы
+        _remap_lessons(connection, schedule_id, _day_index_map(day_codes, mask))
+
+    with op.batch_alter_table('schedule', schema=None) as batch_op:
+        batch_op.drop_column('days_of_week')
+
+
+def downgrade():
+    with op.batch_alter_table('schedule', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('days_of_week', sa.VARCHAR(length=200), nullable=True))
+
+    connection = op.get_bind()
+    rows = connection.execute(sa.select(schedule_table.c.id, schedule_table.c.days_mask)).fetchall()
+    for schedule_id, days_mask in rows:
+        connection.execute(
+            schedule_table.update()
+            .where(schedule_table.c.id == schedule_id)
+            .values(days_of_week=_mask_to_json(days_mask))
+        )
+
+    with op.batch_alter_table('schedule', schema=None) as batch_op:
+        batch_op.drop_column('days_mask')
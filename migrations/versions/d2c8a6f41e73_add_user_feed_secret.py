@@ -0,0 +1,39 @@
+"""add user feed secret
+
+Revision ID: d2c8a6f41e73
+Revises: b7e3f5a1c2d9
+Create Date: 2026-10-18 18:05:37.416902
+
+"""
+import secrets
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2c8a6f41e73'
+down_revision = 'b7e3f5a1c2d9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('feed_secret', sa.String(length=32), nullable=True))
+
+    # У каждого существующего пользователя свой секрет; ссылки, выданные до
+    # миграции (без секрета), перестают работать
+    user = sa.table('user', sa.column('id', sa.Integer), sa.column('feed_secret', sa.String))
+    connection = op.get_bind()
+    for (user_id,) in connection.execute(sa.select(user.c.id)).all():
+        connection.execute(user.update().where(user.c.id == user_id)
+                           .values(feed_secret=secrets.token_urlsafe(16)))
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.alter_column('feed_secret', existing_type=sa.String(length=32), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('feed_secret')
@@ -0,0 +1,38 @@
+"""add lesson and schedule indexes
+
+Revision ID: e5b27a913c08
+Revises: c81d4e0f5a62
+Create Date: 2026-10-18 12:21:55.903117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b27a913c08'
+down_revision = 'c81d4e0f5a62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Удаляем дубликаты ячеек, оставляя последнюю запись, иначе уникальный индекс не создастся
+    op.execute(
+        "DELETE FROM lesson WHERE id NOT IN ("
+        "SELECT MAX(id) FROM lesson GROUP BY schedule_id, day_index, lesson_index)"
+    )
+
+    with op.batch_alter_table('lesson', schema=None) as batch_op:
+        batch_op.create_index('ix_lesson_schedule_slot', ['schedule_id', 'day_index', 'lesson_index'], unique=True)
+
+    with op.batch_alter_table('schedule', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_schedule_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('schedule', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_schedule_user_id'))
+
+    with op.batch_alter_table('lesson', schema=None) as batch_op:
+        batch_op.drop_index('ix_lesson_schedule_slot')
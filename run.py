@@ -1,3 +1,5 @@
+import os
+
 from app import create_app, db
 from app.models import User, Schedule, Lesson
 
@@ -13,4 +15,5 @@ def make_shell_context():
     }
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    # Сервер разработки; в production используйте gunicorn -c gunicorn.conf.py wsgi:app
+    app.run(debug=os.environ.get('FLASK_DEBUG', '1') == '1', host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,47 @@
+// Функция для получения CSRF токена
+function getCSRFToken() {
+    return window.csrfToken;
+}
+
+// Автоматическая настройка AJAX запросов
+if (typeof jQuery !== 'undefined') {
+    $.ajaxSetup({
+        beforeSend: function(xhr, settings) {
+            if (!/^(GET|HEAD|OPTIONS|TRACE)$/i.test(settings.type)) {
+                xhr.setRequestHeader("X-CSRFToken", window.csrfToken);
+            }
+        }
+    });
+}
+
+// Нативная fetch настройка
+const originalFetch = window.fetch;
+window.fetch = function(resource, options = {}) {
+    if (options.method && !/^(GET|HEAD|OPTIONS|TRACE)$/i.test(options.method)) {
+        options.headers = {
+            ...options.headers,
+            'X-CSRFToken': window.csrfToken
+        };
+    }
+    return originalFetch(resource, options);
+};
+
+// Инициализация dropdown меню
+document.addEventListener('DOMContentLoaded', function() {
+    const dropdowns = document.querySelectorAll('.dropdown');
+
+    dropdowns.forEach(dropdown => {
+        dropdown.addEventListener('click', function(e) {
+            e.stopPropagation();
+            const content = this.querySelector('.dropdown-content');
+            content.style.display = content.style.display === 'block' ? 'none' : 'block';
+        });
+    });
+
+    // Закрытие dropdown при клике вне его
+    document.addEventListener('click', function() {
+        document.querySelectorAll('.dropdown-content').forEach(content => {
+            content.style.display = 'none';
+        });
+    });
+});
@@ -0,0 +1,147 @@
+// Анимация появления карточек
+document.addEventListener('DOMContentLoaded', function() {
+    const cards = document.querySelectorAll('.schedule-card');
+    cards.forEach((card, index) => {
+        card.style.animationDelay = `${index * 0.1}s`;
+        card.style.animation = 'fadeInUp 0.6s ease forwards';
+    });
+});
+
+// Функции для красивого модального окна удаления
+function confirmDelete(scheduleId, scheduleTitle) {
+    document.getElementById('deleteScheduleTitle').textContent = scheduleTitle;
+    document.getElementById('deleteForm').action = `/schedule/${scheduleId}/delete`;
+
+    const modal = document.getElementById('deleteConfirmModal');
+    modal.style.display = 'block';
+    document.body.style.overflow = 'hidden';
+}
+
+function closeDeleteModal() {
+    const modal = document.getElementById('deleteConfirmModal');
+    modal.style.display = 'none';
+    document.body.style.overflow = 'auto';
+}
+
+// Функции для красивого уведомления об удалении
+function showDeleteSuccess() {
+    const notification = document.getElementById('deleteSuccessNotification');
+
+    // Сбрасываем анимации
+    notification.style.animation = 'none';
+    notification.offsetHeight; // Trigger reflow
+    notification.style.animation = null;
+
+    // Показываем уведомление
+    notification.classList.remove('hide');
+    notification.classList.add('show');
+
+    // Перезапускаем прогресс-бар
+    const progressBar = notification.querySelector('.notification-progress-bar');
+    progressBar.style.animation = 'none';
+    progressBar.offsetHeight;
+    progressBar.style.animation = 'progressBar 4s linear forwards';
+
+    // Автоматически скрываем через 4 секунды
+    setTimeout(() => {
+        hideDeleteNotification();
+    }, 4000);
+}
+
+function hideDeleteNotification() {
+    const notification = document.getElementById('deleteSuccessNotification');
+    notification.classList.remove('show');
+    notification.classList.add('hide');
+
+    // После завершения анимации скрытия полностью убираем элемент
+    setTimeout(() => {
+        notification.classList.remove('hide');
+        notification.style.display = 'none';
+    }, 500);
+}
+
+// Закрытие модального окна при клике вне его
+window.addEventListener('click', function(event) {
+    const modal = document.getElementById('deleteConfirmModal');
+    if (event.target === modal) {
+        closeDeleteModal();
+    }
+});
+
+// Закрытие модального окна по клавише Escape
+document.addEventListener('keydown', function(event) {
+    if (event.key === 'Escape') {
+        closeDeleteModal();
+    }
+});
+
+// Обработка отправки формы удаления
+document.getElementById('deleteForm').addEventListener('submit', function(e) {
+    e.preventDefault();
+
+    const formData = new FormData(this);
+    const url = this.action;
+
+    // Закрываем модальное окно
+    closeDeleteModal();
+
+    // Показываем уведомление об успешном удалении
+    showDeleteSuccess();
+
+    // Отправляем форму удаления
+    fetch(url, {
+        method: 'POST',
+        body: formData,
+        headers: {
+            'X-CSRFToken': document.querySelector('input[name="csrf_token"]').value
+        }
+    })
+    .then(response => {
+        if (response.ok) {
+            // После успешного удаления перезагружаем страницу через 1 секунду
+            setTimeout(() => {
+                window.location.reload();
+            }, 1000);
+        } else {
+            // Если произошла ошибка, все равно перезагружаем страницу
+            setTimeout(() => {
+                window.location.reload();
+            }, 1000);
+        }
+    })
+    .catch(error => {
+        console.error('Error:', error);
+        // В случае ошибки все равно перезагружаем страницу
+        setTimeout(() => {
+            window.location.reload();
+        }, 1000);
+    });
+});
+
+// Drag and drop для карточек (опционально)
+let draggedCard = null;
+
+document.addEventListener('dragstart', function(e) {
+    if (e.target.classList.contains('schedule-card')) {
+        draggedCard = e.target;
+        e.target.style.opacity = '0.5';
+    }
+});
+
+document.addEventListener('dragend', function(e) {
+    if (draggedCard) {
+        draggedCard.style.opacity = '1';
+        draggedCard = null;
+    }
+});
+
+document.addEventListener('dragover', function(e) {
+    e.preventDefault();
+});
+
+document.addEventListener('drop', function(e) {
+    e.preventDefault();
+    if (draggedCard && e.target.classList.contains('schedules-grid')) {
+        e.target.appendChild(draggedCard);
+    }
+});
@@ -6,7 +6,8 @@ class Dashboard {
 
     init() {
         this.setupEventListeners();
-        this.setupScheduleCards();
+        this.setupScheduleCards(document);
+        this.setupLazyLoading();
         console.log('Dashboard initialized');
     }
 
@@ -18,9 +19,9 @@ class Dashboard {
         document.addEventListener('keydown', this.handleKeyPress.bind(this));
     }
 
-    setupScheduleCards() {
-        const cards = document.querySelectorAll('.schedule-card');
-        
+    setupScheduleCards(root) {
+        const cards = root.querySelectorAll('.schedule-card');
+
         cards.forEach(card => {
             card.addEventListener('click', (e) => this.handleCardClick(e, card));
             card.addEventListener('mouseenter', () => this.handleCardHover(card));
@@ -28,6 +29,68 @@ class Dashboard {
         });
     }
 
+    setupLazyLoading() {
+        this.sentinel = document.getElementById('schedulesSentinel');
+        this.grid = document.querySelector('.schedules-grid');
+        this.loading = false;
+
+        if (!this.sentinel || !this.grid) {
+            return;
+        }
+
+        if ('IntersectionObserver' in window) {
+            this.observer = new IntersectionObserver(entries => {
+                if (entries.some(entry => entry.isIntersecting)) {
+                    this.loadMoreSchedules();
+                }
+            }, { rootMargin: '400px' });
+            this.observer.observe(this.sentinel);
+        } else {
+            this.sentinel.addEventListener('click', () => this.loadMoreSchedules());
+        }
+    }
+
+    loadMoreSchedules() {
+        const cursor = this.sentinel && this.sentinel.dataset.nextCursor;
+        if (this.loading || !cursor) {
+            return;
+        }
+        this.loading = true;
+
+        const url = `${this.sentinel.dataset.url}?format=json&cursor=${encodeURIComponent(cursor)}`;
+        fetch(url, { headers: { 'Accept': 'application/json' } })
+            .then(response => response.json())
+            .then(data => {
+                if (!data.success) {
+                    throw new Error(data.error);
+                }
+
+                const fragment = document.createElement('div');
+                fragment.innerHTML = data.html;
+                this.setupScheduleCards(fragment);
+                while (fragment.firstElementChild) {
+                    this.grid.appendChild(fragment.firstElementChild);
+                }
+
+                if (data.next_cursor) {
+                    this.sentinel.dataset.nextCursor = data.next_cursor;
+                } else {
+                    if (this.observer) {
+                        this.observer.disconnect();
+                    }
+                    this.sentinel.remove();
+                    this.sentinel = null;
+                }
+            })
+            .catch(error => {
+                console.error('Error loading schedules:', error);
+                this.showNotification('Не удалось загрузить расписания', 'error');
+            })
+            .finally(() => {
+                this.loading = false;
+            });
+    }
+
     handleCardClick(e, card) {
         // Ignore clicks on action buttons
         if (this.isActionElement(e.target)) {
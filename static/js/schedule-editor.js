@@ -2,6 +2,9 @@
 // Хранилище данных уроков
 let lessonsData = {};
 let currentEditingCell = null;
+// Ключи ячеек, измененных с момента последнего сохранения
+let dirtyLessons = new Set();
+let scheduleVersion = null;
 
 // В начале файла, после объявления переменных
 console.log('🔍 Checking DOM elements:');
@@ -18,6 +21,10 @@ document.addEventListener('DOMContentLoaded', function() {
         lessonsData = window.lessonsData;
         console.log('📦 Lessons data loaded:', lessonsData);
 
+        if (typeof window.scheduleVersion !== 'undefined') {
+            scheduleVersion = window.scheduleVersion;
+        }
+
         // Немедленно применяем шрифты после загрузки данных
         setTimeout(applyFontsOnLoad, 100);
     }
@@ -183,6 +190,7 @@ function saveLesson() {
         link_text: linkText,
         font_family: fontFamily  // Сохраняем только значение
     };
+    dirtyLessons.add(lessonKey);
 
     console.log('📊 Updated lessonsData:', lessonsData[lessonKey]);
 
@@ -234,21 +242,83 @@ function calculateBrightness(hex) {
     return (r * 299 + g * 587 + b * 114) / 1000;
 }
 
-// Сохранение всего расписания
+// Сохранение расписания: отправляем только измененные ячейки
 function saveSchedule() {
-    console.log('💾 Saving entire schedule:', lessonsData);
+    if (!window.patchLessonsUrl || scheduleVersion === null) {
+        return saveFullSchedule();
+    }
+
+    if (dirtyLessons.size === 0) {
+        showNotification('ℹ️ Нет несохраненных изменений', 'success');
+        return;
+    }
+
+    const changes = {};
+    dirtyLessons.forEach(key => {
+        changes[key] = lessonsData[key] || null;
+    });
+    console.log('💾 Saving changed lessons:', changes);
     showNotification('⏳ Сохранение расписания...', 'success');
 
-    // Проверяем, есть ли данные о шрифтах
-    let hasFontData = false;
-    for (const key in lessonsData) {
-        if (lessonsData[key]?.font_family) {
-            hasFontData = true;
-            console.log(`📝 Lesson ${key} has font: ${lessonsData[key].font_family}`);
-            break;
+    fetch(window.patchLessonsUrl, {
+        method: 'PATCH',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': getCSRFToken()
+        },
+        body: JSON.stringify({version: scheduleVersion, changes: changes})
+    })
+    .then(response => {
+        if (response.status === 409) {
+            return response.json().then(data => {
+                resolveVersionConflict(data);
+                return null;
+            });
+        }
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        return response.json();
+    })
+    .then(data => {
+        if (!data) {
+            return;
+        }
+        if (data.success) {
+            scheduleVersion = data.version;
+            Object.keys(changes).forEach(key => dirtyLessons.delete(key));
+            showNotification('✅ Расписание успешно сохранено!', 'success');
+        } else {
+            showNotification('❌ Ошибка при сохранении: ' + data.error, 'error');
         }
+    })
+    .catch(error => {
+        console.error('❌ Error:', error);
+        showNotification('❌ Ошибка при сохранении расписания', 'error');
+    });
+}
+
+// Расписание изменено в другом окне: перезаписать его своей сеткой или загрузить актуальную
+function resolveVersionConflict(data) {
+    showNotification('⚠️ ' + (data.error || 'Расписание было изменено в другом окне'), 'error');
+    if (typeof data.version === 'number') {
+        scheduleVersion = data.version;
     }
-    console.log('📋 Schedule contains font data:', hasFontData);
+    if (confirm('Расписание было изменено в другом окне.\n\n' +
+                'OK - сохранить ваш вариант целиком, Отмена - загрузить актуальное расписание (ваши изменения будут потеряны).')) {
+        saveFullSchedule();
+    } else {
+        window.location.reload();
+    }
+}
+
+// Сохранение всего расписания целиком
+function saveFullSchedule() {
+    console.log('💾 Saving entire schedule:', lessonsData);
+    showNotification('⏳ Сохранение расписания...', 'success');
+
+    // С версией сервер отклонит сохранение поверх чужих изменений (409)
+    const body = scheduleVersion === null ? lessonsData : {version: scheduleVersion, lessons: lessonsData};
 
     fetch(window.saveScheduleUrl, {
         method: 'POST',
@@ -256,11 +326,27 @@ function saveSchedule() {
             'Content-Type': 'application/json',
             'X-CSRFToken': getCSRFToken()
         },
-        body: JSON.stringify(lessonsData)
+        body: JSON.stringify(body)
+    })
+    .then(response => {
+        if (response.status === 409) {
+            return response.json().then(data => {
+                resolveVersionConflict(data);
+                return null;
+            });
+        }
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        return response.json();
     })
-    .then(response => response.json())
     .then(data => {
+        if (!data) {
+            return;
+        }
         if (data.success) {
+            scheduleVersion = data.version;
+            dirtyLessons.clear();
             showNotification('✅ Расписание успешно сохранено!', 'success');
             setTimeout(() => {
                 window.location.reload();
@@ -308,6 +394,7 @@ window.openEditModal = openEditModal;
 window.setColor = setColor;
 window.saveLesson = saveLesson;
 window.saveSchedule = saveSchedule;
+window.saveFullSchedule = saveFullSchedule;
 window.closeModal = closeModal;
 window.enableTitleEdit = enableTitleEdit;
 window.cancelTitleEdit = cancelTitleEdit;
@@ -352,6 +352,139 @@
     // Добавляем стили в документ
     document.head.appendChild(style);
 
+    // Построение сетки из JSON (режим VIEW_SCHEDULE_RENDER_MODE = 'client')
+    const DEFAULT_FONT = 'Bookman Old Style';
+
+    function safeColor(color, fallback) {
+        return /^#[0-9a-fA-F]{3,8}$/.test(color || '') ? color : fallback;
+    }
+
+    function safeFont(font) {
+        return (font || DEFAULT_FONT).replace(/['"\\;]/g, '');
+    }
+
+    function createElement(tag, className, text) {
+        const element = document.createElement(tag);
+        if (className) element.className = className;
+        if (text) element.textContent = text;
+        return element;
+    }
+
+    function createTimeCell(cellClass, prefix, slot) {
+        const cell = createElement('td', cellClass);
+        const display = createElement('div', `${prefix}time-display`);
+        display.appendChild(createElement('span', `${prefix}time-start`, slot[0]));
+        display.appendChild(createElement('span', `${prefix}time-separator`, '-'));
+        display.appendChild(createElement('span', `${prefix}time-end`, slot[1]));
+        cell.appendChild(display);
+        return cell;
+    }
+
+    // Ячейки колоночного формата /api/v1 в виде {"день_урок": {...}}
+    function decodeLessons(data) {
+        const lessons = {};
+        const subjects = data.subjects;
+        const columns = data.lessons;
+
+        for (let i = 0; i < columns.day.length; i++) {
+            const subject = columns.subject[i];
+            lessons[`${columns.day[i]}_${columns.lesson[i]}`] = {
+                subject_name: subjects.name[subject],
+                color: subjects.color[subject],
+                font_family: subjects.font[subject],
+                lesson_link: '',
+                link_text: ''
+            };
+        }
+
+        data.links.cell.forEach((cellIndex, i) => {
+            const lesson = lessons[`${columns.day[cellIndex]}_${columns.lesson[cellIndex]}`];
+            lesson.lesson_link = data.links.url[i];
+            lesson.link_text = data.links.text[i];
+        });
+        return lessons;
+    }
+
+    function buildScreenCell(lesson) {
+        const color = safeColor(lesson && lesson.color, '#FFFFFF');
+        const hasLink = Boolean(lesson && lesson.lesson_link);
+        const cell = createElement('td', 'lesson-view-cell day-column' + (hasLink ? ' has-link' : ''));
+        cell.style.cssText = `--lesson-color: ${color}; background: linear-gradient(135deg, #FFFFFF 0%, ${color} 100%); color: #000000; height: 70px;`;
+        cell.setAttribute('data-lesson-link', hasLink ? lesson.lesson_link : '');
+        cell.setAttribute('data-link-text', (lesson && lesson.link_text) || 'Перейти к уроку');
+
+        if (lesson && lesson.subject_name) {
+            const content = createElement('div', 'lesson-content');
+            const name = createElement('div', 'subject-name', lesson.subject_name);
+            name.style.cssText = `font-family: '${safeFont(lesson.font_family)}'; font-size: 16px;`;
+            content.appendChild(name);
+            if (hasLink) {
+                content.appendChild(createElement('div', 'link-indicator', 'Есть ссылка'));
+            }
+            cell.appendChild(content);
+        }
+        return cell;
+    }
+
+    function buildPrintCell(lesson) {
+        const color = safeColor(lesson && lesson.color, '#FFFFFF');
+        const cell = createElement('td', 'print-day-cell', lesson && lesson.subject_name);
+        cell.style.cssText = `--lesson-color: ${color};
+            background: linear-gradient(135deg, #FFFFFF 0%, ${color} 100%) !important;
+            color: #000000 !important; -webkit-print-color-adjust: exact !important; print-color-adjust: exact !important;
+            border: 1px solid #000 !important; font-family: '${safeFont(lesson && lesson.font_family)}' !important;
+            font-size: 12px !important; font-weight: normal !important; line-height: 1 !important;
+            text-align: center !important; vertical-align: middle !important; padding: 0 !important;`;
+        return cell;
+    }
+
+    function buildPdfCell(lesson) {
+        if (!lesson || !lesson.subject_name) {
+            const empty = createElement('td', 'pdf-lesson-cell pdf-empty-cell');
+            empty.style.cssText = 'height: 16px !important; padding: 0 !important; line-height: 1 !important;';
+            return empty;
+        }
+        const color = safeColor(lesson.color, '#667eea');
+        const cell = createElement('td', 'pdf-lesson-cell', lesson.subject_name);
+        cell.style.cssText = `background: linear-gradient(135deg, #FFFFFF 0%, ${color} 100%) !important;
+            font-family: '${safeFont(lesson.font_family)}' !important; font-size: 16px !important;
+            padding: 1 !important; height: 16px !important; line-height: 1 !important;`;
+        return cell;
+    }
+
+    const GRID_BUILDERS = {
+        screen: { timeCell: slot => createTimeCell('time-cell', '', slot), cell: buildScreenCell },
+        print: { timeCell: slot => createTimeCell('print-time-cell print-day-cell', 'print-', slot), cell: buildPrintCell },
+        pdf: { timeCell: slot => createTimeCell('pdf-time-cell', 'pdf-', slot), cell: buildPdfCell }
+    };
+
+    function renderScheduleGrid() {
+        const dataElement = document.getElementById('scheduleData');
+        if (!dataElement) return;
+
+        const data = JSON.parse(dataElement.textContent);
+        const lessons = decodeLessons(data);
+        window.lessonsData = lessons;
+
+        document.querySelectorAll('tbody[data-grid]').forEach(tbody => {
+            const builder = GRID_BUILDERS[tbody.dataset.grid];
+            const fragment = document.createDocumentFragment();
+
+            data.times.forEach((slot, lessonIndex) => {
+                const row = document.createElement('tr');
+                row.appendChild(builder.timeCell(slot));
+                for (let dayIndex = 0; dayIndex < data.days; dayIndex++) {
+                    row.appendChild(builder.cell(lessons[`${dayIndex}_${lessonIndex}`]));
+                }
+                fragment.appendChild(row);
+            });
+            tbody.appendChild(fragment);
+        });
+    }
+
+    // Сетка нужна раньше обработчиков DOMContentLoaded страницы: они ищут ячейки
+    renderScheduleGrid();
+
     // Функция для применения шрифтов к названиям уроков
     function applyLessonFonts() {
         const lessonsData = window.lessonsData || {};
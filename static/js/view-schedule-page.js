@@ -0,0 +1,612 @@
+console.log('🔄 Schedule view script loaded - version 1.1');
+
+const { jsPDF } = window.jspdf;
+
+let printOrientation = 'landscape';
+let isGeneratingPDF = false;
+let eventsInitialized = false;
+let hotkeyHandled = false;
+let currentLessonLink = '';
+
+// Функция для показа красивого уведомления
+function showNotification() {
+    const notification = document.getElementById('notification');
+
+    // Показываем уведомление
+    notification.classList.remove('hide');
+    notification.classList.add('show');
+
+    // Автоматически скрываем через 3 секунды
+    setTimeout(() => {
+        notification.classList.remove('show');
+        notification.classList.add('hide');
+
+        // После завершения анимации скрытия полностью убираем элемент
+        setTimeout(() => {
+            notification.classList.remove('hide');
+        }, 400);
+    }, 3000);
+}
+
+// Функции для работы с глобальным меню
+function showLessonMenu(event, lessonLink, linkText) {
+    if (!lessonLink) {
+        return;
+    }
+
+    event.stopPropagation();
+    currentLessonLink = lessonLink;
+
+    const menuLink = document.getElementById('menu-link');
+    const menuLinkText = document.getElementById('menu-link-text');
+
+    menuLink.href = lessonLink;
+    menuLinkText.textContent = linkText;
+
+    const menu = document.getElementById('global-lesson-menu');
+    menu.classList.add('active');
+    positionMenu(menu, event.clientX, event.clientY);
+}
+
+function positionMenu(menu, x, y) {
+    const menuRect = menu.getBoundingClientRect();
+    const viewportWidth = window.innerWidth;
+    const viewportHeight = window.innerHeight;
+
+    let finalX = x;
+    let finalY = y;
+
+    if (x + menuRect.width > viewportWidth) {
+        finalX = viewportWidth - menuRect.width - 10;
+    }
+
+    if (y + menuRect.height > viewportHeight) {
+        finalY = viewportHeight - menuRect.height - 10;
+    }
+
+    menu.style.left = finalX + 'px';
+    menu.style.top = finalY + 'px';
+}
+
+function hideLessonMenu() {
+    const menu = document.getElementById('global-lesson-menu');
+    menu.classList.remove('active');
+    currentLessonLink = '';
+}
+
+function copyCurrentLink() {
+    if (!currentLessonLink) return;
+
+    navigator.clipboard.writeText(currentLessonLink).then(function() {
+        showNotification();
+        hideLessonMenu();
+    }).catch(function(err) {
+        console.error('Ошибка при копировании:', err);
+        showErrorNotification('Ошибка при копировании ссылки');
+    });
+}
+
+// Обработчик перехода по ссылке с закрытием меню
+function handleLinkClick(event) {
+    // Закрываем меню перед переходом по ссылке
+    hideLessonMenu();
+
+    // Не предотвращаем стандартное поведение - разрешаем переход
+    // Меню закроется, и пользователь перейдет по ссылке
+}
+
+// Функция для показа уведомления об ошибке
+function showErrorNotification(message) {
+    const notification = document.getElementById('notification');
+    const icon = notification.querySelector('.notification-icon');
+    const text = notification.querySelector('.notification-text');
+
+    // Меняем стиль для ошибки
+    notification.style.background = 'linear-gradient(135deg, #e53e3e, #c53030)';
+    notification.style.borderLeftColor = '#c53030';
+    icon.className = 'fas fa-exclamation-circle notification-icon';
+    text.textContent = message;
+
+    showNotification();
+
+    // Восстанавливаем оригинальный стиль после скрытия
+    setTimeout(() => {
+        notification.style.background = 'linear-gradient(135deg, #48bb78, #38a169)';
+        notification.style.borderLeftColor = '#2f855a';
+        icon.className = 'fas fa-check-circle notification-icon';
+        text.textContent = 'Ссылка скопирована в буфер обмена!';
+    }, 3000);
+}
+
+// Инициализация обработчиков событий для меню
+function initMenuHandlers() {
+    const lessonCells = document.querySelectorAll('.lesson-view-cell');
+    lessonCells.forEach(cell => {
+        cell.addEventListener('click', function(event) {
+            const lessonLink = this.getAttribute('data-lesson-link');
+            const linkText = this.getAttribute('data-link-text');
+            showLessonMenu(event, lessonLink, linkText);
+        });
+    });
+
+    // Обработчик для кнопки копирования
+    document.getElementById('menu-copy').addEventListener('click', copyCurrentLink);
+
+    // Обработчик для ссылки перехода - закрываем меню при клике
+    document.getElementById('menu-link').addEventListener('click', handleLinkClick);
+
+    // Обработчик для кнопки закрытия
+    document.getElementById('menu-close').addEventListener('click', hideLessonMenu);
+
+    // Закрытие меню при клике вне его
+    document.addEventListener('click', function(event) {
+        if (!event.target.closest('#global-lesson-menu') && !event.target.closest('.lesson-view-cell')) {
+            hideLessonMenu();
+        }
+    });
+
+    // Закрытие меню при нажатии ESC
+    document.addEventListener('keydown', function(event) {
+        if (event.key === 'Escape') {
+            hideLessonMenu();
+        }
+    });
+
+    // Дополнительная защита: закрытие меню при уходе со страницы
+    window.addEventListener('beforeunload', function() {
+        hideLessonMenu();
+    });
+
+    // Закрытие меню при изменении размера окна
+    window.addEventListener('resize', function() {
+        hideLessonMenu();
+    });
+}
+
+// Остальные функции остаются без изменений
+function processWordHyphenation(text) {
+    const hyphenationRules = {
+        'Информатика': 'Информа-тика',
+        'Литературное чтение': 'Литератур-ное чтение',
+        'Обществознание': 'Общество-знание',
+        'Окружающий мир': 'Окружаю-щий мир',
+        'Программирование': 'Программи-рование'
+    };
+
+    for (const [keyword, hyphenated] of Object.entries(hyphenationRules)) {
+        if (text.toLowerCase().includes(keyword.toLowerCase())) {
+            const regex = new RegExp(keyword, 'gi');
+            return text.replace(regex, hyphenated);
+        }
+    }
+
+    return text;
+}
+
+function textFitsInCell(cell, text) {
+    const tempSpan = document.createElement('span');
+    tempSpan.style.visibility = 'hidden';
+    tempSpan.style.position = 'absolute';
+    tempSpan.style.whiteSpace = 'nowrap';
+    tempSpan.style.font = window.getComputedStyle(cell).font;
+    tempSpan.textContent = text;
+
+    document.body.appendChild(tempSpan);
+    const textWidth = tempSpan.offsetWidth;
+    const cellWidth = cell.offsetWidth - 4;
+
+    document.body.removeChild(tempSpan);
+
+    return textWidth <= cellWidth;
+}
+
+function applyHyphenationToTable() {
+    const pdfContainer = document.getElementById('pdfContainer');
+    const lessonCells = pdfContainer.querySelectorAll('.pdf-lesson-cell');
+
+    lessonCells.forEach(cell => {
+        const originalText = cell.textContent.trim();
+        if (originalText) {
+            let finalText = originalText;
+
+            const fullTextFits = textFitsInCell(cell, originalText);
+
+            if (!fullTextFits) {
+                console.log('📏 Full text does not fit:', originalText);
+
+                const words = originalText.split(' ');
+
+                if (words.length > 1) {
+                    const wordsThatNeedHyphenation = [];
+
+                    words.forEach(word => {
+                        const wordFits = textFitsInCell(cell, word);
+                        if (!wordFits) {
+                            wordsThatNeedHyphenation.push(word);
+                            console.log('📏 Word does not fit:', word);
+                        }
+                    });
+
+                    if (wordsThatNeedHyphenation.length > 0) {
+                        let processedText = originalText;
+
+                        wordsThatNeedHyphenation.forEach(word => {
+                            const hyphenatedWord = processWordHyphenation(word);
+                            if (hyphenatedWord !== word) {
+                                processedText = processedText.replace(word, hyphenatedWord);
+                                console.log('🔤 Applied hyphenation to word:', word, '→', hyphenatedWord);
+                            }
+                        });
+
+                        finalText = processedText;
+                    }
+                } else {
+                    const hyphenatedText = processWordHyphenation(originalText);
+                    if (hyphenatedText !== originalText) {
+                        finalText = hyphenatedText;
+                        console.log('🔤 Applied hyphenation to single word:', originalText, '→', hyphenatedText);
+                    }
+                }
+            }
+
+            if (finalText !== originalText) {
+                cell.textContent = finalText;
+                console.log('✅ Final text:', finalText);
+            }
+        }
+    });
+}
+
+function setupPrintOrientation() {
+    const buttons = document.querySelectorAll('.orientation-btn');
+    buttons.forEach(btn => {
+        btn.addEventListener('click', function() {
+            buttons.forEach(b => b.classList.remove('active'));
+            this.classList.add('active');
+            printOrientation = this.dataset.orientation;
+            console.log('📐 Orientation changed to:', printOrientation);
+        });
+    });
+}
+
+function setupButtonEvents() {
+    console.log('🔧 Setting up button events...');
+
+    const printBtn = document.getElementById('printBtn');
+    const pdfBtn = document.getElementById('pdfBtn');
+
+    if (printBtn) {
+        const newPrintBtn = printBtn.cloneNode(true);
+        printBtn.parentNode.replaceChild(newPrintBtn, printBtn);
+        newPrintBtn.onclick = printSchedule;
+        newPrintBtn.title = 'Печать (Ctrl+P)';
+    }
+
+    if (pdfBtn) {
+        const newPdfBtn = pdfBtn.cloneNode(true);
+        pdfBtn.parentNode.replaceChild(newPdfBtn, pdfBtn);
+        newPdfBtn.onclick = downloadPDF;
+        newPdfBtn.title = 'Скачать в формате PDF';
+    }
+
+    console.log('✅ Button events setup complete');
+}
+
+// Серверный PDF: статус ставит рендеринг в очередь (202) и опрашивается до готовности
+function downloadServerPDF() {
+    if (isGeneratingPDF) {
+        return;
+    }
+    isGeneratingPDF = true;
+
+    const poll = () => fetch(window.serverPdfStatusUrl, {headers: {'Accept': 'application/json'}})
+        .then(response => {
+            if (!response.ok && response.status !== 202) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            return response.json();
+        })
+        .then(data => {
+            if (data.status === 'ready') {
+                isGeneratingPDF = false;
+                window.location.href = data.download_url;
+            } else if (data.status === 'pending') {
+                setTimeout(poll, 1000);
+            } else {
+                throw new Error(data.error || 'PDF не сформирован');
+            }
+        })
+        .catch(error => {
+            console.error('❌ Server PDF error:', error);
+            isGeneratingPDF = false;
+            alert('Не удалось сформировать PDF. Попробуйте позже.');
+        });
+
+    poll();
+}
+
+function downloadPDF() {
+    if (window.serverPdfStatusUrl) {
+        downloadServerPDF();
+        return;
+    }
+
+    if (isGeneratingPDF) {
+        console.log('⏳ PDF generation already in progress...');
+        return;
+    }
+
+    isGeneratingPDF = true;
+    console.log('📥 Starting PDF generation...', Date.now());
+
+    try {
+        const pdfContainer = document.getElementById('pdfContainer');
+        const originalTexts = {};
+        const lessonCells = pdfContainer.querySelectorAll('.pdf-lesson-cell');
+
+        lessonCells.forEach((cell, index) => {
+            originalTexts[index] = cell.textContent;
+        });
+
+        const originalDisplay = pdfContainer.style.display;
+        pdfContainer.style.display = 'block';
+        pdfContainer.style.width = '900px';
+
+        setTimeout(() => {
+            applyHyphenationToTable();
+
+            setTimeout(() => {
+                html2canvas(pdfContainer, {
+                    scale: 2,
+                    useCORS: true,
+                    logging: false,
+                    backgroundColor: '#ffffff',
+                    allowTaint: true,
+                    width: 900,
+                    windowWidth: 900,
+                    height: pdfContainer.scrollHeight,
+                    windowHeight: pdfContainer.scrollHeight,
+                    scrollY: -window.scrollY
+                }).then(canvas => {
+                    lessonCells.forEach((cell, index) => {
+                        cell.textContent = originalTexts[index];
+                    });
+
+                    pdfContainer.style.display = originalDisplay;
+                    pdfContainer.style.width = '';
+
+                    const pdf = new jsPDF({
+                        orientation: printOrientation,
+                        unit: 'mm',
+                        format: 'a4'
+                    });
+
+                    const pdfWidth = pdf.internal.pageSize.getWidth();
+                    const pdfHeight = pdf.internal.pageSize.getHeight();
+
+                    const imgWidth = pdfWidth - 20; // 10mm margins on both sides
+                    const imgHeight = (canvas.height * imgWidth) / canvas.width;
+
+                    const imgData = canvas.toDataURL('image/jpeg', 0.95);
+
+                    let position = 0;
+                    let remainingHeight = imgHeight;
+
+                    while (remainingHeight > 0) {
+                        if (position > 0) {
+                            pdf.addPage();
+                        }
+
+                        const pageHeight = pdfHeight;
+                        const chunkHeight = Math.min(remainingHeight, pageHeight);
+
+                        // Calculate the source Y position for the current chunk
+                        const srcY = (imgHeight - remainingHeight) * (canvas.width / imgWidth);
+
+                        // Create a temporary canvas for the current page chunk
+                        const tempCanvas = document.createElement('canvas');
+                        const tempCtx = tempCanvas.getContext('2d');
+                        tempCanvas.width = canvas.width;
+                        tempCanvas.height = chunkHeight * (canvas.width / imgWidth);
+
+                        // Draw the current chunk from the main canvas
+                        tempCtx.drawImage(
+                            canvas,
+                            0, srcY, // source x, y
+                            canvas.width, tempCanvas.height, // source width, height
+                            0, 0, // destination x, y
+                            canvas.width, tempCanvas.height // destination width, height
+                        );
+
+                        const chunkData = tempCanvas.toDataURL('image/jpeg', 0.95);
+
+                        pdf.addImage(
+                            chunkData,
+                            'JPEG',
+                            10, // x position
+                            10, // y position
+                            imgWidth,
+                            chunkHeight
+                        );
+
+                        position += chunkHeight;
+                        remainingHeight -= chunkHeight;
+                    }
+
+                    pdf.setProperties({
+                        title: 'Расписание: ' + window.scheduleTitle,
+                        subject: 'Расписание занятий',
+                        author: 'School Schedule App'
+                    });
+
+                    const fileName = `Расписание - ${window.scheduleTitle}.pdf`;
+                    pdf.save(fileName);
+
+                    console.log('✅ PDF generated successfully with proper page breaks');
+
+                    setTimeout(() => {
+                        isGeneratingPDF = false;
+                    }, 1000);
+
+                }).catch(error => {
+                    console.error('❌ PDF canvas error:', error);
+                    lessonCells.forEach((cell, index) => {
+                        cell.textContent = originalTexts[index];
+                    });
+                    pdfContainer.style.display = originalDisplay;
+                    pdfContainer.style.width = '';
+                    isGeneratingPDF = false;
+                    alert('Ошибка при создании PDF файла: ' + error.message);
+                });
+            }, 100);
+        }, 100);
+    } catch (error) {
+        console.error('❌ PDF generation error:', error);
+        isGeneratingPDF = false;
+        alert('Ошибка: ' + error.message);
+    }
+}
+
+function printSchedule() {
+    console.log('🖨️ Starting print...', Date.now());
+
+    const printContainer = document.querySelector('.print-container');
+    const lessonCells = printContainer.querySelectorAll('td');
+    const originalTexts = {};
+
+    lessonCells.forEach((cell, index) => {
+        if (cell.textContent.trim()) {
+            originalTexts[index] = cell.textContent;
+        }
+    });
+
+    setTimeout(() => {
+        lessonCells.forEach(cell => {
+            const originalText = cell.textContent.trim();
+            if (originalText) {
+                let finalText = originalText;
+
+                const fullTextFits = textFitsInCell(cell, originalText);
+
+                if (!fullTextFits) {
+                    console.log('📏 Full text does not fit:', originalText);
+
+                    const words = originalText.split(' ');
+
+                    if (words.length > 1) {
+                        const wordsThatNeedHyphenation = [];
+
+                        words.forEach(word => {
+                            const wordFits = textFitsInCell(cell, word);
+                            if (!wordFits) {
+                                wordsThatNeedHyphenation.push(word);
+                                console.log('📏 Word does not fit:', word);
+                            }
+                        });
+
+                        if (wordsThatNeedHyphenation.length > 0) {
+                            let processedText = originalText;
+
+                            wordsThatNeedHyphenation.forEach(word => {
+                                const hyphenatedWord = processWordHyphenation(word);
+                                if (hyphenatedWord !== word) {
+                                    processedText = processedText.replace(word, hyphenatedWord);
+                                    console.log('🔤 Applied hyphenation to word:', word, '→', hyphenatedWord);
+                                }
+                            });
+
+                            finalText = processedText;
+                        }
+                    } else {
+                        const hyphenatedText = processWordHyphenation(originalText);
+                        if (hyphenatedText !== originalText) {
+                            finalText = hyphenatedText;
+                            console.log('🔤 Applied hyphenation to single word:', originalText, '→', hyphenatedText);
+                        }
+                    }
+                }
+
+                if (finalText !== originalText) {
+                    cell.textContent = finalText;
+                }
+            }
+        });
+
+        const style = document.createElement('style');
+        style.textContent = `
+            @media print {
+                @page {
+                    size: ${printOrientation};
+                    margin: 5mm;
+                }
+                body * {
+                    visibility: hidden;
+                }
+                .print-container,
+                .print-container * {
+                    visibility: visible;
+                }
+                .print-container {
+                    position: absolute;
+                    left: 0;
+                    top: 0;
+                    width: 100%;
+                    margin: 0;
+                    padding: 0;
+                    background: white;
+                }
+            }
+        `;
+        document.head.appendChild(style);
+
+        window.print();
+
+        setTimeout(() => {
+            lessonCells.forEach((cell, index) => {
+                if (originalTexts[index]) {
+                    cell.textContent = originalTexts[index];
+                }
+            });
+            document.head.removeChild(style);
+            console.log('✅ Print completed');
+        }, 100);
+    }, 50);
+}
+
+document.addEventListener('keydown', function(e) {
+    if ((e.ctrlKey || e.metaKey) && e.key === 'p') {
+        if (hotkeyHandled) return;
+
+        e.preventDefault();
+        hotkeyHandled = true;
+        console.log('⌨️ Ctrl+P pressed');
+        printSchedule();
+
+        setTimeout(() => {
+            hotkeyHandled = false;
+        }, 1000);
+    }
+});
+
+document.addEventListener('DOMContentLoaded', function() {
+    if (eventsInitialized) {
+        console.log('⚠️ Events already initialized, skipping...');
+        return;
+    }
+
+    eventsInitialized = true;
+    console.log('🚀 Initializing schedule view...');
+
+    initMenuHandlers();
+    setupPrintOrientation();
+    setupButtonEvents();
+
+    console.log('✅ Schedule view initialized successfully');
+});
+
+if (window.scheduleViewInitialized) {
+    console.log('⚠️ Script already executed, stopping...');
+} else {
+    window.scheduleViewInitialized = true;
+    console.log('🔧 First script execution');
+}
@@ -0,0 +1,9 @@
+"""WSGI-точка входа для production-сервера.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Для разработки используйте run.py.
+"""
+from app import create_app
+
+app = create_app()